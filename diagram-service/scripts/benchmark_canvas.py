@@ -0,0 +1,80 @@
+import argparse
+import io
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from scripts.benchmark_text_grammar import procedural_text
+from src.core.config import settings
+from src.generative_pipeline.svg_renderer import png_rasterizer_available
+from src.generative_pipeline.text_parser import TextToGraphParser
+from src.generative_pipeline.visualizer import GraphVisualizer
+
+
+def measure(fn):
+    start = time.perf_counter()
+    image = fn()
+    return (time.perf_counter() - start) * 1000, Image.open(io.BytesIO(image)).size, len(image)
+
+
+def report(nodes, name, elapsed, size, size_bytes):
+    print(f"{nodes:>6} {name:<28} {elapsed:>9.0f} {size[0]:>7}x{size[1]:<7} {size[0] * size[1] / 1e6:>6.2f} {size_bytes:>10}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark adaptive canvas sizing, pixel budget and Deep Zoom tiles")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 400, 2000, 20000], help="Description sizes in characters")
+    parser.add_argument("--dpi", type=int, default=150)
+    parser.add_argument("--max-pixels", type=int, default=settings.render_max_pixels)
+    parser.add_argument("--tiles", type=int, default=20, help="Random tiles per diagram")
+    parser.add_argument("--skip-matplotlib-over", type=int, default=500, help="Skip matplotlib above this many nodes")
+    args = parser.parse_args()
+
+    import matplotlib
+    matplotlib.use('Agg')
+    settings.render_max_pixels = args.max_pixels
+
+    visualizer = GraphVisualizer()
+    adaptive_size = visualizer.figure_size
+    rng = np.random.default_rng(0)
+    print(f"pixel budget: {args.max_pixels / 1e6:.1f} MP")
+    print(f"{'nodes':>6} {'renderer':<28} {'ms':>9} {'pixels':>15} {'MP':>6} {'bytes':>10}")
+    for size in args.sizes:
+        graph = TextToGraphParser().parse(procedural_text(size, seed=1))
+        nodes = graph.number_of_nodes()
+        visualizer.compute_layout(graph, 'vertical')
+
+        if nodes <= args.skip_matplotlib_over:
+            # Прежнее поведение: фигура 12x8 дюймов при любом размере графа
+            visualizer.figure_size = lambda layout, dpi: (12.0, 8.0, dpi)
+            report(nodes, "matplotlib fixed 12x8", *measure(lambda: visualizer._render_with_matplotlib(graph, 'vertical', 'png', args.dpi)))
+            visualizer.figure_size = adaptive_size
+            report(nodes, "matplotlib adaptive", *measure(lambda: visualizer._render_with_matplotlib(graph, 'vertical', 'png', args.dpi)))
+
+        if not png_rasterizer_available():
+            print(f"{nodes:>6} svg -> png / tiles: n/a (resvg-py not installed)")
+            continue
+        report(nodes, "svg -> png adaptive", *measure(lambda: visualizer._render_svg_png(graph, 'vertical', args.dpi)))
+
+        pyramid, geometry = visualizer.tile_pyramid(graph, 'vertical', args.dpi, settings.render_tile_size)
+        times = []
+        for _ in range(args.tiles):
+            level = int(rng.integers(0, pyramid.max_level + 1))
+            cols, rows = pyramid.tile_count(level)
+            col, row = int(rng.integers(0, cols)), int(rng.integers(0, rows))
+            start = time.perf_counter()
+            visualizer.render_tile(graph, 'vertical', pyramid, level, col, row, geometry)
+            times.append((time.perf_counter() - start) * 1000)
+        print(
+            f"{nodes:>6} {'tiles':<28} full size {pyramid.width}x{pyramid.height}, levels 0..{pyramid.max_level}, "
+            f"tile ms p50 {np.median(times):.0f} max {max(times):.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from scripts.benchmark_text_grammar import procedural_text
+from src.generative_pipeline.code_generator import DiagramCodeGenerator
+from src.generative_pipeline.flow_structure import FlowStructure
+from src.generative_pipeline.text_parser import TextToGraphParser
+from src.utils.analysis_context import AnalysisContext
+
+
+def measure(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return float(np.median(times))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark structured PlantUML/Mermaid generation throughput")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[3300, 33000, 110000, 330000], help="Description sizes in characters (330000 ~ 10k nodes)")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    generator = DiagramCodeGenerator()
+    print(f"{'nodes':>6} {'edges':>6} {'step':<12} {'ms p50':>9} {'nodes/s':>10} {'us/node':>8} {'KB':>7}")
+    for size in args.sizes:
+        graph = TextToGraphParser().parse(procedural_text(size, seed=1))
+        context = AnalysisContext.from_graph(graph)
+        nodes, edges = graph.number_of_nodes(), graph.number_of_edges()
+        # Писатели читают события, сохраненные в structure.events(): их строки - без обхода
+        structure = FlowStructure(context)
+
+        steps = [
+            ("structure", lambda: FlowStructure(context), 0),
+            ("walk", lambda: list(structure.walk()), 0),
+            ("plantuml", lambda: generator._generate_plantuml(context, structure), len(generator._generate_plantuml(context, structure).encode())),
+            ("mermaid", lambda: generator._generate_mermaid(context, structure), len(generator._generate_mermaid(context, structure).encode())),
+            ("both", lambda: generator.generate_both(graph, context), 0),
+        ]
+        for name, fn, size_bytes in steps:
+            elapsed = measure(fn, args.repeat)
+            print(
+                f"{nodes:>6} {edges:>6} {name:<12} {elapsed * 1000:>9.1f} {nodes / elapsed:>10.0f} "
+                f"{elapsed / nodes * 1e6:>8.1f} {size_bytes / 1024:>7.0f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
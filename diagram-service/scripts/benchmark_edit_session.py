@@ -0,0 +1,111 @@
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from scripts.benchmark_text_grammar import STEPS, CONDITIONS, procedural_text
+from src.generative_pipeline.code_generator import DiagramCodeGenerator
+from src.generative_pipeline.edit_session import IncrementalTextParser
+from src.generative_pipeline.text_parser import TextToGraphParser
+from src.postprocessing.template_engine import TemplateEngine
+from src.preprocessing.text_preprocessor import TextPreprocessor
+from src.utils.analysis_context import AnalysisContext
+
+
+def edits(text, count, seed=0):
+    """Правки, похожие на набор текста: вставка и удаление слов, новые шаги и ветвления, удаление предложений"""
+    rng = random.Random(seed)
+    for _ in range(count):
+        choice = rng.random()
+        position = rng.randrange(len(text))
+        if choice < 0.35:
+            word = rng.choice(STEPS).split()[-1]
+            text = f"{text[:position]} {word}{text[position:]}"
+        elif choice < 0.55:
+            text = text[:position] + text[position + rng.randint(1, 8):]
+        elif choice < 0.75:
+            end = text.find('.', position)
+            if end >= 0:
+                text = f"{text[:end + 1]} {rng.choice(STEPS)}.{text[end + 1:]}"
+        elif choice < 0.9:
+            end = text.find('.', position)
+            if end >= 0:
+                branch = f"Если {rng.choice(CONDITIONS)}, то {rng.choice(STEPS).lower()}, иначе {rng.choice(STEPS).lower()}."
+                text = f"{text[:end + 1]} {branch}{text[end + 1:]}"
+        else:
+            start = text.rfind('.', 0, position)
+            end = text.find('.', position)
+            if end >= 0:
+                text = text[:start + 1] + text[end + 1:]
+        yield text
+
+
+def percentiles(samples):
+    ordered = sorted(samples)
+
+    def pick(q):
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000
+
+    return pick(0.5), pick(0.9), pick(0.99), ordered[-1] * 1000
+
+
+def run(sizes, count):
+    parser = TextToGraphParser()
+    preprocessor = TextPreprocessor()
+    code_generator = DiagramCodeGenerator()
+    template_engine = TemplateEngine()
+
+    def artifacts(graph):
+        context = AnalysisContext.from_graph(graph)
+        code_generator.generate(graph, format='plantuml', context=context)
+        template_engine.render_description(graph, context)
+
+    print(f"{'chars':>8} {'mode':>12} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9} {'max ms':>9} {'full share':>11}")
+    for size in sizes:
+        text = procedural_text(size, seed=size)
+        incremental = IncrementalTextParser(parser, preprocessor)
+        incremental.update(text)
+
+        parse_times, incremental_times, full_times, with_artifacts = [], [], [], []
+        full_reparses = 0
+        for edited in edits(text, count, seed=size):
+            start = time.perf_counter()
+            result = incremental.update(edited)
+            incremental_times.append(time.perf_counter() - start)
+            full_reparses += result['stats']['full_reparse']
+            if result['changed']:
+                artifacts(incremental.graph)
+            with_artifacts.append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            graph = parser.parse(preprocessor.preprocess(edited))
+            parse_times.append(time.perf_counter() - start)
+            artifacts(graph)
+            full_times.append(time.perf_counter() - start)
+
+        share = f"{full_reparses / count:.1%}"
+        rows = [
+            ('incremental', incremental_times, share),
+            ('full parse', parse_times, ''),
+            ('inc + code', with_artifacts, ''),
+            ('full + code', full_times, ''),
+        ]
+        for name, samples, note in rows:
+            p50, p90, p99, worst = percentiles(samples)
+            print(f"{size:>8} {name:>12} {p50:>9.2f} {p90:>9.2f} {p99:>9.2f} {worst:>9.2f} {note:>11}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Edit-latency benchmark for incremental re-parsing in edit sessions")
+    parser.add_argument("--sizes", type=int, nargs='+', default=[5_000, 50_000], help="Text lengths in characters")
+    parser.add_argument("--edits", type=int, default=200, help="Edits per text")
+    args = parser.parse_args()
+
+    run(args.sizes, args.edits)
+
+
+if __name__ == "__main__":
+    main()
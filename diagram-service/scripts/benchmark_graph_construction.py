@@ -0,0 +1,71 @@
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.ml_pipeline.detector import BoundingBox
+from src.ml_pipeline.graph_constructor import GraphConstructor
+
+
+def generate_boxes(count, seed=0):
+    """Диаграмма-решетка со случайным сдвигом: примерно как крупная BPMN-схема"""
+    rng = random.Random(seed)
+    columns = max(1, int(count ** 0.5))
+    bboxes = []
+    for idx in range(count):
+        row, column = divmod(idx, columns)
+        x = column * 160 + rng.uniform(-30, 30)
+        y = row * 90 + rng.uniform(-20, 20)
+        bboxes.append(BoundingBox(x, y, x + 120, y + 50, 0.9, 0, "process"))
+    return bboxes
+
+
+def naive_edges(constructor, bboxes):
+    """Прежний полный перебор пар - эталон для сравнения"""
+    edges = []
+    for i, bbox1 in enumerate(bboxes):
+        for j, bbox2 in enumerate(bboxes):
+            if i != j and constructor._should_connect(bbox1, bbox2):
+                edges.append((f"node_{i}", f"node_{j}"))
+    return edges
+
+
+def run(sizes, naive_limit):
+    constructor = GraphConstructor()
+    print(f"{'boxes':>8} {'edges':>10} {'grid, s':>10} {'naive, s':>10} {'identical':>10}")
+
+    for size in sizes:
+        bboxes = generate_boxes(size)
+
+        start = time.perf_counter()
+        graph = constructor.construct(bboxes, {})
+        grid_time = time.perf_counter() - start
+        edges = list(graph.edges())
+
+        naive_time = None
+        identical = "-"
+        if size <= naive_limit:
+            start = time.perf_counter()
+            expected = naive_edges(constructor, bboxes)
+            naive_time = time.perf_counter() - start
+            identical = "yes" if edges == expected else "NO"
+
+        naive_column = f"{naive_time:>10.3f}" if naive_time is not None else f"{'skipped':>10}"
+        print(f"{size:>8} {len(edges):>10} {grid_time:>10.3f} {naive_column} {identical:>10}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Scaling benchmark for GraphConstructor neighbour search")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000, 10000])
+    parser.add_argument("--naive-limit", type=int, default=2000,
+                        help="largest size for which the O(n^2) reference is also timed")
+    args = parser.parse_args()
+
+    run(args.sizes, args.naive_limit)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+import argparse
+import sys
+import time
+import tracemalloc
+from collections import deque
+from pathlib import Path
+
+import networkx as nx
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.utils.compact_graph import CompactGraph
+
+
+TYPES = ['start', 'process', 'decision', 'process', 'data']
+
+
+def build(graph, count):
+    """Схема как у GraphConstructor: цепочка узлов с ветвлением у каждого третьего"""
+    for idx in range(count):
+        x = float(idx % 40) * 160.0
+        y = float(idx // 40) * 90.0
+        graph.add_node(
+            f"node_{idx}",
+            type=TYPES[idx % len(TYPES)],
+            label=f"Шаг {idx}",
+            position=[x + 60.0, y + 25.0],
+            bbox=[x, y, x + 120.0, y + 50.0],
+            confidence=0.9
+        )
+    for idx in range(count - 1):
+        graph.add_edge(f"node_{idx}", f"node_{idx + 1}", confidence=0.9)
+        if idx % 3 == 0 and idx + 2 < count:
+            graph.add_edge(f"node_{idx}", f"node_{idx + 2}", label="Нет", confidence=0.6)
+    return graph
+
+
+def measure_memory(factory, count):
+    tracemalloc.start()
+    graph = build(factory(), count)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return graph, current / count
+
+
+def bfs(graph, start):
+    seen = {start}
+    queue = deque([start])
+    while queue:
+        node = queue.popleft()
+        for successor in graph.successors(node):
+            if successor not in seen:
+                seen.add(successor)
+                queue.append(successor)
+    return len(seen)
+
+
+def bfs_csr(graph, start):
+    """Обход по целочисленным индексам CSR, без строковых идентификаторов"""
+    indptr, indices, _ = graph.out_csr()
+    indptr = indptr.tolist()
+    indices = indices.tolist()
+    seen = bytearray(graph.number_of_nodes())
+    first = graph.node_index(start)
+    seen[first] = 1
+    queue = deque([first])
+    while queue:
+        node = queue.popleft()
+        for successor in indices[indptr[node]:indptr[node + 1]]:
+            if not seen[successor]:
+                seen[successor] = 1
+                queue.append(successor)
+    return sum(seen)
+
+
+def timed(func, *args, repeat=3):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def run(sizes):
+    print(f"{'nodes':>8} {'nx B/node':>10} {'compact B/node':>15} {'nx bfs, s':>10} {'compact bfs, s':>15} {'csr bfs, s':>11}")
+    for size in sizes:
+        nx_graph, nx_memory = measure_memory(nx.DiGraph, size)
+        compact, compact_memory = measure_memory(CompactGraph, size)
+        compact.out_csr()
+
+        nx_time = timed(bfs, nx_graph, "node_0")
+        compact_time = timed(bfs, compact, "node_0")
+        csr_time = timed(bfs_csr, compact, "node_0")
+
+        print(
+            f"{size:>8} {nx_memory:>10.0f} {compact_memory:>15.0f} "
+            f"{nx_time:>10.4f} {compact_time:>15.4f} {csr_time:>11.4f}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Memory and traversal benchmark: networkx vs CompactGraph")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000, 100000])
+    args = parser.parse_args()
+
+    run(args.sizes)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import networkx as nx
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from scripts.benchmark_text_grammar import procedural_text
+from src.generative_pipeline.layered_layout import LayeredLayout, Layout
+from src.generative_pipeline.text_parser import TextToGraphParser
+from src.utils.graph_utils import as_networkx, calculate_node_levels
+
+
+def longest_path_layers(graph):
+    """Прежняя укладка: слой по самому длинному пути, порядок в слое - порядок добавления узлов"""
+    levels = calculate_node_levels(graph)
+    layers = {}
+    for node in graph.nodes():
+        layers.setdefault(levels.get(node, 0), []).append(node)
+    pos = {}
+    for level, nodes in layers.items():
+        offset = (len(nodes) - 1) / 2
+        for order, node in enumerate(nodes):
+            pos[node] = (order - offset, -float(level))
+    return pos
+
+
+def edge_segments(graph, pos, layout=None):
+    """Отрезки ребер в том виде, как они рисуются: через изломы укладки или напрямую"""
+    segments = []
+    ids = list(graph.nodes)
+    src, dst = graph.edge_arrays()
+    for edge_idx, (source, target) in enumerate(zip(src.tolist(), dst.tolist())):
+        source, target = ids[source], ids[target]
+        if source == target:
+            continue
+        points = [pos[source]] + (layout.edge_bends(edge_idx) if layout is not None else []) + [pos[target]]
+        points = [tuple(map(float, point)) for point in points]
+        for (x1, y1), (x2, y2) in zip(points, points[1:]):
+            segments.append((min(y1, y2), max(y1, y2), x1, y1, x2, y2, (source, target)))
+    return segments
+
+
+def count_crossings(segments):
+    """Пересечения отрезков разных ребер (перебор пар в окне по y), без ребер с общим концом"""
+    segments = sorted(segments)
+
+    def orientation(ax, ay, bx, by, cx, cy):
+        value = (bx - ax) * (cy - ay) - (by - ay) * (cx - ax)
+        return (value > 1e-9) - (value < -1e-9)
+
+    crossings = 0
+    for i, first in enumerate(segments):
+        for second in segments[i + 1:]:
+            if second[0] >= first[1]:
+                break
+            if set(first[6]) & set(second[6]):
+                continue
+            _, _, ax, ay, bx, by, _ = first
+            _, _, cx, cy, dx, dy, _ = second
+            if (orientation(ax, ay, bx, by, cx, cy) * orientation(ax, ay, bx, by, dx, dy) < 0
+                    and orientation(cx, cy, dx, dy, ax, ay) * orientation(cx, cy, dx, dy, bx, by) < 0):
+                crossings += 1
+    return crossings
+
+
+def graphviz_dot(nx_graph):
+    try:
+        import pygraphviz  # noqa: F401
+    except ImportError:
+        return None
+    return lambda: nx.nx_agraph.graphviz_layout(nx_graph, prog='dot')
+
+
+def measure(fn, repeat):
+    times = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - start)
+    return float(np.median(times)) * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark diagram layout engines")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[5000, 40000, 150000], help="Description sizes in characters")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--max-spring-nodes", type=int, default=2000, help="Skip spring_layout on larger graphs")
+    parser.add_argument("--max-kamada-nodes", type=int, default=500, help="Skip kamada_kawai_layout on larger graphs")
+    parser.add_argument("--max-crossing-nodes", type=int, default=3000, help="Skip crossing counts on larger graphs")
+    args = parser.parse_args()
+
+    engine = LayeredLayout()
+    print(f"{'nodes':>7} {'edges':>7} {'layout':<22} {'ms':>10} {'crossings':>10}")
+    for size in args.sizes:
+        graph = TextToGraphParser().parse(procedural_text(size))
+        nx_graph = as_networkx(graph)
+        nodes, edges = graph.number_of_nodes(), graph.number_of_edges()
+
+        candidates = [
+            ("layered (sugiyama)", lambda: engine.compute(graph, 'vertical')),
+            ("longest path only", lambda: longest_path_layers(graph)),
+        ]
+        if nodes <= args.max_spring_nodes:
+            candidates.append(("nx.spring_layout", lambda: nx.spring_layout(nx_graph, seed=0)))
+        if nodes <= args.max_kamada_nodes:
+            candidates.append(("nx.kamada_kawai", lambda: nx.kamada_kawai_layout(nx_graph)))
+        dot = graphviz_dot(nx_graph)
+        if dot is not None:
+            candidates.append(("graphviz dot", dot))
+
+        for name, fn in candidates:
+            repeat = 1 if name.startswith("nx.") or name == "graphviz dot" else args.repeat
+            elapsed, result = measure(fn, repeat)
+            layout = result if isinstance(result, Layout) else None
+            pos = layout.positions() if layout is not None else result
+            crossings = count_crossings(edge_segments(graph, pos, layout)) if nodes <= args.max_crossing_nodes else '-'
+            print(f"{nodes:>7} {edges:>7} {name:<22} {elapsed:>10.1f} {crossings:>10}")
+        if dot is None:
+            print(f"{nodes:>7} {edges:>7} {'graphviz dot':<22} {'n/a (pygraphviz not installed)':>21}")
+
+
+if __name__ == "__main__":
+    main()
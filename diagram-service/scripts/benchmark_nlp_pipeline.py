@@ -0,0 +1,82 @@
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.generative_pipeline.nlp_pipeline import NLPPipeline
+from src.generative_pipeline.text_lexer import split_raw_sentences
+from src.generative_pipeline.text_parser import TextToGraphParser
+
+
+SENTENCES = [
+    "Получить заявку от клиента.",
+    "Когда оплата подтверждена, отправить товар клиенту.",
+    "Проверить остатки и зарезервировать товар.",
+    "В случае ошибки сообщить администратору.",
+    "Затем необходимо сохранить результат в журнал.",
+    "Менеджер должен согласовать скидку.",
+    "Если адрес указан, то рассчитать доставку, иначе запросить адрес.",
+    "Записать данные в базу, обновить кэш и уведомить пользователя.",
+    "При условии что клиент постоянный, начислить бонусы.",
+]
+
+
+def descriptions(count, sentences_per_description, seed=0):
+    rng = random.Random(seed)
+    return [
+        ' '.join(["Начало."] + [rng.choice(SENTENCES) for _ in range(sentences_per_description)] + ["Конец."])
+        for _ in range(count)
+    ]
+
+
+def measure(function):
+    start = time.perf_counter()
+    result = function()
+    return result, time.perf_counter() - start
+
+
+def run(backends, count, sentences_per_description):
+    texts = descriptions(count, sentences_per_description)
+    sentences = [piece.strip() for text in texts for piece in split_raw_sentences(text) if piece.strip()]
+
+    parser, init_time = measure(TextToGraphParser)
+    _, rules_time = measure(lambda: [parser.parse(text) for text in texts])
+    print(f"{'mode':>36} {'startup s':>10} {'seconds':>9} {'sentences/s':>12}")
+    print(f"{'rules only':>36} {init_time:>10.3f} {rules_time:>9.3f} {len(sentences) / rules_time:>12.0f}")
+
+    for backend in backends:
+        nlp = NLPPipeline(backend)
+        available, load_time = measure(nlp.is_available)
+        if not available:
+            print(f"{backend:>36} not installed or model missing")
+            continue
+
+        nlp_parser = TextToGraphParser(nlp)
+        # Так делать не нужно: отдельный вызов модели на каждое предложение
+        _, per_sentence = measure(lambda: [nlp.analyze([sentence]) for sentence in sentences])
+        _, per_description = measure(lambda: [nlp_parser.parse(text) for text in texts])
+        _, per_batch = measure(lambda: [nlp_parser.parse(text, use_nlp=False) for text in nlp_parser.apply_nlp(texts)])
+
+        for mode, seconds in (
+            (f"{backend}: call per sentence", per_sentence),
+            (f"{backend}: pipe per description", per_description),
+            (f"{backend}: pipe per batch", per_batch),
+        ):
+            print(f"{mode:>36} {load_time:>10.3f} {seconds:>9.3f} {len(sentences) / seconds:>12.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Startup time and throughput of the NLP pipeline against rules only")
+    parser.add_argument("--backends", nargs='+', default=['natasha', 'spacy'], help="NLP backends to compare")
+    parser.add_argument("--descriptions", type=int, default=200, help="Descriptions in the batch")
+    parser.add_argument("--sentences", type=int, default=10, help="Sentences per description")
+    args = parser.parse_args()
+
+    run(args.backends, args.descriptions, args.sentences)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+import argparse
+import sys
+import time
+from concurrent.futures import wait
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from scripts.benchmark_text_grammar import procedural_text
+from src.generative_pipeline.render_pool import RenderPool
+from src.generative_pipeline.text_parser import TextToGraphParser
+from src.generative_pipeline.visualizer import GraphVisualizer
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark renderer process pool: throughput, timeouts, recycling")
+    parser.add_argument("--jobs", type=int, default=40)
+    parser.add_argument("--workers", type=int, default=0, help="0 = number of CPU cores")
+    parser.add_argument("--timeout", type=float, default=5.0, help="Per-job timeout, seconds")
+    parser.add_argument("--max-jobs", type=int, default=10, help="Jobs per worker before recycling")
+    parser.add_argument("--chars", type=int, default=400, help="Description size of a regular job")
+    parser.add_argument("--slow-every", type=int, default=10, help="Every N-th job is a huge graph that exceeds the timeout (0 = none)")
+    parser.add_argument("--format", default="png", choices=["png", "svg"])
+    args = parser.parse_args()
+
+    import matplotlib
+    matplotlib.use('Agg')
+
+    text_parser = TextToGraphParser()
+    graphs = [text_parser.parse(procedural_text(args.chars, seed=seed)) for seed in range(8)]
+    slow_graph = text_parser.parse(procedural_text(60000, seed=1))
+
+    # В процессе сервера, последовательно - как /generate рисовал раньше
+    visualizer = GraphVisualizer()
+    visualizer.render(graphs[0], format=args.format)
+    regular_jobs = [graphs[index % len(graphs)] for index in range(args.jobs)]
+    start = time.perf_counter()
+    for graph in regular_jobs:
+        visualizer.render(graph, format=args.format)
+    in_process = time.perf_counter() - start
+    print(f"in-process: {args.jobs} jobs in {in_process:.2f}s, {args.jobs / in_process:.2f} jobs/s")
+
+    pool = RenderPool(args.workers, job_timeout=args.timeout, max_jobs=args.max_jobs)
+    try:
+        # Запуск и прогрев процессов не входят в замер
+        start = time.perf_counter()
+        pool.submit(graphs[0], format=args.format).result()
+        print(f"pool startup (spawn + warm-up): {time.perf_counter() - start:.2f}s, workers={pool.workers}")
+
+        jobs = []
+        for index in range(args.jobs):
+            slow = args.slow_every and index % args.slow_every == args.slow_every - 1
+            jobs.append(slow_graph if slow else regular_jobs[index])
+        start = time.perf_counter()
+        futures = [pool.submit(graph, format=args.format) for graph in jobs]
+        wait(futures)
+        elapsed = time.perf_counter() - start
+
+        timed_out = sum(1 for future in futures if future.exception() is not None and 'timeout_sec' in getattr(future.exception(), 'details', {}))
+        failed = sum(1 for future in futures if future.exception() is not None)
+        print(f"pool: {len(jobs)} jobs in {elapsed:.2f}s, {(len(jobs) - failed) / elapsed:.2f} jobs/s, {timed_out} timed out, {failed - timed_out} other failures")
+        print(f"pool stats: {pool.stats()}")
+    finally:
+        pool.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.ml_pipeline.semantic_interpreter import SemanticInterpreter
+from src.utils.graph_utils import create_directed_graph, add_node, add_edge, calculate_node_levels
+
+
+WORDS = [
+    'начало', 'проверить', 'остаток', 'если', 'заказ', 'отправить', 'клиенту', 'данные',
+    'обработка', 'платежа', 'конец', 'ввод', 'значения', 'счетчик', 'цикл', 'вывод',
+    'start', 'process', 'order', 'check', 'stock', 'input', 'finish', 'report'
+]
+
+
+def generate_graph(count, seed=0):
+    """Схема с ветвлениями и возвратами: подписи из 3-8 слов"""
+    rng = random.Random(seed)
+    graph = create_directed_graph()
+    for idx in range(count):
+        label = ' '.join(rng.choice(WORDS) for _ in range(rng.randint(3, 8)))
+        add_node(graph, f"node_{idx}", type='process', label=label)
+    for idx in range(count - 1):
+        add_edge(graph, f"node_{idx}", f"node_{idx + 1}")
+        if rng.random() < 0.2 and idx + 3 < count:
+            add_edge(graph, f"node_{idx}", f"node_{idx + 3}", label='Нет')
+        if rng.random() < 0.05 and idx > 5:
+            add_edge(graph, f"node_{idx}", f"node_{idx - 5}")
+    return graph
+
+
+def legacy_classify(interpreter, label):
+    """Прежняя проверка: все списки ключевых слов подряд через подстроки"""
+    for node_type, keywords in interpreter.shape_keywords.items():
+        if any(keyword in label for keyword in keywords):
+            return node_type
+    return None
+
+
+def legacy_interpret(interpreter, graph):
+    """Прежние отдельные проходы по графу (без перечисления циклов) - эталон результата"""
+    original_types = {}
+    for node in graph.nodes():
+        label = graph.nodes[node].get('label', '').lower()
+        original_types[node] = graph.nodes[node].get('type', 'process')
+        node_type = legacy_classify(interpreter, label)
+        if node_type is not None:
+            graph.nodes[node]['type'] = node_type
+        if len(list(graph.successors(node))) > 1 and original_types[node] != 'decision':
+            graph.nodes[node]['type'] = 'decision'
+
+    levels = calculate_node_levels(graph)
+    for node in graph.nodes():
+        graph.nodes[node]['level'] = levels.get(node, 0)
+    for node in graph.nodes():
+        graph.nodes[node]['out_degree'] = len(list(graph.successors(node)))
+        graph.nodes[node]['in_degree'] = len(list(graph.predecessors(node)))
+
+    for node in graph.nodes():
+        if graph.nodes[node].get('type', 'process') == 'decision':
+            successors = list(graph.successors(node))
+            if len(successors) == 2:
+                graph.edges[node, successors[0]]['condition'] = 'true'
+                graph.edges[node, successors[1]]['condition'] = 'false'
+
+    nodes = [dict(graph.nodes[node], id=node) for node in graph.nodes()]
+    edges = [dict(graph.edges[s, t], source=s, target=t) for s, t in graph.edges()]
+    return nodes, edges
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def run(sizes):
+    interpreter = SemanticInterpreter()
+    print(f"{'nodes':>8} {'keywords old, s':>16} {'keywords new, s':>16} {'interpret old, s':>17} {'interpret new, s':>17} {'identical':>10}")
+
+    for size in sizes:
+        graph = generate_graph(size)
+        labels = [graph.nodes[node]['label'].lower() for node in graph.nodes()]
+
+        old_types, old_keywords = timed(lambda: [legacy_classify(interpreter, label) for label in labels])
+        new_types, new_keywords = timed(lambda: [interpreter.keyword_matcher.match(label) for label in labels])
+
+        (old_nodes, old_edges), old_time = timed(legacy_interpret, interpreter, generate_graph(size))
+        result, new_time = timed(interpreter.interpret, generate_graph(size))
+        generic = interpreter.interpret(generate_graph(size).to_networkx())
+
+        identical = (
+            old_types == new_types
+            and old_nodes == result['nodes'] == generic['nodes']
+            and old_edges == result['edges'] == generic['edges']
+        )
+        print(
+            f"{size:>8} {old_keywords:>16.4f} {new_keywords:>16.4f} "
+            f"{old_time:>17.4f} {new_time:>17.4f} {'yes' if identical else 'NO':>10}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark for single-pass semantic interpretation")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 5000, 20000])
+    args = parser.parse_args()
+
+    run(args.sizes)
+
+
+if __name__ == "__main__":
+    main()
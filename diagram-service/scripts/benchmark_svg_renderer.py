@@ -0,0 +1,60 @@
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from scripts.benchmark_text_grammar import procedural_text
+from src.generative_pipeline.svg_renderer import png_rasterizer_available, svg_to_png
+from src.generative_pipeline.text_parser import TextToGraphParser
+from src.generative_pipeline.visualizer import GraphVisualizer
+
+
+def measure(fn, repeat):
+    times = []
+    result = b''
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - start)
+    return float(np.median(times)) * 1000, len(result)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark built-in SVG renderer against matplotlib")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[300, 1500, 5000], help="Description sizes in characters")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--dpi", type=int, default=150)
+    args = parser.parse_args()
+
+    import matplotlib
+    matplotlib.use('Agg')
+
+    visualizer = GraphVisualizer()
+    print(f"{'nodes':>6} {'renderer':<24} {'ms p50':>9} {'bytes':>10}")
+    for size in args.sizes:
+        graph = TextToGraphParser().parse(procedural_text(size, seed=4))
+        nodes = graph.number_of_nodes()
+        # Укладка общая для всех отрисовщиков и кэшируется в графе - меряется только отрисовка
+        visualizer.compute_layout(graph, 'vertical')
+
+        candidates = [
+            ("matplotlib png", lambda: visualizer._render_with_matplotlib(graph, 'vertical', 'png', args.dpi)),
+            ("matplotlib svg", lambda: visualizer._render_with_matplotlib(graph, 'vertical', 'svg', args.dpi)),
+            ("built-in svg", lambda: visualizer.render_svg(graph, 'vertical')),
+        ]
+        if png_rasterizer_available():
+            candidates.append(("built-in svg -> png", lambda: svg_to_png(visualizer.render_svg(graph, 'vertical'), args.dpi)))
+
+        for name, fn in candidates:
+            elapsed, size_bytes = measure(fn, args.repeat)
+            print(f"{nodes:>6} {name:<24} {elapsed:>9.1f} {size_bytes:>10}")
+        if not png_rasterizer_available():
+            print(f"{nodes:>6} {'built-in svg -> png':<24} {'n/a (resvg-py not installed)':>20}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.generative_pipeline.text_parser import TextToGraphParser
+
+
+STEPS = [
+    "Получить заказ от клиента",
+    "Рассчитать стоимость доставки",
+    "Списать оплату",
+    "Отправить уведомление",
+    "Сохранить результат в журнал",
+]
+
+CONDITIONS = [
+    "товар есть на складе",
+    "оплата подтверждена",
+    "клиент постоянный",
+    "адрес указан",
+]
+
+
+def procedural_block(rng, depth):
+    """Случайный фрагмент: шаги, ветвления с иначе, циклы пока/повторять с вложенностью до depth"""
+    choice = rng.random()
+    if depth <= 0 or choice < 0.5:
+        return f"{rng.choice(STEPS)}."
+    if choice < 0.7:
+        return (
+            f"Если {rng.choice(CONDITIONS)}, то: {procedural_block(rng, depth - 1)} "
+            f"Иначе: {procedural_block(rng, depth - 1)} Конец если."
+        )
+    if choice < 0.85:
+        return f"Пока {rng.choice(CONDITIONS)}: {procedural_block(rng, depth - 1)} Конец цикла."
+    return f"Повторять: {procedural_block(rng, depth - 1)} До тех пор пока {rng.choice(CONDITIONS)}."
+
+
+def procedural_text(length, seed=0):
+    rng = random.Random(seed)
+    parts = ["Начало."]
+    size = len(parts[0])
+    while size < length:
+        part = procedural_block(rng, 3)
+        parts.append(part)
+        size += len(part) + 1
+    parts.append("Конец.")
+    return ' '.join(parts)
+
+
+def adversarial_texts(length):
+    """Глубокая вложенность и незакрытые конструкции"""
+    nested = "Если а, то: " * (length // 24) + "шаг." + " Конец если." * (length // 24)
+    return {
+        'nested if': nested[:length],
+        'unclosed if': ("если а то " * (length // 10 + 1))[:length],
+        'unclosed loops': ("Пока а: Повторять: " * (length // 19 + 1))[:length],
+        'stray closers': ("Конец если. Иначе. Конец цикла. " * (length // 32 + 1))[:length],
+    }
+
+
+def run(sizes, repeat):
+    parser = TextToGraphParser()
+
+    print(f"{'case':>16} {'chars':>9} {'tokens':>8} {'nodes':>7} {'seconds':>9} {'chars/s':>11}")
+    cases = [(f"procedural {size}", procedural_text(size)) for size in sizes]
+    cases.extend(adversarial_texts(sizes[0]).items())
+
+    for name, text in cases:
+        tokens = len(parser.lexer.tokens(text))
+        best = float('inf')
+        graph = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            graph = parser.parse(text)
+            best = min(best, time.perf_counter() - start)
+        print(f"{name:>16} {len(text):>9} {tokens:>8} {graph.number_of_nodes():>7} {best:>9.4f} {len(text) / best:>11.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark for the recursive-descent description grammar")
+    parser.add_argument("--sizes", type=int, nargs='+', default=[10_000, 100_000, 1_000_000], help="Text lengths in characters")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per case, best time is reported")
+    args = parser.parse_args()
+
+    run(args.sizes, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+import argparse
+import random
+import re
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.generative_pipeline.text_parser import TextToGraphParser
+
+
+# Шаблоны прежнего построчного разбора на re: ленивые группы `.+?` перебираются с возвратами
+CONDITION_PATTERNS = [
+    r'если\s+(.+?)\s*,?\s*то\s+(.+?)(?:иначе|else)\s+(.+?)(?=\.|$)',
+    r'if\s+(.+?)\s*then\s+(.+?)(?:else)\s+(.+?)(?=\.|$)',
+    r'проверить\s+(.+?)(?=\.|$)',
+    r'условие[:\s]+(.+?)(?=\.|$)',
+]
+
+STEP_PATTERNS = [
+    r'(?:шаг|step)\s*\d+[:\.]?\s*(.+?)(?=шаг|step|\.|$)',
+    r'(?:затем|then|далее|next)[:\s]+(.+?)(?=затем|then|далее|next|\.|$)',
+    r'(?:выполнить|execute|сделать|do)[:\s]+(.+?)(?=\.|$)',
+]
+
+
+SENTENCES = [
+    "Получить заказ от клиента",
+    "Проверить наличие товара на складе",
+    "Если товар есть, то зарезервировать его, иначе сообщить клиенту",
+    "Затем рассчитать стоимость доставки",
+    "Выполнить: списать оплату",
+    "Шаг 3: отправить уведомление",
+    "If payment is confirmed then ship the order else cancel it",
+    "Условие: клиент постоянный",
+    "Сохранить результат в журнал",
+]
+
+
+def realistic_text(length, seed=0):
+    rng = random.Random(seed)
+    parts = ["Начало"]
+    while sum(len(part) + 2 for part in parts) < length:
+        parts.append(rng.choice(SENTENCES))
+    parts.append("Конец")
+    return '. '.join(parts) + '.'
+
+
+def pathological_texts(length):
+    """Входы, на которых ленивые группы re перебирают варианты с возвратами"""
+    return {
+        'if-then without else': ("если а то " * (length // 10 + 1))[:length],
+        'if then chain': ("если " + "а то " * length)[:length],
+        'long whitespace': "если" + " " * (length - 6) + "то",
+        'check run-on': "проверить " + "x" * (length - 10),
+        'english chain': ("if a then " * (length // 10 + 1))[:length],
+        'step chain': ("шаг 1 затем " * (length // 12 + 1))[:length],
+    }
+
+
+def parse_condition(sentence):
+    for pattern in CONDITION_PATTERNS:
+        match = re.search(pattern, sentence, re.IGNORECASE)
+        if match:
+            groups = match.groups()
+            if len(groups) >= 3:
+                return {
+                    'condition': groups[0].strip(),
+                    'true_branch': groups[1].strip(),
+                    'false_branch': groups[2].strip()
+                }
+            elif len(groups) >= 1:
+                return {'condition': groups[0].strip()}
+    return {'condition': sentence.strip()}
+
+
+def legacy_extract_steps(parser, text):
+    steps = []
+    for pattern in STEP_PATTERNS:
+        steps.extend(m.strip() for m in re.findall(pattern, text, re.IGNORECASE))
+    return steps or parser._split_into_sentences(text)
+
+
+def legacy_work(parser, text):
+    conditions = [parse_condition(sentence) for sentence in parser._split_into_sentences(text)]
+    return conditions, legacy_extract_steps(parser, text)
+
+
+def new_work(parser, text):
+    """Разбор по токенам лексера: грамматика и шаги без регулярных выражений с возвратами"""
+    return parser.parse(text, use_nlp=False), parser.extract_steps(text)
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def run(length, legacy_limit):
+    parser = TextToGraphParser()
+    cases = {'realistic': realistic_text(length)}
+    cases.update(pathological_texts(length))
+
+    print(f"{'case':>22} {'chars':>7} {'legacy, s':>10} {'new, s':>8} {'steps':>6}")
+    for name, text in cases.items():
+        (_, steps), new_time = timed(new_work, parser, text)
+
+        # Прежняя реализация на патологических входах работает минутами - проверяем на префиксе
+        if len(text) <= legacy_limit or name == 'realistic':
+            _, old_time = timed(legacy_work, parser, text)
+            legacy_cell = f"{old_time:>10.4f}"
+        else:
+            _, old_time = timed(legacy_work, parser, text[:legacy_limit])
+            legacy_cell = f"{'>' + format(old_time, '.2f') + '*':>10}"
+
+        print(f"{name:>22} {len(text):>7} {legacy_cell} {new_time:>8.4f} {len(steps):>6}")
+
+    print(f"* legacy checked on the first {legacy_limit} chars; its time is a lower bound for the full input")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the token-based text parser against the legacy re patterns")
+    parser.add_argument("--length", type=int, default=5000, help="Characters per input")
+    parser.add_argument("--legacy-limit", type=int, default=1000, help="Longest pathological input given to the legacy re path")
+    args = parser.parse_args()
+
+    run(args.length, args.legacy_limit)
+
+
+if __name__ == "__main__":
+    main()
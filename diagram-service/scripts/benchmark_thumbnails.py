@@ -0,0 +1,76 @@
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from scripts.benchmark_text_grammar import procedural_text
+from src.generative_pipeline.svg_renderer import png_rasterizer_available
+from src.generative_pipeline.text_parser import TextToGraphParser
+from src.generative_pipeline.visualizer import GraphVisualizer
+from src.utils.image_utils import bytes_to_numpy, make_thumbnail
+from src.utils.thumbnail_cache import ThumbnailCache, thumbnail_key
+
+
+def measure(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return float(np.median(times)) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark preview thumbnails: from the rendered raster vs decoding the PNG")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 400, 2000], help="Description sizes in characters")
+    parser.add_argument("--thumbnail-size", type=int, default=256)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    import matplotlib
+    matplotlib.use('Agg')
+
+    visualizer = GraphVisualizer()
+    print(f"{'nodes':>6} {'step':<40} {'ms p50':>9}")
+    for size in args.sizes:
+        graph = TextToGraphParser().parse(procedural_text(size, seed=1))
+        nodes = graph.number_of_nodes()
+        visualizer.compute_layout(graph, 'vertical')
+
+        # Прежний путь: savefig рисует фигуру второй раз, миниатюра - декодированием готового PNG
+        def savefig():
+            import io
+            import matplotlib.pyplot as plt
+            fig, dpi = visualizer._draw_with_matplotlib(graph, 'vertical', 150)
+            buffer = io.BytesIO()
+            fig.savefig(buffer, format='png', dpi=dpi, bbox_inches='tight')
+            plt.close(fig)
+            return buffer.getvalue()
+        png = savefig()
+        print(f"{nodes:>6} {'matplotlib savefig png':<40} {measure(savefig, args.repeat):>9.0f}")
+        print(f"{nodes:>6} {'  + thumbnail by decoding the png':<40} {measure(lambda: make_thumbnail(bytes_to_numpy(png), args.thumbnail_size), args.repeat):>9.1f}")
+
+        def render(size):
+            return visualizer.render_with_thumbnail(graph, 'vertical', 'png', 150, thumbnail_size=size)
+
+        print(f"{nodes:>6} {'matplotlib single draw png':<40} {measure(lambda: render(0), args.repeat):>9.0f}")
+        # Отрисовка на одном ядре шумит сильнее, чем стоит миниатюра, поэтому шаг меряется отдельно
+        pixels = visualizer._matplotlib_pixels(graph, 'vertical', 150)
+        print(f"{nodes:>6} {'  + thumbnail from the raster':<40} {measure(lambda: make_thumbnail(pixels, args.thumbnail_size), args.repeat):>9.1f}")
+
+        if png_rasterizer_available():
+            print(f"{nodes:>6} {'svg thumbnail from the layout':<40} {measure(lambda: visualizer._svg_thumbnail(graph, 'vertical', args.thumbnail_size), args.repeat):>9.1f}")
+
+        cache = ThumbnailCache(max_size=16)
+        image, thumbnail = render(args.thumbnail_size)
+        key = thumbnail_key(image)
+        cache.put(key, thumbnail)
+        print(f"{nodes:>6} {'cached preview (hash + lookup)':<40} {measure(lambda: cache.get(thumbnail_key(image)), args.repeat):>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
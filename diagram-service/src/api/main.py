@@ -9,7 +9,9 @@ from pathlib import Path
 from src.core.config import settings
 from src.core.logger import app_logger
 from src.core.exceptions import DiagramServiceException
-from src.api.routes import analyze, generate, mock_data
+from src.core.metrics import metrics
+from src.api.routes import analyze, generate, sessions, diagrams, previews, mock_data
+from src.generative_pipeline.render_pool import shutdown_render_pool
 from src.api.models.responses import HealthResponse, ErrorResponse
 
 
@@ -19,6 +21,7 @@ async def lifespan(app: FastAPI):
     app_logger.info(f"Device: {settings.device}")
     app_logger.info(f"Debug mode: {settings.debug}")
     yield
+    shutdown_render_pool()
     app_logger.info(f"Shutting down {settings.app_name}")
 
 
@@ -100,6 +103,11 @@ async def health_check():
     )
 
 
+@app.get("/metrics", tags=["Health"])
+async def get_metrics():
+    return metrics.snapshot()
+
+
 @app.get("/", tags=["Root"])
 async def root():
     from fastapi.responses import FileResponse
@@ -117,4 +125,7 @@ async def root():
 
 app.include_router(analyze.router, prefix=settings.api_prefix, tags=["Analyze"])
 app.include_router(generate.router, prefix=settings.api_prefix, tags=["Generate"])
+app.include_router(sessions.router, prefix=settings.api_prefix, tags=["Edit Sessions"])
+app.include_router(diagrams.router, prefix=settings.api_prefix, tags=["Diagram Tiles"])
+app.include_router(previews.router, prefix=settings.api_prefix, tags=["Previews"])
 app.include_router(mock_data.router, prefix=settings.api_prefix, tags=["Mock Demo"])
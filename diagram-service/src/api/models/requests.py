@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field, field_validator
-from typing import Literal, Optional
+from typing import List, Literal, Optional
 
 
 class AnalyzeRequest(BaseModel):
@@ -39,3 +39,49 @@ class GenerateRequest(BaseModel):
         default="auto",
         description="Layout direction for the diagram"
     )
+    
+    image_format: Literal["png", "svg"] = Field(
+        default="png",
+        description="Image format for output_format image/both"
+    )
+
+
+class GenerateBatchItem(GenerateRequest):
+    id: Optional[str] = Field(
+        None,
+        max_length=200,
+        description="Client identifier echoed back with the item result"
+    )
+
+
+class GenerateBatchRequest(BaseModel):
+    items: List[GenerateBatchItem] = Field(
+        ...,
+        min_length=1,
+        max_length=5000,
+        description="Descriptions to generate; results are streamed back in completion order"
+    )
+
+
+class EditSessionCreateRequest(BaseModel):
+    output_format: Literal["image", "code", "both"] = Field(
+        default="code",
+        description="Artifacts regenerated after each edit"
+    )
+    
+    diagram_type: Literal["flowchart", "bpmn", "uml"] = Field(
+        default="flowchart",
+        description="Type of diagram to generate"
+    )
+    
+    layout: Literal["vertical", "horizontal", "auto"] = Field(
+        default="auto",
+        description="Layout direction for the diagram"
+    )
+
+
+class EditSessionUpdateRequest(BaseModel):
+    description: str = Field(
+        ...,
+        description="Full current text of the description"
+    )
@@ -21,7 +21,7 @@ class GraphRepresentation(BaseModel):
 
 
 class Artifacts(BaseModel):
-    diagram_image_base64: Optional[str] = Field(None, description="Generated diagram as base64 PNG")
+    diagram_image_base64: Optional[str] = Field(None, description="Generated diagram as base64 PNG or SVG (see metadata.image_format)")
     diagram_code: Optional[str] = Field(None, description="Diagram code (PlantUML/Mermaid)")
     detected_elements: Optional[List[Dict[str, Any]]] = Field(None, description="Detected elements with bboxes")
 
@@ -53,6 +53,26 @@ class UnifiedResponse(BaseModel):
     )
 
 
+class GraphPatch(BaseModel):
+    removed_nodes: List[str] = Field(default_factory=list, description="IDs of nodes removed since the previous version")
+    added_nodes: List[NodeRepresentation] = Field(default_factory=list)
+    removed_edges: List[EdgeRepresentation] = Field(default_factory=list)
+    added_edges: List[EdgeRepresentation] = Field(default_factory=list)
+
+
+class EditSessionResponse(BaseModel):
+    session_id: str = Field(..., description="Edit session identifier")
+    expires_in_sec: int = Field(..., description="Idle time after which the session is dropped")
+
+
+class EditSessionUpdateResponse(BaseModel):
+    session_id: str = Field(..., description="Edit session identifier")
+    changed: bool = Field(..., description="Whether the graph changed since the previous version")
+    patch: GraphPatch = Field(..., description="Graph changes since the previous version")
+    result: UnifiedResponse = Field(..., description="Full result for the current version")
+    stats: Dict[str, Any] = Field(default_factory=dict, description="Incremental parsing statistics")
+
+
 class ErrorResponse(BaseModel):
     error: str = Field(..., description="Error type")
     message: str = Field(..., description="Error message")
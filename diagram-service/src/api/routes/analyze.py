@@ -1,12 +1,17 @@
 from fastapi import APIRouter, File, UploadFile
+from fastapi.concurrency import run_in_threadpool
 import time
 
 from src.core.logger import app_logger
+from src.core.config import settings
 from src.core.exceptions import ImageProcessingError, ValidationError
 from src.api.models.responses import UnifiedResponse
-from src.utils.image_utils import bytes_to_numpy
+from src.api.routes.previews import preview_metadata
+from src.utils.image_utils import bytes_to_numpy, make_thumbnail
+from src.utils.thumbnail_cache import get_thumbnail_cache, thumbnail_key
 from src.preprocessing.image_preprocessor import ImagePreprocessor
 from src.ml_pipeline.detector import DiagramDetector
+from src.ml_pipeline.connector_detector import ConnectorDetector
 from src.ml_pipeline.ocr import TextRecognizer
 from src.ml_pipeline.graph_constructor import GraphConstructor
 from src.ml_pipeline.semantic_interpreter import SemanticInterpreter
@@ -17,6 +22,7 @@ router = APIRouter()
 
 _preprocessor = None
 _detector = None
+_connector_detector = None
 _ocr = None
 _graph_constructor = None
 _semantic_interpreter = None
@@ -24,12 +30,13 @@ _formatter = None
 _template_engine = None
 
 def get_components():
-    global _preprocessor, _detector, _ocr, _graph_constructor, _semantic_interpreter, _formatter, _template_engine
+    global _preprocessor, _detector, _connector_detector, _ocr, _graph_constructor, _semantic_interpreter, _formatter, _template_engine
     
     if _preprocessor is None:
         app_logger.info("Initializing ML components...")
         _preprocessor = ImagePreprocessor()
         _detector = DiagramDetector()
+        _connector_detector = ConnectorDetector()
         _ocr = TextRecognizer()
         _graph_constructor = GraphConstructor()
         _semantic_interpreter = SemanticInterpreter()
@@ -37,7 +44,72 @@ def get_components():
         _template_engine = TemplateEngine()
         app_logger.info("ML components initialized successfully")
     
-    return _preprocessor, _detector, _ocr, _graph_constructor, _semantic_interpreter, _formatter, _template_engine
+    return _preprocessor, _detector, _connector_detector, _ocr, _graph_constructor, _semantic_interpreter, _formatter, _template_engine
+
+
+def _analyze_image(image_bytes: bytes, filename: str, start_time: float) -> UnifiedResponse:
+    """Весь конвейер анализа: предобработка, детекция, соединители, OCR, граф, описание"""
+    preprocessor, detector, connector_detector, ocr, graph_constructor, semantic_interpreter, formatter, template_engine = get_components()
+    
+    image_array = bytes_to_numpy(image_bytes)
+    app_logger.debug(f"Converted to numpy array: {image_array.shape}")
+    
+    preview = None
+    if settings.thumbnail_size > 0:
+        # Миниатюра из уже декодированного массива; тот же файл повторно не уменьшается
+        preview_id = thumbnail_key(image_bytes)
+        get_thumbnail_cache().get_or_create(preview_id, lambda: make_thumbnail(image_array, settings.thumbnail_size))
+        preview = preview_metadata(preview_id)
+    
+    preprocessed_image = preprocessor.preprocess(image_array, enhance=True, denoise=False)
+    app_logger.info("Image preprocessed")
+    
+    bboxes, binary_mask = detector.detect_with_mask(preprocessed_image)
+    app_logger.info(f"Detected {len(bboxes)} diagram elements")
+    
+    connectors = connector_detector.detect(binary_mask, bboxes)
+    if not connectors:
+        app_logger.info("No connectors detected, falling back to positional heuristic")
+        connectors = None
+    
+    if settings.ocr_mode == "page":
+        texts, connector_texts = ocr.recognize_page(preprocessed_image, bboxes, connectors, binary_mask)
+    else:
+        texts = ocr.recognize_in_bboxes(preprocessed_image, bboxes, binary_mask)
+        connector_texts = {}
+    app_logger.info(f"Recognized text in {len(texts)} bounding boxes and {len(connector_texts)} connectors")
+    
+    graph = graph_constructor.construct_with_flow_analysis(bboxes, texts, connectors, connector_texts)
+    app_logger.info(f"Constructed graph: {graph.number_of_nodes()} nodes, {graph.number_of_edges()} edges")
+    
+    context = semantic_interpreter.analyze(graph)
+    app_logger.info("Graph interpreted")
+    
+    description = template_engine.render_description(graph, context)
+    app_logger.info("Description generated")
+    
+    processing_time = time.time() - start_time
+    
+    response = formatter.format_analyze_response(
+        graph=graph,
+        description=description,
+        processing_time=processing_time,
+        metadata={
+            "image_filename": filename,
+            "image_size_bytes": len(image_bytes),
+            "num_detected_elements": len(bboxes),
+            "num_detected_connectors": len(connectors) if connectors else 0,
+            "flow_type": context.flow_type,
+            "preview": preview
+        },
+        context=context
+    )
+    
+    response = formatter.add_detected_elements(response, bboxes, texts)
+    
+    app_logger.info(f"Analysis completed in {processing_time:.2f}s")
+    
+    return response
 
 
 @router.post("/analyze", response_model=UnifiedResponse)
@@ -63,48 +135,8 @@ async def analyze_diagram(image: UploadFile = File(...)):
         
         app_logger.info(f"Image size: {len(image_bytes)} bytes")
         
-        preprocessor, detector, ocr, graph_constructor, semantic_interpreter, formatter, template_engine = get_components()
-        
-        image_array = bytes_to_numpy(image_bytes)
-        app_logger.debug(f"Converted to numpy array: {image_array.shape}")
-        
-        preprocessed_image = preprocessor.preprocess(image_array, enhance=True, denoise=False)
-        app_logger.info("Image preprocessed")
-        
-        bboxes = detector.detect_diagram_elements(preprocessed_image)
-        app_logger.info(f"Detected {len(bboxes)} diagram elements")
-        
-        texts = ocr.recognize_in_bboxes(preprocessed_image, bboxes)
-        app_logger.info(f"Recognized text in {len(texts)} bounding boxes")
-        
-        graph = graph_constructor.construct_with_flow_analysis(bboxes, texts)
-        app_logger.info(f"Constructed graph: {graph.number_of_nodes()} nodes, {graph.number_of_edges()} edges")
-        
-        interpretation = semantic_interpreter.interpret(graph)
-        app_logger.info("Graph interpreted")
-        
-        description = template_engine.render_description(graph)
-        app_logger.info("Description generated")
-        
-        processing_time = time.time() - start_time
-        
-        response = formatter.format_analyze_response(
-            graph=graph,
-            description=description,
-            processing_time=processing_time,
-            metadata={
-                "image_filename": image.filename,
-                "image_size_bytes": len(image_bytes),
-                "num_detected_elements": len(bboxes),
-                "flow_type": interpretation.get('flow_type', 'unknown')
-            }
-        )
-        
-        response = formatter.add_detected_elements(response, bboxes, texts)
-        
-        app_logger.info(f"Analysis completed in {processing_time:.2f}s")
-        
-        return response
+        # OCR, детекция и трассировка соединителей - в потоке: запрос не держит event loop
+        return await run_in_threadpool(_analyze_image, image_bytes, image.filename, start_time)
         
     except ValidationError:
         raise
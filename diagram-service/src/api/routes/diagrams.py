@@ -0,0 +1,46 @@
+from fastapi import APIRouter, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import Response
+
+from src.core.logger import app_logger
+from src.core.metrics import metrics
+from src.api.routes.generate import get_components
+from src.generative_pipeline.tile_store import TiledDiagram, get_tile_store
+
+router = APIRouter()
+
+# Схема по diagram_id не меняется, поэтому тайлы кэшируются клиентом и прокси без перепроверки
+TILE_CACHE_CONTROL = "public, max-age=86400, immutable"
+
+
+def _get_diagram(diagram_id: str) -> TiledDiagram:
+    diagram = get_tile_store().get(diagram_id)
+    if diagram is None:
+        raise HTTPException(status_code=404, detail="Tiled diagram not found")
+    return diagram
+
+
+@router.get("/diagrams/{diagram_id}/tiles")
+async def get_diagram_tiles(diagram_id: str):
+    """Описание пирамиды тайлов в схеме Deep Zoom"""
+    diagram = _get_diagram(diagram_id)
+    return {"diagram_id": diagram_id, **diagram.pyramid.describe()}
+
+
+@router.get("/diagrams/{diagram_id}/tiles/{level:int}/{col:int}_{row:int}.png")
+async def get_diagram_tile(diagram_id: str, level: int, col: int, row: int):
+    """PNG тайла: уровень max_level - полное разрешение, каждый уровень ниже вдвое меньше"""
+    diagram = _get_diagram(diagram_id)
+    try:
+        diagram.pyramid.tile_box(level, col, row)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+    _, _, visualizer, _, _, _ = get_components()
+    tile = await run_in_threadpool(
+        visualizer.render_tile,
+        diagram.graph, diagram.layout, diagram.pyramid, level, col, row, diagram.geometry
+    )
+    metrics.increment("diagram_tiles_rendered")
+    app_logger.debug(f"Tile {level}/{col}_{row} of {diagram_id}: {len(tile)} bytes")
+    return Response(content=tile, media_type="image/png", headers={"Cache-Control": TILE_CACHE_CONTROL})
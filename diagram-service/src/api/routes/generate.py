@@ -1,25 +1,104 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from typing import Any, AsyncIterator, Dict, Iterable, List, Literal, Optional, Tuple
+import asyncio
+import json
 import time
 
+from src.core.config import settings
 from src.core.logger import app_logger
-from src.core.exceptions import TextParsingError, VisualizationError
-from src.api.models.requests import GenerateRequest
+from src.core.exceptions import DiagramServiceException, TextParsingError, VisualizationError
+from src.api.models.requests import GenerateRequest, GenerateBatchItem, GenerateBatchRequest
 from src.api.models.responses import UnifiedResponse
+from src.api.routes.previews import store_preview
 from src.preprocessing.text_preprocessor import TextPreprocessor
 from src.generative_pipeline.text_parser import TextToGraphParser
+from src.generative_pipeline.nlp_pipeline import get_nlp_pipeline
+from src.generative_pipeline.text_stream import TextChunkDecoder, SentenceSplitter, StreamingTextParser
+from src.generative_pipeline.layered_layout import Layout
+from src.generative_pipeline.render_pool import RenderResult, get_render_pool
+from src.generative_pipeline.svg_renderer import png_rasterizer_available
+from src.generative_pipeline.tile_store import get_tile_store
 from src.generative_pipeline.visualizer import GraphVisualizer
 from src.generative_pipeline.code_generator import DiagramCodeGenerator
 from src.postprocessing.formatter import ResponseFormatter
 from src.postprocessing.template_engine import TemplateEngine
+from src.utils.analysis_context import AnalysisContext
 
 router = APIRouter()
 
-text_preprocessor = TextPreprocessor()
-text_parser = TextToGraphParser()
-visualizer = GraphVisualizer()
-code_generator = DiagramCodeGenerator()
-formatter = ResponseFormatter()
-template_engine = TemplateEngine()
+_text_preprocessor = None
+_text_parser = None
+_visualizer = None
+_code_generator = None
+_formatter = None
+_template_engine = None
+
+def get_components():
+    global _text_preprocessor, _text_parser, _visualizer, _code_generator, _formatter, _template_engine
+    
+    if _text_preprocessor is None:
+        app_logger.info("Initializing generative components...")
+        _text_preprocessor = TextPreprocessor()
+        _text_parser = TextToGraphParser(nlp=get_nlp_pipeline())
+        _visualizer = GraphVisualizer()
+        _code_generator = DiagramCodeGenerator()
+        _formatter = ResponseFormatter()
+        _template_engine = TemplateEngine()
+        app_logger.info("Generative components initialized successfully")
+    
+    return _text_preprocessor, _text_parser, _visualizer, _code_generator, _formatter, _template_engine
+
+
+def _layout_for_render(graph, layout: str, image_format: str) -> Optional[Layout]:
+    """Укладка из кэша сервера для задания пулу отрисовки; pygraphviz укладывает граф сам"""
+    _, _, visualizer, _, _, _ = get_components()
+    if not visualizer.needs_layout(image_format):
+        return None
+    return visualizer.compute_layout(graph, layout)
+
+
+async def render_in_pool(graph, layout: str, image_format: str, dpi: int = 150, thumbnail_size: int = 0) -> RenderResult:
+    """Укладка в потоке сервера (общий кэш), отрисовка - в процессе пула; event loop не блокируется"""
+    layout_result = await run_in_threadpool(_layout_for_render, graph, layout, image_format)
+    return await asyncio.wrap_future(get_render_pool().submit(
+        graph, layout=layout, format=image_format, dpi=dpi, thumbnail_size=thumbnail_size, layout_result=layout_result
+    ))
+
+
+def _tiled_diagram(visualizer: GraphVisualizer, graph, layout: str, dpi: int) -> Optional[Dict[str, Any]]:
+    """Схема больше бюджета пикселей приходит уменьшенной, а полное разрешение отдается тайлами по запросу"""
+    if settings.tiled_diagrams_max <= 0 or not png_rasterizer_available():
+        return None
+    # Решение по масштабу, с которым рендер отдал PNG, а не по размеру SVG
+    if visualizer.png_scale(graph, layout, dpi) >= 1:
+        return None
+    pyramid, geometry = visualizer.tile_pyramid(graph, layout, dpi, settings.render_tile_size)
+    diagram = get_tile_store().add(graph, layout, pyramid, geometry)
+    app_logger.info(f"Diagram {pyramid.width}x{pyramid.height}px exceeds pixel budget, tiles at {diagram.diagram_id}")
+    return {
+        "diagram_id": diagram.diagram_id,
+        "url": f"{settings.api_prefix}/diagrams/{diagram.diagram_id}/tiles/{{level}}/{{col}}_{{row}}.png",
+        **pyramid.describe()
+    }
+
+
+def _describe_graph(
+    graph,
+    output_format: str,
+    code_generator: DiagramCodeGenerator,
+    template_engine: TemplateEngine
+) -> Tuple[AnalysisContext, Optional[str], str]:
+    """Контекст анализа, PlantUML-код (если запрошен) и текстовое описание графа"""
+    context = AnalysisContext.from_graph(graph)
+    diagram_code = None
+    if output_format in ["code", "both"]:
+        diagram_code = code_generator.generate(graph, format='plantuml', context=context)
+        app_logger.info(f"Generated PlantUML code: {len(diagram_code)} chars")
+    description = template_engine.render_description(graph, context)
+    app_logger.info("Description generated from graph")
+    return context, diagram_code, description
 
 
 @router.post("/generate", response_model=UnifiedResponse)
@@ -32,30 +111,39 @@ async def generate_diagram(request: GenerateRequest):
     try:
         text_preprocessor, text_parser, visualizer, code_generator, formatter, template_engine = get_components()
         
-        preprocessed_text = text_preprocessor.preprocess(request.description)
+        preprocessed_text = await run_in_threadpool(text_preprocessor.preprocess, request.description)
         app_logger.info("Text preprocessed")
         
-        graph = text_parser.parse(preprocessed_text)
+        # Разбор с NLP-переписыванием - в потоке, как в /generate/batch: модель не держит event loop
+        graph = await run_in_threadpool(text_parser.parse, preprocessed_text)
         app_logger.info(f"Parsed text into graph: {graph.number_of_nodes()} nodes, {graph.number_of_edges()} edges")
         
+        # Генерация кода, описание и форматирование - тоже в потоке, как в /generate/stream
+        context, diagram_code, description = await run_in_threadpool(
+            _describe_graph, graph, request.output_format, code_generator, template_engine
+        )
+        
         diagram_image = None
-        diagram_code = None
+        tiles = None
+        preview = None
         
         if request.output_format in ["image", "both"]:
             layout_direction = 'vertical' if request.layout == 'vertical' else 'horizontal' if request.layout == 'horizontal' else 'vertical'
-            diagram_image = visualizer.render(graph, layout=layout_direction, format='png', dpi=150)
+            # Отрисовка в процессе пула: зависший рендер не держит сервер и завершается по таймауту
+            rendered = await render_in_pool(
+                graph, layout_direction, request.image_format, thumbnail_size=settings.thumbnail_size
+            )
+            diagram_image = rendered.image
+            preview = store_preview(diagram_image, rendered.thumbnail)
             app_logger.info(f"Generated diagram image: {len(diagram_image)} bytes")
-        
-        if request.output_format in ["code", "both"]:
-            diagram_code = code_generator.generate(graph, format='plantuml')
-            app_logger.info(f"Generated PlantUML code: {len(diagram_code)} chars")
-        
-        description = template_engine.render_description(graph)
-        app_logger.info("Description generated from graph")
+            if request.image_format == 'png':
+                # Укладка уже в кэше графа; замер геометрии - в потоке, не в event loop
+                tiles = await run_in_threadpool(_tiled_diagram, visualizer, graph, layout_direction, 150)
         
         processing_time = time.time() - start_time
         
-        response = formatter.format_generate_response(
+        response = await run_in_threadpool(
+            formatter.format_generate_response,
             graph=graph,
             description=description,
             diagram_image=diagram_image,
@@ -65,9 +153,13 @@ async def generate_diagram(request: GenerateRequest):
                 "output_format": request.output_format,
                 "diagram_type": request.diagram_type,
                 "layout": request.layout,
+                "image_format": request.image_format,
+                "tiles": tiles,
+                "preview": preview,
                 "num_nodes": graph.number_of_nodes(),
                 "num_edges": graph.number_of_edges()
-            }
+            },
+            context=context
         )
         
         app_logger.info(f"Generation completed in {processing_time:.2f}s")
@@ -80,3 +172,328 @@ async def generate_diagram(request: GenerateRequest):
             "Failed to generate diagram",
             {"error": str(e)}
         )
+
+
+class _DuplexStreamingResponse(StreamingResponse):
+    """Ответ, который пишется, пока читается тело запроса.
+
+    StreamingResponse параллельно ждет отключения клиента через receive() и забирает себе
+    сообщения с телом запроса. Здесь receive() читает только генератор через request.stream(),
+    а отключение он сам получает как ClientDisconnect.
+    """
+    
+    async def __call__(self, scope, receive, send) -> None:
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
+
+
+def _ndjson(events: List[Dict[str, Any]]) -> str:
+    return ''.join(json.dumps(event, ensure_ascii=False) + '\n' for event in events)
+
+
+async def _generate_events(
+    request: Request,
+    ndjson: bool,
+    output_format: str,
+    diagram_type: str,
+    layout: str,
+    image_format: str
+) -> AsyncIterator[str]:
+    start_time = time.time()
+    
+    try:
+        text_preprocessor, text_parser, visualizer, code_generator, formatter, template_engine = get_components()
+        
+        decoder = TextChunkDecoder(ndjson)
+        splitter = SentenceSplitter(settings.generate_stream_window_chars)
+        stream = StreamingTextParser(
+            text_parser,
+            settings.generate_stream_chunk_chars,
+            settings.generate_stream_window_chars
+        )
+        received = 0
+        
+        def feed(chunks: Iterable[str], final: bool = False) -> List[Dict[str, Any]]:
+            nonlocal received
+            events = []
+            for chunk in chunks:
+                received += len(chunk)
+                if received > settings.generate_stream_max_chars:
+                    raise TextParsingError(
+                        "Description too long",
+                        {"max_chars": settings.generate_stream_max_chars}
+                    )
+                for sentences in splitter.feed(chunk):
+                    events.extend(stream.feed(text_preprocessor.preprocess(sentences)))
+            if final:
+                for sentences in splitter.close():
+                    events.extend(stream.feed(text_preprocessor.preprocess(sentences)))
+                events.extend(stream.close())
+            return events
+        
+        # Узлы и ребра уходят клиенту по мере разбора; текст целиком в памяти не хранится.
+        # Разбор идет в потоке, чтобы длинное описание не держало event loop
+        async for data in request.stream():
+            events = await run_in_threadpool(feed, decoder.feed(data))
+            if events:
+                yield _ndjson(events)
+        
+        events = await run_in_threadpool(feed, decoder.close(), True)
+        if events:
+            yield _ndjson(events)
+        
+        graph = stream.graph
+        if graph.number_of_nodes() == 0:
+            raise TextParsingError("Description is empty")
+        app_logger.info(f"Streamed {received} chars into graph: {graph.number_of_nodes()} nodes, {graph.number_of_edges()} edges")
+        
+        context, diagram_code, description = await run_in_threadpool(
+            _describe_graph, graph, output_format, code_generator, template_engine
+        )
+        
+        diagram_image = None
+        preview = None
+        image_skipped = False
+        
+        if output_format in ["image", "both"]:
+            # Картинка строится один раз в конце; для очень больших графов она не нужна и не строится
+            if graph.number_of_nodes() <= settings.generate_stream_max_render_nodes:
+                layout_direction = 'horizontal' if layout == 'horizontal' else 'vertical'
+                rendered = await render_in_pool(
+                    graph, layout_direction, image_format, thumbnail_size=settings.thumbnail_size
+                )
+                diagram_image = rendered.image
+                preview = store_preview(diagram_image, rendered.thumbnail)
+            else:
+                image_skipped = True
+        
+        processing_time = time.time() - start_time
+        
+        response = await run_in_threadpool(
+            formatter.format_generate_response,
+            graph=graph,
+            description=description,
+            diagram_image=diagram_image,
+            diagram_code=diagram_code,
+            processing_time=processing_time,
+            metadata={
+                "output_format": output_format,
+                "diagram_type": diagram_type,
+                "layout": layout,
+                "image_format": image_format,
+                "num_nodes": graph.number_of_nodes(),
+                "num_edges": graph.number_of_edges(),
+                "num_chars": received,
+                "image_skipped": image_skipped,
+                "preview": preview
+            },
+            context=context
+        )
+        
+        # Граф уже передан событиями node/edge
+        result = response.model_dump(exclude={"graph_representation"})
+        result["event"] = "result"
+        yield _ndjson([result])
+        
+        app_logger.info(f"Streaming generation completed in {processing_time:.2f}s")
+        
+    except DiagramServiceException as e:
+        app_logger.error(f"Streaming generation failed: {e.message}", extra=e.details)
+        yield _ndjson([{"event": "error", "error": e.__class__.__name__, "message": e.message, "details": e.details}])
+    except Exception as e:
+        app_logger.error(f"Error streaming diagram: {str(e)}", exc_info=True)
+        yield _ndjson([{
+            "event": "error",
+            "error": "VisualizationError",
+            "message": "Failed to generate diagram",
+            "details": {"error": str(e)}
+        }])
+
+
+@router.post(
+    "/generate/stream",
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                "text/plain": {"schema": {"type": "string"}},
+                "application/x-ndjson": {"schema": {"type": "string"}}
+            }
+        }
+    }
+)
+async def generate_diagram_stream(
+    request: Request,
+    output_format: Literal["image", "code", "both"] = "code",
+    diagram_type: Literal["flowchart", "bpmn", "uml"] = "flowchart",
+    layout: Literal["vertical", "horizontal", "auto"] = "auto",
+    image_format: Literal["png", "svg"] = "png"
+):
+    """Длинное описание телом запроса (текст или NDJSON) -> NDJSON-события node, edge и итоговый result"""
+    ndjson = 'ndjson' in request.headers.get('content-type', '')
+    app_logger.info(f"Received streaming generate request: format={output_format}, ndjson={ndjson}")
+    
+    return _DuplexStreamingResponse(
+        _generate_events(request, ndjson, output_format, diagram_type, layout, image_format),
+        media_type="application/x-ndjson"
+    )
+
+
+def _prepare_batch_texts(items: List[GenerateBatchItem]) -> Tuple[List[str], float]:
+    """Предобработка описаний пакета; при включенном NLP все предложения пакета идут в модель одним вызовом"""
+    start_time = time.time()
+    text_preprocessor, text_parser, _, _, _, _ = get_components()
+    texts = text_parser.apply_nlp([text_preprocessor.preprocess(item.description) for item in items])
+    return texts, time.time() - start_time
+
+
+def _prepare_batch_item(item: GenerateBatchItem, text: str) -> Dict[str, Any]:
+    """Разбор, код, описание и укладка одного элемента пакета - все, кроме картинки"""
+    start_time = time.time()
+    _, text_parser, _, code_generator, _, template_engine = get_components()
+    
+    graph = text_parser.parse(text, use_nlp=False)
+    context, diagram_code, description = _describe_graph(graph, item.output_format, code_generator, template_engine)
+    
+    layout = None
+    if item.output_format in ["image", "both"]:
+        layout = _layout_for_render(graph, 'horizontal' if item.layout == 'horizontal' else 'vertical', item.image_format)
+    
+    return {
+        "graph": graph,
+        "layout": layout,
+        "context": context,
+        "diagram_code": diagram_code,
+        "description": description,
+        "parse_time": time.time() - start_time
+    }
+
+
+def _batch_item_event(
+    index: int,
+    item: GenerateBatchItem,
+    prepared: Dict[str, Any],
+    diagram_image=None,
+    render_time: float = 0.0,
+    preview: Optional[Dict[str, str]] = None
+) -> Dict[str, Any]:
+    _, _, _, _, formatter, _ = get_components()
+    graph = prepared["graph"]
+    response = formatter.format_generate_response(
+        graph=graph,
+        description=prepared["description"],
+        diagram_image=diagram_image,
+        diagram_code=prepared["diagram_code"],
+        processing_time=prepared["parse_time"] + render_time,
+        metadata={
+            "output_format": item.output_format,
+            "diagram_type": item.diagram_type,
+            "layout": item.layout,
+            "image_format": item.image_format,
+            "preview": preview,
+            "num_nodes": graph.number_of_nodes(),
+            "num_edges": graph.number_of_edges()
+        },
+        context=prepared["context"]
+    )
+    return {"event": "item", "index": index, "id": item.id, "status": "ok", "response": response.model_dump()}
+
+
+def _batch_error_event(index: int, item: GenerateBatchItem, error: Exception) -> Dict[str, Any]:
+    if isinstance(error, DiagramServiceException):
+        name, message, details = error.__class__.__name__, error.message, error.details
+    else:
+        name, message, details = "VisualizationError", "Failed to generate diagram", {"error": str(error)}
+    return {
+        "event": "item",
+        "index": index,
+        "id": item.id,
+        "status": "error",
+        "error": {"error": name, "message": message, "details": details}
+    }
+
+
+async def _generate_batch_events(request: GenerateBatchRequest) -> AsyncIterator[str]:
+    start_time = time.time()
+    pool = get_render_pool()
+    # Не больше двух заданий на процесс в очереди: готовые графы не копятся в памяти
+    max_pending = 2 * pool.workers
+    
+    pending: Dict[asyncio.Future, Tuple[int, GenerateBatchItem, Dict[str, Any]]] = {}
+    stats = {"succeeded": 0, "failed": 0, "timeouts": 0, "parse_sec": 0.0, "render_sec": 0.0}
+    
+    texts, prepare_time = await run_in_threadpool(_prepare_batch_texts, request.items)
+    stats["parse_sec"] += prepare_time
+    
+    def finished(future: asyncio.Future) -> Dict[str, Any]:
+        index, item, prepared = pending.pop(future)
+        try:
+            rendered = future.result()
+        except Exception as e:
+            app_logger.error(f"Batch item {index} rendering failed: {str(e)}")
+            stats["failed"] += 1
+            if isinstance(e, DiagramServiceException) and "timeout_sec" in e.details:
+                stats["timeouts"] += 1
+            return _batch_error_event(index, item, e)
+        stats["succeeded"] += 1
+        stats["render_sec"] += rendered.render_sec
+        preview = store_preview(rendered.image, rendered.thumbnail)
+        return _batch_item_event(index, item, prepared, rendered.image, rendered.render_sec, preview)
+    
+    for index, (item, text) in enumerate(zip(request.items, texts)):
+        try:
+            # Разбор в процессе сервера (в потоке, чтобы не держать event loop), отрисовка - в пуле процессов
+            prepared = await run_in_threadpool(_prepare_batch_item, item, text)
+            stats["parse_sec"] += prepared["parse_time"]
+        except Exception as e:
+            app_logger.error(f"Batch item {index} failed: {str(e)}")
+            stats["failed"] += 1
+            yield _ndjson([_batch_error_event(index, item, e)])
+            continue
+        
+        if item.output_format in ["image", "both"]:
+            layout_direction = 'horizontal' if item.layout == 'horizontal' else 'vertical'
+            future = asyncio.wrap_future(pool.submit(
+                prepared["graph"], layout=layout_direction, format=item.image_format, dpi=150,
+                thumbnail_size=settings.thumbnail_size, layout_result=prepared["layout"]
+            ))
+            pending[future] = (index, item, prepared)
+        else:
+            stats["succeeded"] += 1
+            yield _ndjson([_batch_item_event(index, item, prepared)])
+        
+        # Результаты уходят в порядке готовности
+        done = [future for future in pending if future.done()]
+        if len(pending) - len(done) >= max_pending:
+            done, _ = await asyncio.wait(list(pending), return_when=asyncio.FIRST_COMPLETED)
+        if done:
+            yield _ndjson([finished(future) for future in done])
+    
+    while pending:
+        done, _ = await asyncio.wait(list(pending), return_when=asyncio.FIRST_COMPLETED)
+        yield _ndjson([finished(future) for future in done])
+    
+    elapsed = time.time() - start_time
+    total = len(request.items)
+    app_logger.info(f"Batch of {total} items completed in {elapsed:.2f}s ({stats['failed']} failed)")
+    yield _ndjson([{
+        "event": "summary",
+        "total": total,
+        "succeeded": stats["succeeded"],
+        "failed": stats["failed"],
+        "elapsed_sec": round(elapsed, 3),
+        "items_per_sec": round(total / elapsed, 2) if elapsed > 0 else None,
+        "parse_sec": round(stats["parse_sec"], 3),
+        "render_sec": round(stats["render_sec"], 3),
+        "render_timeouts": stats["timeouts"],
+        "render_workers": pool.workers
+    }])
+
+
+@router.post("/generate/batch")
+async def generate_diagram_batch(request: GenerateBatchRequest):
+    """Пакет описаний -> NDJSON: событие item на каждый элемент в порядке готовности и итоговое summary"""
+    app_logger.info(f"Received batch generate request: {len(request.items)} items")
+    
+    return StreamingResponse(_generate_batch_events(request), media_type="application/x-ndjson")
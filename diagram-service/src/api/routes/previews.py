@@ -0,0 +1,37 @@
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import Response
+from typing import Dict, Optional
+
+from src.core.config import settings
+from src.utils.thumbnail_cache import get_thumbnail_cache, thumbnail_key
+
+router = APIRouter()
+
+# Идентификатор превью - хэш исходного изображения, поэтому содержимое по URL не меняется
+PREVIEW_CACHE_CONTROL = "public, max-age=86400, immutable"
+
+
+def store_preview(source: bytes, thumbnail: Optional[bytes]) -> Optional[Dict[str, str]]:
+    """Кладет миниатюру в кэш превью; metadata.preview для ответа или None, если миниатюры нет"""
+    if not thumbnail:
+        return None
+    preview_id = thumbnail_key(source)
+    get_thumbnail_cache().put(preview_id, thumbnail)
+    return preview_metadata(preview_id)
+
+
+def preview_metadata(preview_id: str) -> Dict[str, str]:
+    return {"preview_id": preview_id, "url": f"{settings.api_prefix}/previews/{preview_id}.png"}
+
+
+@router.get("/previews/{preview_id}.png")
+async def get_preview(preview_id: str, request: Request):
+    """PNG-миниатюра сгенерированной схемы или загруженного изображения"""
+    headers = {"Cache-Control": PREVIEW_CACHE_CONTROL, "ETag": f'"{preview_id}"'}
+    if request.headers.get("if-none-match") == headers["ETag"]:
+        return Response(status_code=304, headers=headers)
+
+    thumbnail = get_thumbnail_cache().get(preview_id)
+    if thumbnail is None:
+        raise HTTPException(status_code=404, detail="Preview not found")
+    return Response(content=thumbnail, media_type="image/png", headers=headers)
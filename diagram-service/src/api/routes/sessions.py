@@ -0,0 +1,139 @@
+from fastapi import APIRouter, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from typing import Any, Dict, Optional
+import time
+
+from src.core.config import settings
+from src.core.logger import app_logger
+from src.core.exceptions import DiagramServiceException, ValidationError, VisualizationError
+from src.api.models.requests import EditSessionCreateRequest, EditSessionUpdateRequest
+from src.api.models.responses import EditSessionResponse, EditSessionUpdateResponse
+from src.api.routes.generate import get_components, render_in_pool
+from src.generative_pipeline.edit_session import EditSession, EditSessionStore
+from src.utils.analysis_context import AnalysisContext
+
+router = APIRouter()
+
+_session_store: Optional[EditSessionStore] = None
+
+
+def get_session_store() -> EditSessionStore:
+    global _session_store
+
+    if _session_store is None:
+        _session_store = EditSessionStore(settings.edit_session_max_sessions, settings.edit_session_ttl_sec)
+
+    return _session_store
+
+
+def _text_artifacts(session: EditSession) -> Dict[str, Any]:
+    """Код и описание по текущему графу сессии"""
+    _, _, _, code_generator, _, template_engine = get_components()
+    graph = session.parser.graph
+
+    context = AnalysisContext.from_graph(graph)
+    artifacts = {
+        "context": context,
+        "description": template_engine.render_description(graph, context),
+        "diagram_code": None,
+        "diagram_image": None
+    }
+
+    if session.options["output_format"] in ["code", "both"]:
+        artifacts["diagram_code"] = code_generator.generate(graph, format='plantuml', context=context)
+
+    return artifacts
+
+
+async def _refresh_artifacts(session: EditSession) -> None:
+    """Код, описание и картинка по текущему графу сессии; цикл событий не блокируется"""
+    artifacts = await run_in_threadpool(_text_artifacts, session)
+    graph = session.parser.graph
+
+    if session.options["output_format"] in ["image", "both"] and graph.number_of_nodes() > 0:
+        layout_direction = 'horizontal' if session.options["layout"] == 'horizontal' else 'vertical'
+        rendered = await render_in_pool(graph, layout_direction, 'png')
+        artifacts["diagram_image"] = rendered.image
+
+    session.artifacts = artifacts
+
+
+@router.post("/sessions", response_model=EditSessionResponse)
+async def create_edit_session(request: EditSessionCreateRequest):
+    text_preprocessor, text_parser, _, _, _, _ = get_components()
+    session = get_session_store().create(text_parser, text_preprocessor, request.model_dump())
+
+    app_logger.info(f"Created edit session {session.session_id}: format={request.output_format}")
+    return EditSessionResponse(session_id=session.session_id, expires_in_sec=settings.edit_session_ttl_sec)
+
+
+@router.put("/sessions/{session_id}", response_model=EditSessionUpdateResponse)
+async def update_edit_session(session_id: str, request: EditSessionUpdateRequest):
+    """Полный текст после правки -> патч графа; разбираются только измененные предложения"""
+    start_time = time.time()
+
+    if len(request.description) > settings.edit_session_max_chars:
+        raise ValidationError("Description too long", {"max_chars": settings.edit_session_max_chars})
+
+    session = get_session_store().get(session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Edit session not found")
+
+    try:
+        _, _, _, _, formatter, _ = get_components()
+
+        async with session.lock:
+            update = await run_in_threadpool(session.parser.update, request.description)
+            graph = session.parser.graph
+
+            # Если граф не изменился (правка пробелов, повтор того же текста), артефакты берутся из сессии.
+            # Старые артефакты сбрасываются до перестроения: после ошибки повтор не получит их к новому графу
+            if update["changed"] or not session.artifacts:
+                session.artifacts = {}
+                await _refresh_artifacts(session)
+
+            processing_time = time.time() - start_time
+            result = formatter.format_generate_response(
+                graph=graph,
+                description=session.artifacts["description"],
+                diagram_image=session.artifacts["diagram_image"],
+                diagram_code=session.artifacts["diagram_code"],
+                processing_time=processing_time,
+                metadata={
+                    "output_format": session.options["output_format"],
+                    "diagram_type": session.options["diagram_type"],
+                    "layout": session.options["layout"],
+                    "num_nodes": graph.number_of_nodes(),
+                    "num_edges": graph.number_of_edges()
+                },
+                context=session.artifacts["context"]
+            )
+
+        app_logger.info(
+            f"Edit session {session_id} updated in {processing_time:.3f}s: "
+            f"reparsed {update['stats']['reparsed_chars']} of {update['stats']['total_chars']} chars"
+        )
+
+        return EditSessionUpdateResponse(
+            session_id=session_id,
+            changed=update["changed"],
+            patch=update["patch"],
+            result=result,
+            stats=update["stats"]
+        )
+
+    except DiagramServiceException:
+        raise
+    except Exception as e:
+        app_logger.error(f"Error updating edit session: {str(e)}", exc_info=True)
+        raise VisualizationError(
+            "Failed to update edit session",
+            {"error": str(e)}
+        )
+
+
+@router.delete("/sessions/{session_id}")
+async def delete_edit_session(session_id: str):
+    if not get_session_store().delete(session_id):
+        raise HTTPException(status_code=404, detail="Edit session not found")
+    return {"session_id": session_id, "deleted": True}
@@ -18,6 +18,42 @@ class Settings(BaseSettings):
     max_image_size: int = 1920
     confidence_threshold: float = 0.5
     ocr_confidence_threshold: float = 0.6
+    ocr_rec_height: int = 48
+    ocr_batch_size: int = 32
+    ocr_mode: Literal["page", "bbox"] = "page"
+    ocr_edge_label_distance: float = 30.0
+    ocr_prefilter_enabled: bool = True
+    ocr_min_ink_ratio: float = 0.02
+    ocr_max_stroke_width: float = 8.0
+    ocr_cache_size: int = 4096
+    ocr_model_memory_budget_mb: int = 1024
+    ocr_model_memory_estimate_mb: int = 350
+    max_enumerated_cycles: int = 100
+    
+    generate_stream_max_chars: int = 20000000
+    generate_stream_chunk_chars: int = 4096
+    generate_stream_window_chars: int = 200000
+    generate_stream_max_render_nodes: int = 300
+    
+    render_workers: int = 0
+    render_job_timeout_sec: float = 30.0
+    render_worker_max_jobs: int = 200
+    render_engine: Literal["svg", "matplotlib"] = "matplotlib"
+    render_max_pixels: int = 4000000
+    render_tile_size: int = 256
+    tiled_diagrams_max: int = 100
+    thumbnail_size: int = 256
+    thumbnail_cache_size: int = 1024
+    layout_cache_size: int = 512
+    
+    edit_session_max_sessions: int = 1000
+    edit_session_ttl_sec: int = 900
+    edit_session_max_chars: int = 200000
+    
+    nlp_enabled: bool = False
+    nlp_backend: Literal["natasha", "spacy"] = "natasha"
+    nlp_spacy_model: str = "ru_core_news_sm"
+    nlp_batch_size: int = 256
     
     max_upload_size: int = 10485760
     cors_origins: str = "*"
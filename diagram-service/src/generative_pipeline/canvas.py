@@ -0,0 +1,60 @@
+import math
+from typing import Any, Dict, NamedTuple, Tuple
+
+
+# Предел стороны растра: Agg не рисует больше 2^16 пикселей по стороне, а такие полосы все равно не просмотреть
+MAX_SIDE_PIXELS = 32768
+
+
+def fit_scale(width: float, height: float, max_pixels: int, max_side: int = MAX_SIDE_PIXELS) -> float:
+    """Множитель <= 1, с которым растр width x height укладывается в бюджет пикселей и предел стороны"""
+    if width <= 0 or height <= 0:
+        return 1.0
+    scale = 1.0
+    if max_pixels > 0 and width * height > max_pixels:
+        scale = math.sqrt(max_pixels / (width * height))
+    return min(scale, max_side / width, max_side / height, 1.0)
+
+
+class TilePyramid(NamedTuple):
+    """Пирамида тайлов в схеме Deep Zoom: уровень max_level - полный размер, каждый уровень ниже вдвое меньше, уровень 0 - 1x1"""
+    width: int
+    height: int
+    tile_size: int
+
+    @property
+    def max_level(self) -> int:
+        return max(math.ceil(math.log2(max(self.width, self.height, 1))), 0)
+
+    def scale(self, level: int) -> float:
+        """Масштаб уровня относительно полного размера"""
+        return 0.5 ** (self.max_level - level)
+
+    def level_size(self, level: int) -> Tuple[int, int]:
+        scale = self.scale(level)
+        return max(math.ceil(self.width * scale), 1), max(math.ceil(self.height * scale), 1)
+
+    def tile_count(self, level: int) -> Tuple[int, int]:
+        width, height = self.level_size(level)
+        return math.ceil(width / self.tile_size), math.ceil(height / self.tile_size)
+
+    def tile_box(self, level: int, col: int, row: int) -> Tuple[int, int, int, int]:
+        """Тайл в пикселях уровня: x, y, ширина, высота (крайние тайлы обрезаны по границе)"""
+        if not 0 <= level <= self.max_level:
+            raise ValueError(f"Level must be between 0 and {self.max_level}")
+        cols, rows = self.tile_count(level)
+        if not (0 <= col < cols and 0 <= row < rows):
+            raise ValueError(f"Tile {col}_{row} is outside level {level} ({cols}x{rows} tiles)")
+        width, height = self.level_size(level)
+        x, y = col * self.tile_size, row * self.tile_size
+        return x, y, min(self.tile_size, width - x), min(self.tile_size, height - y)
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "width": self.width,
+            "height": self.height,
+            "tile_size": self.tile_size,
+            "min_level": 0,
+            "max_level": self.max_level,
+            "format": "png"
+        }
@@ -1,8 +1,10 @@
-import networkx as nx
-from typing import Literal
+import io
+from typing import Dict, List, Literal, Optional
 
 from src.core.logger import app_logger
-from src.utils.graph_utils import get_node_successors
+from src.generative_pipeline.flow_structure import FlowStructure
+from src.utils.compact_graph import CompactGraph
+from src.utils.analysis_context import AnalysisContext
 
 
 class DiagramCodeGenerator:
@@ -11,16 +13,20 @@ class DiagramCodeGenerator:
     
     def generate(
         self,
-        graph: nx.DiGraph,
-        format: Literal['plantuml', 'mermaid'] = 'plantuml'
+        graph: CompactGraph,
+        format: Literal['plantuml', 'mermaid'] = 'plantuml',
+        context: Optional[AnalysisContext] = None
     ) -> str:
         try:
             app_logger.debug(f"Generating {format} code for graph with {graph.number_of_nodes()} nodes")
             
+            if context is None:
+                context = AnalysisContext.from_graph(graph)
+            
             if format == 'plantuml':
-                code = self._generate_plantuml(graph)
+                code = self._generate_plantuml(context)
             elif format == 'mermaid':
-                code = self._generate_mermaid(graph)
+                code = self._generate_mermaid(context)
             else:
                 raise ValueError(f"Unsupported format: {format}")
             
@@ -31,111 +37,179 @@ class DiagramCodeGenerator:
             app_logger.error(f"Code generation failed: {str(e)}", exc_info=True)
             return f"# Error generating {format} code: {str(e)}"
     
-    def _generate_plantuml(self, graph: nx.DiGraph) -> str:
-        lines = ["@startuml"]
-        lines.append("skinparam defaultTextAlignment center")
-        lines.append("skinparam backgroundColor white")
-        lines.append("")
-        
-        node_mapping = {}
-        for idx, node in enumerate(graph.nodes()):
-            node_id = f"n{idx}"
-            node_mapping[node] = node_id
-            
-            node_type = graph.nodes[node].get('type', 'process')
-            label = graph.nodes[node].get('label', node)
-            
-            if node_type == 'start':
-                lines.append(f"start")
-                if label and label.lower() != 'начало' and label.lower() != 'start':
-                    lines.append(f":{label};")
-            elif node_type == 'end':
-                lines.append(f"stop")
-            elif node_type == 'decision':
-                successors = get_node_successors(graph, node)
-                if len(successors) >= 2:
-                    lines.append(f"if ({label}) then (да)")
+    def _generate_plantuml(self, context: AnalysisContext, structure: Optional[FlowStructure] = None) -> str:
+        """Вложенные if/while/repeat по структурному обходу, один проход с записью в буфер"""
+        if structure is None:
+            structure = FlowStructure(context)
+        labels = [_plantuml_text(label) for label in structure.labels]
+        buffer = io.StringIO()
+        write = buffer.write
+        write("@startuml\nskinparam defaultTextAlignment center\nskinparam backgroundColor white\n\n")
+
+        depth = 0
+        for event in structure.events():
+            kind, node = event[0], event[1]
+            if kind in ('else', 'endif', 'endwhile', 'repeat_while'):
+                depth -= 1
+            indent = '    ' * min(depth, _MAX_INDENT)
+
+            if kind == 'start':
+                write(f"{indent}start\n")
+                if labels[node].lower() not in ('начало', 'start'):
+                    write(f"{indent}:{labels[node]};\n")
+            elif kind == 'stop':
+                write(f"{indent}stop\n")
+            elif kind == 'action':
+                write(f"{indent}:{labels[node]};\n")
+            elif kind == 'goto':
+                write(f"{indent}:→ {labels[node]};\n{indent}detach\n")
+            elif kind == 'if':
+                shape, label = event[2], _plantuml_branch(event[3])
+                if shape == 'if':
+                    write(f"{indent}if ({labels[node]}) then{label}\n")
+                elif shape == 'switch':
+                    write(f"{indent}switch ({labels[node]})\n{indent}case ({_plantuml_text(event[3])})\n")
                 else:
-                    lines.append(f"if ({label}) then (yes)")
-            elif node_type == 'process':
-                lines.append(f":{label};")
-            else:
-                lines.append(f":{label};")
-        
-        for source, target in graph.edges():
-            edge_label = graph.edges[source, target].get('label', '')
-            source_type = graph.nodes[source].get('type', 'process')
-            
-            if source_type == 'decision':
-                if edge_label and 'нет' in edge_label.lower():
-                    lines.append(f"else (нет)")
-                elif edge_label and 'no' in edge_label.lower():
-                    lines.append(f"else (no)")
-        
-        if any(graph.nodes[node].get('type') == 'decision' for node in graph.nodes()):
-            lines.append("endif")
-        
-        lines.append("")
-        lines.append("@enduml")
-        
-        return '\n'.join(lines)
-    
-    def _generate_mermaid(self, graph: nx.DiGraph) -> str:
-        lines = ["flowchart TD"]
-        lines.append("")
-        
-        node_mapping = {}
-        for idx, node in enumerate(graph.nodes()):
-            node_id = f"n{idx}"
-            node_mapping[node] = node_id
-            
-            node_type = graph.nodes[node].get('type', 'process')
-            label = graph.nodes[node].get('label', node)
-            
-            if node_type == 'start':
-                lines.append(f"    {node_id}([{label}])")
-            elif node_type == 'end':
-                lines.append(f"    {node_id}([{label}])")
-            elif node_type == 'decision':
-                lines.append(f"    {node_id}{{{{{label}}}}}")
-            elif node_type == 'process':
-                lines.append(f"    {node_id}[{label}]")
-            elif node_type == 'data':
-                lines.append(f"    {node_id}[/{label}/]")
-            else:
-                lines.append(f"    {node_id}[{label}]")
-        
-        lines.append("")
-        
-        for source, target in graph.edges():
-            source_id = node_mapping[source]
-            target_id = node_mapping[target]
-            edge_label = graph.edges[source, target].get('label', '')
-            
-            if edge_label:
-                lines.append(f"    {source_id} -->|{edge_label}| {target_id}")
-            else:
-                lines.append(f"    {source_id} --> {target_id}")
-        
-        lines.append("")
-        
-        for node in graph.nodes():
-            node_type = graph.nodes[node].get('type', 'process')
-            node_id = node_mapping[node]
-            
-            if node_type == 'start':
-                lines.append(f"    style {node_id} fill:#90EE90,stroke:#228B22")
-            elif node_type == 'end':
-                lines.append(f"    style {node_id} fill:#FFB6C1,stroke:#DC143C")
-            elif node_type == 'decision':
-                lines.append(f"    style {node_id} fill:#FFD700,stroke:#FF8C00")
-            elif node_type == 'process':
-                lines.append(f"    style {node_id} fill:#87CEEB,stroke:#4682B4")
-        
-        return '\n'.join(lines)
-    
-    def generate_both(self, graph: nx.DiGraph) -> dict:
+                    write(f"{indent}fork\n")
+                depth += 1
+            elif kind == 'else':
+                shape = event[2]
+                if shape == 'if':
+                    write(f"{indent}else{_plantuml_branch(event[3])}\n")
+                elif shape == 'switch':
+                    write(f"{indent}case ({_plantuml_text(event[3])})\n")
+                else:
+                    write(f"{indent}fork again\n")
+                depth += 1
+            elif kind == 'endif':
+                write(f"{indent}{_PLANTUML_BRANCH_END[event[2]]}\n")
+            elif kind == 'while':
+                label = _plantuml_branch(event[2])
+                write(f"{indent}while ({labels[node]}){' is' + label if label else ''}\n")
+                depth += 1
+            elif kind == 'endwhile':
+                write(f"{indent}endwhile{_plantuml_branch(event[2])}\n")
+            elif kind == 'repeat':
+                write(f"{indent}repeat\n")
+                depth += 1
+            elif kind == 'repeat_while':
+                if node is None:
+                    write(f"{indent}repeat while\n")
+                else:
+                    back_label, exit_label = event[2], event[3]
+                    line = f"{indent}repeat while ({labels[node]})"
+                    if back_label:
+                        line += f" is ({_plantuml_text(back_label)})"
+                    if exit_label:
+                        line += f" not ({_plantuml_text(exit_label)})"
+                    write(line + "\n")
+
+        write("\n@enduml")
+        return buffer.getvalue()
+
+    def _generate_mermaid(self, context: AnalysisContext, structure: Optional[FlowStructure] = None) -> str:
+        """Узлы в порядке структурного обхода, циклы - вложенные subgraph, затем ребра и классы стилей"""
+        if structure is None:
+            structure = FlowStructure(context)
+        types = structure.types
+        buffer = io.StringIO()
+        write = buffer.write
+        write("flowchart TD\n\n")
+
+        # Узел попадает в subgraph, где объявлен впервые, поэтому ребра пишутся после всех объявлений
+        order: List[int] = []
+        declared = [False] * structure.count
+
+        def declare(node: int, indent: str) -> None:
+            if not declared[node]:
+                declared[node] = True
+                order.append(node)
+                write(f"{indent}{_mermaid_node(node, types[node], structure.labels[node])}\n")
+
+        depth = 1
+        for event in structure.events():
+            kind, node = event[0], event[1]
+            if kind in ('while', 'repeat'):
+                write(f"{'    ' * min(depth, _MAX_INDENT)}subgraph loop{node} [\" \"]\n")
+                depth += 1
+            if kind in ('endwhile', 'repeat_while'):
+                if node is not None and kind == 'repeat_while':
+                    declare(node, '    ' * min(depth, _MAX_INDENT))
+                depth -= 1
+                write(f"{'    ' * min(depth, _MAX_INDENT)}end\n")
+            elif kind in ('start', 'stop', 'action', 'if', 'while'):
+                declare(node, '    ' * min(depth, _MAX_INDENT))
+
+        for node in range(structure.count):
+            declare(node, '    ')
+        write("\n")
+
+        indices, edge_labels = structure.indices, structure.edge_labels
+        for source in order:
+            for position in range(structure.indptr[source], structure.indptr[source + 1]):
+                target, label = indices[position], edge_labels[position]
+                if label:
+                    write(f"    n{source} -->|\"{_mermaid_text(label)}\"| n{target}\n")
+                else:
+                    write(f"    n{source} --> n{target}\n")
+        write("\n")
+
+        members: Dict[str, List[str]] = {node_type: [] for node_type in _MERMAID_STYLES}
+        for node, node_type in enumerate(types):
+            if node_type in members:
+                members[node_type].append(f"n{node}")
+        for node_type, (class_name, style) in _MERMAID_STYLES.items():
+            if members[node_type]:
+                write(f"    classDef {class_name} {style}\n")
+                write(f"    class {','.join(members[node_type])} {class_name}\n")
+
+        return buffer.getvalue().rstrip('\n')
+
+    def generate_both(self, graph: CompactGraph, context: Optional[AnalysisContext] = None) -> dict:
+        if context is None:
+            context = AnalysisContext.from_graph(graph)
+        structure = FlowStructure(context)
         return {
-            'plantuml': self._generate_plantuml(graph),
-            'mermaid': self._generate_mermaid(graph)
+            'plantuml': self._generate_plantuml(context, structure),
+            'mermaid': self._generate_mermaid(context, structure)
         }
+
+
+# Отступ ограничен: иначе на глубокой вложенности размер кода растет квадратично
+_MAX_INDENT = 16
+
+_PLANTUML_BRANCH_END = {'if': 'endif', 'switch': 'endswitch', 'fork': 'end fork'}
+
+# Имена классов не совпадают с ключевыми словами Mermaid (end, start)
+_MERMAID_STYLES = {
+    'start': ('startNode', 'fill:#90EE90,stroke:#228B22'),
+    'end': ('endNode', 'fill:#FFB6C1,stroke:#DC143C'),
+    'decision': ('decisionNode', 'fill:#FFD700,stroke:#FF8C00'),
+    'process': ('processNode', 'fill:#87CEEB,stroke:#4682B4'),
+}
+
+
+def _plantuml_text(text: str) -> str:
+    """Метка в одну строку: перевод строки закончил бы действие или условие"""
+    return ' '.join(str(text).split())
+
+
+def _plantuml_branch(label: str) -> str:
+    """Метка ветки в скобках после then/else/is, пустая метка - без скобок"""
+    label = _plantuml_text(label)
+    return f" ({label})" if label else ""
+
+
+def _mermaid_text(text: str) -> str:
+    return ' '.join(str(text).split()).replace('"', '#quot;')
+
+
+def _mermaid_node(node: int, node_type: str, label: str) -> str:
+    text = _mermaid_text(label)
+    if node_type in ('start', 'end'):
+        return f'n{node}(["{text}"])'
+    if node_type == 'decision':
+        return f'n{node}{{{{"{text}"}}}}'
+    if node_type == 'data':
+        return f'n{node}[/"{text}"/]'
+    return f'n{node}["{text}"]'
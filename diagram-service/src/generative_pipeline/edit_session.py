@@ -0,0 +1,385 @@
+import asyncio
+import threading
+import time
+import uuid
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from typing import Any, Dict, FrozenSet, Iterator, List, NamedTuple, Optional, Set, Tuple
+
+from src.core.logger import app_logger
+from src.core.metrics import metrics
+from src.generative_pipeline.text_grammar import Frontier, GrammarParser, GraphBuilder, Statement
+from src.generative_pipeline.text_lexer import split_raw_sentences
+from src.generative_pipeline.text_parser import TextToGraphParser
+from src.preprocessing.text_preprocessor import TextPreprocessor
+from src.utils.compact_graph import CompactGraph
+from src.utils.graph_utils import add_node, add_edge
+
+
+# Сколько раз регион повторного разбора расширяется, прежде чем разобрать текст до конца
+MAX_SYNC_ATTEMPTS = 4
+
+
+Edge = Tuple[str, str, Optional[str]]
+
+
+class Unit(NamedTuple):
+    """Оператор верхнего уровня и то, что он добавил в граф"""
+    statement: Statement
+    # Закрывающие слова ("иначе", "конец если", ...) в тексте оператора: от них зависят блоки перед ним
+    closers: FrozenSet[str]
+    nodes: Tuple[str, ...] = ()
+    edges: Tuple[Edge, ...] = ()
+    # Число узлов и ребер графа и фронт до оператора: к этой точке граф откатывается при правке
+    mark: Optional[Tuple[int, int, Tuple[Tuple[str, Optional[str]], ...]]] = None
+
+
+class _UnitGraphBuilder(GraphBuilder):
+    """GraphBuilder, который дописывает операторы в существующий граф и сохраняет идентификаторы узлов"""
+
+    def __init__(self, graph: CompactGraph, frontier: Frontier, next_id: int):
+        super().__init__()
+        self.graph = graph
+        self.frontier = frontier
+        self.next_id = next_id
+        self._reuse: Iterator[str] = iter(())
+        self._created: List[str] = []
+        self._edges: List[Edge] = []
+
+    def emit_unit(self, unit: Unit) -> Unit:
+        mark = (self.graph.number_of_nodes(), self.graph.number_of_edges(), tuple(self.frontier))
+        self._reuse = iter(unit.nodes)
+        self._created = []
+        self._edges = []
+        self.emit(unit.statement)
+        return unit._replace(nodes=tuple(self._created), edges=tuple(self._edges), mark=mark)
+
+    def new_node(self, node_type: str, label: str) -> str:
+        node_id = f"node_{self.next_id}"
+        self.next_id += 1
+        add_node(self.graph, node_id, type=node_type, label=label)
+        return node_id
+
+    def _add(self, node_type: str, label: str) -> str:
+        node_id = next(self._reuse, None)
+        if node_id is None:
+            node_id = self.new_node(node_type, label)
+        else:
+            add_node(self.graph, node_id, type=node_type, label=label)
+        self._created.append(node_id)
+        return node_id
+
+    def _link(self, source: str, target: str, label: Optional[str]) -> None:
+        super()._link(source, target, label)
+        self._edges.append((source, target, label))
+
+
+class IncrementalTextParser:
+    """Повторный разбор только измененной части описания.
+
+    Текст хранится списком предложений; новый текст сравнивается со старым по общему началу и концу.
+    Заново разбирается регион от оператора перед изменением до первого неизмененного оператора после
+    него. Если в разборе региона этот оператор начинается там же, где раньше, дальше все совпадает.
+    Иначе регион расширяется. Если изменилось, какие закрывающие слова встречаются после региона,
+    блоки перед ним могли открыться иначе, и текст разбирается целиком. Граф откатывается к первому
+    измененному оператору и достраивается из операторов без разбора текста; узлы неизмененных
+    операторов сохраняют идентификаторы, поэтому патч считается только по достроенной части.
+    """
+
+    def __init__(self, parser: TextToGraphParser, preprocessor: TextPreprocessor):
+        self.parser = parser
+        self.preprocessor = preprocessor
+        self.raw: List[str] = []
+        self.sentences: List[str] = []
+        self.offsets: List[int] = []
+        self.text = ''
+        self.units: List[Unit] = []
+        self.unit_starts: List[int] = []
+        self.graph: CompactGraph = GraphBuilder().graph
+        self.frontier: Frontier = []
+        self.next_id = 0
+        # Узлы и ребра заглушки "Начало -> текст -> Конец" для текста без распознанных шагов
+        self.fallback: Unit = Unit(None, frozenset())
+
+    def update(self, text: str) -> Dict[str, Any]:
+        """Новый полный текст -> патч графа (удаленные и добавленные узлы и ребра) и статистика разбора"""
+        start_time = time.perf_counter()
+        raw = split_raw_sentences(text)
+        old_raw = self.raw
+
+        prefix = 0
+        limit = min(len(raw), len(old_raw))
+        while prefix < limit and raw[prefix] == old_raw[prefix]:
+            prefix += 1
+        suffix = 0
+        while suffix < limit - prefix and raw[-1 - suffix] == old_raw[-1 - suffix]:
+            suffix += 1
+
+        if prefix == len(raw) == len(old_raw):
+            return {"changed": False, "patch": self._empty_patch(), "stats": self._stats(0, 0, False, start_time)}
+
+        # Предобрабатываются только измененные предложения
+        changed = [self.preprocessor.preprocess(sentence) for sentence in raw[prefix:len(raw) - suffix]]
+        sentences = self.sentences[:prefix] + changed + self.sentences[len(self.sentences) - suffix:]
+        new_text = ' '.join(sentences)
+
+        # Границы изменения в старом нормализованном тексте; после них текст только сдвигается на delta
+        change_start = self.offsets[prefix] if prefix < len(self.offsets) else len(self.text)
+        old_change_end = self.offsets[len(self.offsets) - suffix] if suffix else len(self.text)
+        delta = len(new_text) - len(self.text)
+
+        offsets = []
+        position = 0
+        for sentence in sentences:
+            offsets.append(position)
+            position += len(sentence) + 1
+
+        old_units = self.units
+        reparsed_chars, full = self._reparse(new_text, change_start, old_change_end, delta, bool(suffix))
+
+        self.raw = raw
+        self.sentences = sentences
+        self.offsets = offsets
+        self.text = new_text
+
+        # Операторы до первого измененного - те же объекты, их часть графа не трогается
+        first = 0
+        limit = min(len(old_units), len(self.units))
+        while first < limit and old_units[first].statement is self.units[first].statement:
+            first += 1
+        patch = self._rebuild_graph(old_units, first)
+
+        metrics.increment("edit_session_updates")
+        metrics.increment("edit_session_reparsed_chars", reparsed_chars)
+        if full:
+            metrics.increment("edit_session_full_reparses")
+        return {
+            "changed": bool(patch["added_nodes"] or patch["removed_nodes"] or patch["added_edges"] or patch["removed_edges"]),
+            "patch": patch,
+            "stats": self._stats(reparsed_chars, len(old_units), full, start_time)
+        }
+
+    def _reparse(self, text: str, change_start: int, old_change_end: int, delta: int, has_suffix: bool) -> Tuple[int, bool]:
+        units, starts = self.units, self.unit_starts
+
+        if not units:
+            return self._reparse_region(text, 0, None, delta), True
+
+        # Оператор перед измененным тоже разбирается заново: он мог заглядывать в следующее предложение
+        containing = bisect_right(starts, change_start) - 1
+        first = max(0, containing - 1)
+        sync = bisect_left(starts, old_change_end) if has_suffix else len(units)
+
+        for attempt in range(MAX_SYNC_ATTEMPTS):
+            if sync >= len(units):
+                break
+            chars = self._reparse_region(text, first, sync, delta)
+            if chars is not None:
+                return chars, False
+            sync = min(len(units), sync + 2 ** attempt)
+
+        chars = self._reparse_region(text, first, None, delta)
+        if chars is None:
+            return self._reparse_region(text, 0, None, delta), True
+        return chars, first == 0
+
+    def _reparse_region(self, text: str, first: int, sync: Optional[int], delta: int) -> Optional[int]:
+        """Разбор операторов [first, sync) заново; None - регион не сошелся или изменились закрывающие слова"""
+        units, starts = self.units, self.unit_starts
+        # С первого оператора регион начинается с начала текста: до него могут стоять лишние закрывающие слова
+        region_start = starts[first] if first > 0 else 0
+        if sync is None:
+            region_end, tail = len(text), []
+        else:
+            # Регион включает и сам оператор sync: операторы перед ним могут заглядывать в его текст
+            region_end = starts[sync + 1] + delta if sync + 1 < len(units) else len(text)
+            tail = units[sync + 1:]
+
+        trailing: Set[str] = set()
+        for unit in tail:
+            trailing |= unit.closers
+
+        region = text[region_start:region_end]
+        tokens = self.parser.lexer.tokens(region)
+        grammar = GrammarParser(region, tokens, self.parser.start_keywords, self.parser.end_keywords, trailing)
+        program = grammar.parse()
+        program_starts = [region_start + tokens[position].start for position in grammar.statement_starts]
+
+        if sync is not None:
+            expected = starts[sync] + delta
+            index = bisect_left(program_starts, expected)
+            if index == len(program_starts) or program_starts[index] != expected:
+                return None
+            program, program_starts = program[:index], program_starts[:index]
+            tail = units[sync:]
+
+        # Закрывающие слова по операторам; стоящие до первого оператора продолжают оператор перед регионом
+        closers: List[Set[str]] = [set() for _ in program]
+        leading: Set[str] = set()
+        token_starts = [tokens[position].start for position in grammar.statement_starts[:len(program)]]
+        for position, kind in grammar.closers:
+            index = bisect_right(token_starts, tokens[position].start) - 1
+            if sync is not None and region_start + tokens[position].start >= starts[sync] + delta:
+                continue
+            if index < 0:
+                leading.add(kind)
+            else:
+                closers[index].add(kind)
+
+        if first > 0:
+            old_tail: Set[str] = set()
+            for unit in units[first:]:
+                old_tail |= unit.closers
+            new_tail = set(leading)
+            for kinds in closers:
+                new_tail |= kinds
+            for unit in tail:
+                new_tail |= unit.closers
+            if old_tail != new_tail:
+                return None
+
+        head = units[:first]
+        if leading and head:
+            head[-1] = head[-1]._replace(closers=head[-1].closers | frozenset(leading))
+
+        # Оператор, разобранный так же, как раньше, остается прежним: его узлы не перестраиваются
+        replaced = units[first:len(units) - len(tail)]
+        new_units = [
+            replaced[index]._replace(closers=frozenset(kinds))
+            if index < len(replaced) and replaced[index].statement == statement
+            else Unit(statement, frozenset(kinds))
+            for index, (statement, kinds) in enumerate(zip(program, closers))
+        ]
+        self.units = head + new_units + list(tail)
+        self.unit_starts = (
+            starts[:first]
+            + program_starts
+            + [start + delta for start in starts[len(units) - len(tail):]]
+        )
+        return len(region)
+
+    def _rebuild_graph(self, old_units: List[Unit], first: int) -> Dict[str, List[Any]]:
+        """Откат графа к оператору first, достройка из текущих операторов и патч по достроенной части"""
+        removed = old_units[first:] + [self.fallback]
+        if first < len(old_units):
+            num_nodes, num_edges, frontier = old_units[first].mark
+            self.frontier = list(frontier)
+        elif self.fallback.mark is not None:
+            num_nodes, num_edges, _ = self.fallback.mark
+        else:
+            num_nodes, num_edges = self.graph.number_of_nodes(), self.graph.number_of_edges()
+        self.graph.truncate(num_nodes, num_edges)
+
+        builder = _UnitGraphBuilder(self.graph, self.frontier, self.next_id)
+        self.units[first:] = [builder.emit_unit(unit) for unit in self.units[first:]]
+        self.frontier = builder.frontier
+
+        self.fallback = Unit(None, frozenset())
+        if self.graph.number_of_nodes() == 0 and self.text.strip():
+            # Как в TextToGraphParser.parse: текст без распознанных шагов - один процесс
+            mark = (0, 0, ())
+            start = builder.new_node('start', 'Начало')
+            process = builder.new_node('process', self.text[:100])
+            end = builder.new_node('end', 'Конец')
+            add_edge(self.graph, start, process)
+            add_edge(self.graph, process, end)
+            self.fallback = Unit(None, frozenset(), (start, process, end), ((start, process, None), (process, end, None)), mark)
+
+        self.next_id = builder.next_id
+        return self._diff(removed, self.units[first:] + [self.fallback])
+
+    def _diff(self, old: List[Unit], new: List[Unit]) -> Dict[str, List[Any]]:
+        old_nodes = [node for unit in old for node in unit.nodes]
+        new_nodes = [node for unit in new for node in unit.nodes]
+        old_edges = [edge for unit in old for edge in unit.edges]
+        new_edges = [edge for unit in new for edge in unit.edges]
+        old_node_set, new_node_set = set(old_nodes), set(new_nodes)
+        old_edge_set, new_edge_set = set(old_edges), set(new_edges)
+        return {
+            "removed_nodes": [node for node in old_nodes if node not in new_node_set],
+            "added_nodes": [
+                {"id": node, "type": self.graph.nodes[node].get('type'), "label": self.graph.nodes[node].get('label')}
+                for node in new_nodes if node not in old_node_set
+            ],
+            "removed_edges": [
+                {"source": source, "target": target, "label": label}
+                for source, target, label in old_edges if (source, target, label) not in new_edge_set
+            ],
+            "added_edges": [
+                {"source": source, "target": target, "label": label}
+                for source, target, label in new_edges if (source, target, label) not in old_edge_set
+            ],
+        }
+
+    @staticmethod
+    def _empty_patch() -> Dict[str, List[Any]]:
+        return {"removed_nodes": [], "added_nodes": [], "removed_edges": [], "added_edges": []}
+
+    def _stats(self, reparsed_chars: int, previous_units: int, full: bool, start_time: float) -> Dict[str, Any]:
+        return {
+            "total_chars": len(self.text),
+            "reparsed_chars": reparsed_chars,
+            "units": len(self.units),
+            "previous_units": previous_units,
+            "full_reparse": full,
+            "parse_time_ms": round((time.perf_counter() - start_time) * 1000, 3)
+        }
+
+
+class EditSession:
+    """Состояние сессии редактирования: инкрементальный разбор и последние артефакты"""
+
+    def __init__(self, session_id: str, parser: IncrementalTextParser, options: Dict[str, Any]):
+        self.session_id = session_id
+        self.parser = parser
+        self.options = options
+        # Правки одной сессии применяются по очереди; ожидание не блокирует цикл событий
+        self.lock = asyncio.Lock()
+        self.last_used = time.monotonic()
+        # Код, описание и картинка последней версии графа; пересчитываются, только если граф изменился
+        self.artifacts: Dict[str, Any] = {}
+
+
+class EditSessionStore:
+    """Сессии в памяти процесса: вытесняются по времени простоя и по числу (самая давняя первой)"""
+
+    def __init__(self, max_sessions: int, ttl_seconds: float):
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self._sessions: "OrderedDict[str, EditSession]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def create(self, parser: TextToGraphParser, preprocessor: TextPreprocessor, options: Dict[str, Any]) -> EditSession:
+        session = EditSession(uuid.uuid4().hex, IncrementalTextParser(parser, preprocessor), options)
+        with self._lock:
+            self._evict()
+            self._sessions[session.session_id] = session
+            while len(self._sessions) > self.max_sessions:
+                evicted, _ = self._sessions.popitem(last=False)
+                app_logger.debug(f"Edit session {evicted} evicted")
+            metrics.set_gauge("edit_sessions", len(self._sessions))
+        return session
+
+    def get(self, session_id: str) -> Optional[EditSession]:
+        with self._lock:
+            self._evict()
+            session = self._sessions.get(session_id)
+            if session is not None:
+                session.last_used = time.monotonic()
+                self._sessions.move_to_end(session_id)
+            return session
+
+    def delete(self, session_id: str) -> bool:
+        with self._lock:
+            removed = self._sessions.pop(session_id, None) is not None
+            metrics.set_gauge("edit_sessions", len(self._sessions))
+            return removed
+
+    def _evict(self) -> None:
+        deadline = time.monotonic() - self.ttl_seconds
+        while self._sessions:
+            session_id, session = next(iter(self._sessions.items()))
+            if session.last_used >= deadline:
+                break
+            del self._sessions[session_id]
+            app_logger.debug(f"Edit session {session_id} expired")
@@ -0,0 +1,364 @@
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from src.utils.analysis_context import AnalysisContext
+
+
+class FlowStructure:
+    """Структурный разбор блок-схемы для генерации кода.
+
+    Обратные ребра DFS задают циклы (тела собираются в лес вложенных циклов), непосредственный
+    пост-доминатор ветвления - точку слияния его веток. walk() обходит граф один раз в порядке
+    вложенности и выдает события:
+
+        ('start' | 'stop' | 'action' | 'goto', узел)
+        ('if', узел, вид, метка ветки), ('else', узел, вид, метка ветки), ('endif', узел, вид)
+            вид - 'if' (две ветки решения), 'switch' (больше двух), 'fork' (у обычного узла)
+        ('while', заголовок, метка входа в тело), ('endwhile', заголовок, метка выхода)
+        ('repeat', заголовок), ('repeat_while', решение или None, метка возврата, метка выхода)
+
+    Узлы - индексы в context.nodes. Разбор и обход почти линейны по числу узлов и ребер
+    (лес циклов - union-find, пост-доминаторы - несколько проходов по графу).
+    """
+
+    def __init__(self, context: AnalysisContext):
+        nodes = context.nodes
+        self.count = count = len(nodes)
+        index = {node['id']: idx for idx, node in enumerate(nodes)}
+        self.types = [node.get('type', 'process') for node in nodes]
+        self.labels = [str(node.get('label') or node['id']) for node in nodes]
+
+        # Смежность - плоские CSR-списки, как в int_adjacency: без списка на каждый узел
+        sources = [index[edge['source']] for edge in context.edges]
+        targets = [index[edge['target']] for edge in context.edges]
+        labels = [str(edge.get('label') or '') for edge in context.edges]
+        # Исходящие ребра узла - в порядке context.edges: цели, метки и признак обратного ребра
+        self.indptr, order = _csr_order(sources, count)
+        self.indices = [targets[edge] for edge in order]
+        self.edge_labels = [labels[edge] for edge in order]
+        self.pred_indptr, order = _csr_order(targets, count)
+        self.pred_indices = [sources[edge] for edge in order]
+
+        self.entries = self._entries()
+        self.back = self._back_edges()
+        self.loop_parent = self._loop_forest()
+        self.joins = self._post_dominators()
+        self._emitted = [False] * count
+        self._active = [False] * count
+        self._events: Optional[List[Tuple]] = None
+
+    def _entries(self) -> List[int]:
+        """Узлы начала, затем узлы без входящих ребер"""
+        entries = [node for node in range(self.count) if self.types[node] == 'start']
+        entries += [
+            node for node in range(self.count)
+            if self.pred_indptr[node] == self.pred_indptr[node + 1] and self.types[node] != 'start'
+        ]
+        return entries
+
+    def _back_edges(self) -> List[bool]:
+        """Итеративный DFS от входов: ребро в узел на стеке обхода - обратное.
+
+        Заодно номера узлов в прямом порядке и последний номер в поддереве DFS каждого узла.
+        """
+        indptr, indices = self.indptr, self.indices
+        state = [0] * self.count
+        back = [False] * len(indices)
+        self.preorder = preorder = [0] * self.count
+        self.subtree_end = subtree_end = [0] * self.count
+        clock = 0
+        for root in self.entries + list(range(self.count)):
+            if state[root] != 0:
+                continue
+            state[root] = 1
+            preorder[root] = clock
+            clock += 1
+            work = [(root, indptr[root])]
+            while work:
+                node, position = work[-1]
+                if position < indptr[node + 1]:
+                    work[-1] = (node, position + 1)
+                    successor = indices[position]
+                    if state[successor] == 0:
+                        state[successor] = 1
+                        preorder[successor] = clock
+                        clock += 1
+                        work.append((successor, indptr[successor]))
+                    elif state[successor] == 1:
+                        back[position] = True
+                else:
+                    state[node] = 2
+                    subtree_end[node] = clock - 1
+                    work.pop()
+        return back
+
+    def _loop_forest(self) -> List[Optional[int]]:
+        """Заголовок ближайшего охватывающего цикла для каждого узла (лес циклов, как у Havlak).
+
+        Заголовки обрабатываются от внутренних к внешним; уже собранный внутренний цикл
+        представлен своим заголовком через union-find, поэтому каждое ребро смотрится O(1) раз.
+        Тело не выходит за поддерево DFS заголовка: лишние входы нерегулярного цикла не захватываются.
+        """
+        count = self.count
+        parent: List[Optional[int]] = [None] * count
+        representative = list(range(count))
+
+        def find(node: int) -> int:
+            root = node
+            while representative[root] != root:
+                root = representative[root]
+            while representative[node] != root:
+                representative[node], node = root, representative[node]
+            return root
+
+        latches: Dict[int, List[int]] = {}
+        for node in range(count):
+            for position in range(self.indptr[node], self.indptr[node + 1]):
+                if self.back[position]:
+                    latches.setdefault(self.indices[position], []).append(node)
+
+        self.is_header = [False] * count
+        for header in sorted(latches, key=lambda node: self.preorder[node], reverse=True):
+            self.is_header[header] = True
+            first, last = self.preorder[header], self.subtree_end[header]
+            work = [find(latch) for latch in latches[header]]
+            while work:
+                node = work.pop()
+                if node == header or representative[node] == header:
+                    continue
+                if not first <= self.preorder[node] <= last:
+                    continue
+                parent[node] = header
+                representative[node] = header
+                for position in range(self.pred_indptr[node], self.pred_indptr[node + 1]):
+                    outer = find(self.pred_indices[position])
+                    if outer != header and outer != node:
+                        work.append(outer)
+
+        # Интервалы обхода леса: узел в теле цикла <=> он в поддереве заголовка
+        children: Dict[int, List[int]] = {header: [] for header in latches}
+        for node, header in enumerate(parent):
+            if header is not None:
+                children[header].append(node)
+        self._loop_enter = enter = [0] * count
+        self._loop_leave = leave = [0] * count
+        clock = 0
+        for root in range(count):
+            if parent[root] is not None:
+                continue
+            enter[root] = clock
+            clock += 1
+            work = [(root, iter(children.get(root, ())))]
+            while work:
+                node, nested = work[-1]
+                for child in nested:
+                    enter[child] = clock
+                    clock += 1
+                    work.append((child, iter(children.get(child, ()))))
+                    break
+                else:
+                    leave[node] = clock - 1
+                    work.pop()
+        return parent
+
+    def in_loop(self, node: int, header: int) -> bool:
+        """Узел в теле цикла с заголовком header (вложенные циклы - тоже)"""
+        return self._loop_enter[header] <= self._loop_enter[node] <= self._loop_leave[header]
+
+    def _post_dominators(self) -> List[Optional[int]]:
+        """Непосредственные пост-доминаторы (Cooper-Harvey-Kennedy на обратном графе с виртуальным стоком).
+
+        None - веток решения ничто не объединяет до конца схемы или узел не достигает конца.
+        """
+        count = self.count
+        exit_node = count
+        indptr, indices = self.indptr, self.indices
+
+        # Обратный граф: из стока в узлы без исходящих ребер, из узла - в его предшественников
+        number = [-1] * (count + 1)
+        postorder: List[int] = []
+        sinks = [node for node in range(count) if indptr[node] == indptr[node + 1]]
+        visited = [False] * (count + 1)
+        visited[exit_node] = True
+        work = [(exit_node, iter(sinks))]
+        while work:
+            node, successors = work[-1]
+            for successor in successors:
+                if not visited[successor]:
+                    visited[successor] = True
+                    work.append((successor, iter(self.pred_indices[self.pred_indptr[successor]:self.pred_indptr[successor + 1]])))
+                    break
+            else:
+                number[node] = len(postorder)
+                postorder.append(node)
+                work.pop()
+
+        ipdom: List[Optional[int]] = [None] * (count + 1)
+        ipdom[exit_node] = exit_node
+
+        def intersect(a: int, b: int) -> int:
+            while a != b:
+                while number[a] < number[b]:
+                    a = ipdom[a]
+                while number[b] < number[a]:
+                    b = ipdom[b]
+            return a
+
+        order = postorder[-2::-1]
+        changed = True
+        while changed:
+            changed = False
+            for node in order:
+                targets = indices[indptr[node]:indptr[node + 1]] or [exit_node]
+                result = None
+                for target in targets:
+                    if ipdom[target] is None:
+                        continue
+                    result = target if result is None else intersect(result, target)
+                if result is not None and ipdom[node] != result:
+                    ipdom[node] = result
+                    changed = True
+
+        return [None if join == exit_node else join for join in ipdom[:count]]
+
+    def events(self) -> List[Tuple]:
+        """События обхода, посчитанные один раз: PlantUML и Mermaid пишутся по одному обходу"""
+        if self._events is None:
+            self._events = list(self.walk())
+        return self._events
+
+    def walk(self) -> Iterator[Tuple]:
+        """События структурного обхода: сначала от входов, затем от узлов, до которых обход не дошел"""
+        self._emitted = [False] * self.count
+        self._active = [False] * self.count
+        for root in self.entries + list(range(self.count)):
+            if self._emitted[root]:
+                continue
+            # Вложенные конструкции - кадры стека генераторов, а не рекурсия: глубина схемы не ограничена
+            stack = [self._region(root, None)]
+            value = None
+            while stack:
+                try:
+                    item = stack[-1].send(value)
+                except StopIteration as finished:
+                    stack.pop()
+                    value = finished.value
+                    continue
+                value = None
+                if item[0] == 'region':
+                    stack.append(self._region(*item[1:]))
+                else:
+                    yield item
+
+    def _region(
+        self,
+        node: Optional[int],
+        stop: Optional[int],
+        repeat: Optional[int] = None
+    ) -> Iterator[Tuple]:
+        """Последовательность от node до точки слияния stop или до возврата в активный цикл.
+
+        Вложенная конструкция запрашивается событием ('region', начало, stop[, repeat]),
+        в ответ приходит узел, с которого продолжить. repeat - заголовок цикла с постусловием,
+        тело которого обходит этот кадр.
+        """
+        types, indptr = self.types, self.indptr
+        emitted, active = self._emitted, self._active
+        result = None
+        closed = False
+
+        while node is not None and node != stop:
+            if emitted[node] and active[node]:
+                break
+            if emitted[node] and types[node] != 'end':
+                yield ('goto', node)
+                break
+            emitted[node] = True
+            kind = types[node]
+            start, end = indptr[node], indptr[node + 1]
+            targets, labels, back = self.indices[start:end], self.edge_labels[start:end], self.back[start:end]
+            position: Optional[int] = None
+
+            if kind == 'end':
+                yield ('stop', node)
+                break
+
+            if self.is_header[node] and not active[node]:
+                inner = [k for k, target in enumerate(targets) if self.in_loop(target, node)]
+                outer = [k for k, target in enumerate(targets) if not self.in_loop(target, node)]
+                active[node] = True
+                if kind == 'decision' and len(inner) == 1 and len(outer) == 1 and targets[inner[0]] != node:
+                    yield ('while', node, labels[inner[0]])
+                    yield ('region', targets[inner[0]], None)
+                    yield ('endwhile', node, labels[outer[0]])
+                    active[node] = False
+                    position = outer[0]
+                else:
+                    emitted[node] = False
+                    yield ('repeat', node)
+                    header, node = node, (yield ('region', node, None, node))
+                    active[header] = False
+                    continue
+
+            elif (
+                kind == 'decision' and repeat is not None
+                and len(targets) == 2 and back.count(True) == 1
+                and targets[back.index(True)] == repeat
+                and not self.in_loop(targets[back.index(False)], repeat)
+            ):
+                # Условие цикла с постусловием: тело закончено, продолжение - ветка выхода
+                latch, leave = back.index(True), back.index(False)
+                yield ('repeat_while', node, labels[latch], labels[leave])
+                closed = True
+                result = targets[leave]
+                break
+
+            elif len(targets) < 2:
+                yield ('start' if kind == 'start' else 'action', node)
+                position = 0 if targets else None
+
+            else:
+                if kind == 'decision':
+                    shape = 'if' if len(targets) == 2 else 'switch'
+                else:
+                    yield ('start' if kind == 'start' else 'action', node)
+                    shape = 'fork'
+                join = self.joins[node]
+                for k, target in enumerate(targets):
+                    yield ('if' if k == 0 else 'else', node, shape, labels[k])
+                    if not back[k] and target != join:
+                        yield ('region', target, join)
+                yield ('endif', node, shape)
+                if join is None or active[join]:
+                    break
+                node = join
+                continue
+
+            if position is None:
+                break
+            target = targets[position]
+            if back[position]:
+                if not active[target]:
+                    yield ('goto', target)
+                break
+            node = target
+        else:
+            result = node
+
+        if repeat is not None and not closed:
+            yield ('repeat_while', None, '', '')
+        return result
+
+
+def _csr_order(keys: List[int], count: int) -> Tuple[List[int], List[int]]:
+    """Устойчивая сортировка подсчетом: indptr по ключам и порядок элементов, сгруппированных по ключу"""
+    indptr = [0] * (count + 1)
+    for key in keys:
+        indptr[key + 1] += 1
+    for node in range(count):
+        indptr[node + 1] += indptr[node]
+    fill = indptr[:-1]
+    order = [0] * len(keys)
+    for item, key in enumerate(keys):
+        order[fill[key]] = item
+        fill[key] += 1
+    return indptr, order
@@ -0,0 +1,82 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+from src.core.logger import app_logger
+from src.core.config import settings
+from src.core.metrics import metrics
+from src.generative_pipeline.layered_layout import Layout
+from src.utils.compact_graph import CompactGraph
+
+
+def layout_key(graph: CompactGraph, direction: str) -> bytes:
+    """Канонический хэш графа для укладки: узлы и подписи в порядке узлов, ребра и подписи ребер, направление"""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(direction.encode('utf-8'))
+    digest.update(np.array([graph.number_of_nodes(), graph.number_of_edges()], dtype=np.int64).tobytes())
+    # Разделитель \x1f не встречается в подписях, поэтому разные наборы строк не склеиваются в одну
+    digest.update('\x1f'.join(map(str, graph.nodes)).encode('utf-8'))
+    digest.update(b'\x1e')
+    digest.update('\x1f'.join(map(str, graph.node_values('label', ''))).encode('utf-8'))
+    digest.update(b'\x1e')
+    src, dst = graph.edge_arrays()
+    digest.update(np.ascontiguousarray(src, dtype=np.int64).tobytes())
+    digest.update(np.ascontiguousarray(dst, dtype=np.int64).tobytes())
+    digest.update('\x1f'.join(map(str, graph.edge_values('label', ''))).encode('utf-8'))
+    return digest.digest()
+
+
+class LayoutCache:
+    """LRU-кэш укладок по каноническому хэшу графа: один и тот же граф в PNG, SVG и с другим dpi укладывается один раз"""
+
+    def __init__(self, max_size: Optional[int] = None):
+        self.max_size = max_size if max_size is not None else settings.layout_cache_size
+        self._entries: "OrderedDict[bytes, Layout]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        app_logger.info(f"LayoutCache initialized with max_size={self.max_size}")
+
+    def get(self, key: bytes) -> Optional[Layout]:
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self._misses += 1
+            else:
+                self._entries.move_to_end(key)
+                self._hits += 1
+        self._report(hit=value is not None)
+        return value
+
+    def put(self, key: bytes, value: Layout) -> None:
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+            size = len(self._entries)
+        metrics.set_gauge("layout_cache_size", size)
+
+    def _report(self, hit: bool) -> None:
+        metrics.increment("layout_cache_hits" if hit else "layout_cache_misses")
+        metrics.set_gauge("layout_cache_hit_rate", self.hit_rate)
+
+    @property
+    def hit_rate(self) -> float:
+        total = self._hits + self._misses
+        return self._hits / total if total else 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": self.hit_rate
+            }
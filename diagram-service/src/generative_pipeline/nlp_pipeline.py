@@ -0,0 +1,284 @@
+import re
+import threading
+import time
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from src.core.config import settings
+from src.core.logger import app_logger
+from src.core.metrics import metrics
+from src.generative_pipeline.text_grammar import KEYWORDS
+from src.generative_pipeline.text_lexer import split_raw_sentences
+
+
+class NLPToken(NamedTuple):
+    text: str
+    # Части речи и отношения в разметке Universal Dependencies: 'VERB', 'advcl', 'conj', ...
+    pos: str
+    rel: str
+    feats: Dict[str, str]
+    # Позиции в предложении
+    start: int
+    end: int
+
+
+class SentenceAnalysis(NamedTuple):
+    # Условие из придаточного ("когда X, ...", "в случае X ..."); None - предложение безусловное
+    condition: Optional[str]
+    # Действия главной части: каждое начинается с глагола в инфинитиве или повелительном наклонении
+    actions: Tuple[str, ...]
+    # Предложение в виде, который разбирает GrammarParser
+    rewritten: str
+
+
+# Предложения с конструкциями грамматики разбирает GrammarParser, NLP их не переписывает
+GRAMMAR_SEQUENCES = frozenset(
+    words
+    for kind in ('if', 'else', 'end_if', 'while', 'for_each', 'repeat', 'until', 'end_loop')
+    for words in KEYWORDS[kind]
+)
+CONNECTOR_WORDS = frozenset(words[0] for words in KEYWORDS['connector'] if len(words) == 1)
+
+# Более длинные маркеры проверяются первыми: "в случае если" раньше "в случае"
+CONDITION_MARKERS: Tuple[Tuple[str, ...], ...] = (
+    ('в', 'случае', 'если'),
+    ('при', 'условии', 'что'),
+    ('в', 'случае'),
+    ('при', 'условии'),
+    ('когда',),
+    ('in', 'case'),
+    ('when',),
+)
+MODAL_WORDS = frozenset((
+    'необходимо', 'нужно', 'надо', 'следует', 'требуется', 'нужна', 'нужен',
+    'должен', 'должна', 'должно', 'должны', 'must', 'should',
+))
+ACTION_SEPARATORS = frozenset(('и', ',', 'and', 'а', 'также'))
+
+WORD_PATTERN = re.compile(r'\w+')
+
+
+def _has_grammar_keyword(words: List[str]) -> bool:
+    return any(
+        tuple(words[position:position + len(sequence)]) == sequence
+        for position, word in enumerate(words)
+        for sequence in GRAMMAR_SEQUENCES if sequence[0] == word
+    )
+
+
+def _is_action(token: NLPToken) -> bool:
+    return token.pos == 'VERB' and (token.feats.get('VerbForm') == 'Inf' or token.feats.get('Mood') == 'Imp')
+
+
+def analyze_sentence(sentence: str, tokens: Sequence[NLPToken]) -> SentenceAnalysis:
+    """Условие и действия предложения по морфологии и синтаксису"""
+    unchanged = SentenceAnalysis(None, (), sentence)
+    lower = [token.text.lower() for token in tokens]
+    if not tokens or _has_grammar_keyword(lower):
+        return unchanged
+
+    end = len(tokens)
+    while end > 0 and tokens[end - 1].pos == 'PUNCT':
+        end -= 1
+    terminator = sentence[tokens[end - 1].end:].strip() if end else ''
+    terminator = terminator or '.'
+
+    # Условие: маркер в начале предложения, затем все до первого действия
+    condition = None
+    body = 0
+    for marker in CONDITION_MARKERS:
+        if tuple(lower[:len(marker)]) != marker:
+            continue
+        first_action = next((i for i in range(len(marker), end) if _is_action(tokens[i])), None)
+        if first_action is None:
+            break
+        last = first_action
+        while last > len(marker) and (tokens[last - 1].pos == 'PUNCT' or lower[last - 1] in ('то', 'тогда', 'then')):
+            last -= 1
+        if last > len(marker):
+            condition = sentence[tokens[len(marker)].start:tokens[last - 1].end]
+            body = first_action
+        break
+
+    # Действия: сочиненные глаголы ("проверить заявку и отправить ответ") - отдельные шаги
+    verbs = [i for i in range(body, end) if _is_action(tokens[i])]
+    if not verbs:
+        return unchanged
+    bounds = [verbs[0]]
+    for verb in verbs[1:]:
+        if tokens[verb].rel == 'conj' and lower[verb - 1] in ACTION_SEPARATORS:
+            bounds.append(verb)
+
+    # Перед первым действием допускаются только связки ("затем") и модальные слова ("необходимо")
+    prefix = range(body, verbs[0])
+    if any(lower[i] not in CONNECTOR_WORDS and lower[i] not in MODAL_WORDS and tokens[i].pos != 'PUNCT' for i in prefix):
+        return unchanged
+    connectors = ' '.join(tokens[i].text for i in prefix if lower[i] in CONNECTOR_WORDS)
+    dropped_modal = any(lower[i] in MODAL_WORDS for i in prefix)
+
+    actions = []
+    for index, start in enumerate(bounds):
+        stop = bounds[index + 1] - 1 if index + 1 < len(bounds) else end
+        while stop > start and (tokens[stop - 1].pos == 'PUNCT' or lower[stop - 1] in ACTION_SEPARATORS):
+            stop -= 1
+        actions.append(sentence[tokens[start].start:tokens[stop - 1].end])
+
+    if condition is None and len(actions) == 1 and not dropped_modal:
+        return unchanged
+
+    if connectors:
+        actions[0] = f"{connectors} {actions[0][:1].lower()}{actions[0][1:]}"
+    if condition is not None:
+        # Все действия главной части - ветка "Да"
+        rewritten = f"Если {condition}, то {', '.join(actions)}{terminator}"
+    else:
+        rewritten = ' '.join(f"{action[:1].upper()}{action[1:]}{terminator}" for action in actions)
+    return SentenceAnalysis(condition, tuple(actions), rewritten)
+
+
+class _SpacyBackend:
+    name = 'spacy'
+
+    def __init__(self, model_name: str):
+        import spacy
+        # Для условий и действий нужны только морфология и синтаксис
+        self.nlp = spacy.load(model_name, exclude=['ner'])
+
+    def analyze(self, sentences: List[str], batch_size: int) -> List[List[NLPToken]]:
+        return [
+            [
+                NLPToken(token.text, token.pos_, token.dep_.lower(), token.morph.to_dict(), token.idx, token.idx + len(token.text))
+                for token in doc
+            ]
+            for doc in self.nlp.pipe(sentences, batch_size=batch_size)
+        ]
+
+
+class _NatashaBackend:
+    name = 'natasha'
+
+    def __init__(self):
+        from natasha import NewsEmbedding, NewsMorphTagger, NewsSyntaxParser
+        from razdel import tokenize
+
+        embedding = NewsEmbedding()
+        self.morph_tagger = NewsMorphTagger(embedding)
+        self.syntax_parser = NewsSyntaxParser(embedding)
+        self._tokenize = tokenize
+
+    def analyze(self, sentences: List[str], batch_size: int) -> List[List[NLPToken]]:
+        spans = [list(self._tokenize(sentence)) for sentence in sentences]
+        words = [[span.text for span in sentence_spans] for sentence_spans in spans]
+        for model in (self.morph_tagger, self.syntax_parser):
+            # map() режет пачку по batch_size, а кодировщик slovnet - еще раз по своему размеру (8 по умолчанию)
+            model.batch_size = batch_size
+            model.infer.encoder.batch_size = batch_size
+
+        # Одна пачка на все предложения: slovnet сам делит ее на батчи модели
+        result = []
+        for sentence_spans, morph, syntax in zip(spans, self.morph_tagger.map(words), self.syntax_parser.map(words)):
+            result.append([
+                NLPToken(span.text, morph_token.pos, syntax_token.rel, morph_token.feats, span.start, span.stop)
+                for span, morph_token, syntax_token in zip(sentence_spans, morph.tokens, syntax.tokens)
+            ])
+        return result
+
+
+class NLPPipeline:
+    """Морфология и синтаксис для TextToGraphParser: условия без "если" и несколько действий в одном предложении.
+
+    Модели загружаются один раз на процесс при первом вызове. Все предложения описания
+    (или всего пакета описаний) обрабатываются одним пакетным вызовом модели.
+    """
+
+    def __init__(self, backend: str = 'natasha', spacy_model: str = 'ru_core_news_sm', batch_size: int = 256):
+        self.backend_name = backend
+        self.spacy_model = spacy_model
+        self.batch_size = batch_size
+        self.load_time_sec: Optional[float] = None
+        self._backend = None
+        self._available: Optional[bool] = None
+        self._lock = threading.Lock()
+        app_logger.info(f"NLPPipeline initialized with backend={backend}")
+
+    def is_available(self) -> bool:
+        if self._available is None:
+            self._get_backend()
+        return bool(self._available)
+
+    def _get_backend(self):
+        if self._available is not None:
+            return self._backend
+
+        with self._lock:
+            if self._available is None:
+                start = time.perf_counter()
+                try:
+                    if self.backend_name == 'spacy':
+                        self._backend = _SpacyBackend(self.spacy_model)
+                    else:
+                        self._backend = _NatashaBackend()
+                    self.load_time_sec = time.perf_counter() - start
+                    metrics.set_gauge("nlp_model_load_sec", round(self.load_time_sec, 3))
+                    app_logger.info(f"NLP models ({self.backend_name}) loaded in {self.load_time_sec:.2f}s")
+                    self._available = True
+                except ImportError:
+                    app_logger.warning(f"{self.backend_name} not available, descriptions are parsed by rules only")
+                    self._available = False
+                except Exception as e:
+                    # Например, модель spaCy не скачана: сервис продолжает работать на правилах
+                    app_logger.error(f"Failed to load NLP models ({self.backend_name}): {str(e)}")
+                    self._available = False
+        return self._backend
+
+    def analyze(self, sentences: List[str]) -> List[SentenceAnalysis]:
+        analyses = [SentenceAnalysis(None, (), sentence) for sentence in sentences]
+        backend = self._get_backend()
+        if backend is None:
+            return analyses
+
+        # Предложения из одного слова и с конструкциями грамматики не переписываются - модель для них не нужна
+        selected = []
+        for index, sentence in enumerate(sentences):
+            words = WORD_PATTERN.findall(sentence.lower())
+            if len(words) > 1 and not _has_grammar_keyword(words):
+                selected.append(index)
+        if not selected:
+            return analyses
+
+        start = time.perf_counter()
+        tokens = backend.analyze([sentences[index] for index in selected], self.batch_size)
+        metrics.increment("nlp_batches")
+        metrics.increment("nlp_sentences", len(selected))
+        app_logger.debug(f"NLP processed {len(selected)} of {len(sentences)} sentences in {time.perf_counter() - start:.3f}s")
+
+        for index, sentence_tokens in zip(selected, tokens):
+            analyses[index] = analyze_sentence(sentences[index], sentence_tokens)
+        return analyses
+
+    def rewrite(self, texts: List[str]) -> List[str]:
+        """Описания -> описания, где условия и действия записаны конструкциями грамматики"""
+        pieces = [split_raw_sentences(text) for text in texts]
+        # Один вызов модели на все предложения всех описаний; пустые куски в модель не отправляются
+        sentences = [piece.strip() for text_pieces in pieces for piece in text_pieces if piece.strip()]
+        analyses = iter(self.analyze(sentences))
+
+        rewritten = []
+        for text_pieces in pieces:
+            parts = [next(analyses).rewritten for piece in text_pieces if piece.strip()]
+            rewritten.append(' '.join(parts))
+        return rewritten
+
+
+_nlp_pipeline: Optional[NLPPipeline] = None
+_nlp_pipeline_lock = threading.Lock()
+
+
+def get_nlp_pipeline() -> Optional[NLPPipeline]:
+    """Общий NLPPipeline процесса; None, если NLP выключен настройкой NLP_ENABLED"""
+    global _nlp_pipeline
+    if not settings.nlp_enabled:
+        return None
+    with _nlp_pipeline_lock:
+        if _nlp_pipeline is None:
+            _nlp_pipeline = NLPPipeline(settings.nlp_backend, settings.nlp_spacy_model, settings.nlp_batch_size)
+        return _nlp_pipeline
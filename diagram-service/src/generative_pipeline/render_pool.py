@@ -0,0 +1,410 @@
+import multiprocessing
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from multiprocessing.connection import Connection, wait
+from typing import Any, Deque, Dict, List, NamedTuple, Optional, Tuple
+
+from src.core.config import settings
+from src.core.exceptions import VisualizationError
+from src.core.logger import app_logger
+from src.core.metrics import metrics
+from src.generative_pipeline.layered_layout import Layout
+from src.utils.compact_graph import CompactGraph
+from src.utils.graph_utils import graph_to_dict, dict_to_graph
+
+
+def _warm_up(visualizer) -> None:
+    """Первая отрисовка грузит шрифты, кэш matplotlib и backend - делается до первого задания"""
+    graph = CompactGraph()
+    graph.add_node('start', type='start', label='Начало')
+    graph.add_node('end', type='end', label='Конец')
+    graph.add_edge('start', 'end')
+    visualizer.render(graph, layout='vertical', format='png', dpi=30)
+    visualizer.render(graph, layout='vertical', format='svg')
+
+
+def _worker_main(conn: Connection) -> None:
+    """Процесс отрисовки: один GraphVisualizer на все задания, pyplot без дисплея"""
+    import matplotlib
+    matplotlib.use('Agg')
+
+    from src.generative_pipeline.visualizer import GraphVisualizer
+    # Кэш укладок один - в процессе сервера; укладка приходит вместе с заданием
+    visualizer = GraphVisualizer(layout_cache=False)
+    try:
+        _warm_up(visualizer)
+    except Exception as e:
+        app_logger.warning(f"Renderer warm-up failed: {str(e)}")
+    conn.send(('ready', None, 0.0))
+
+    while True:
+        try:
+            job = conn.recv()
+        except (EOFError, KeyboardInterrupt):
+            break
+        if job is None:
+            break
+        graph_data, layout, format, dpi, thumbnail_size, layout_result = job
+        start = time.perf_counter()
+        try:
+            graph = dict_to_graph(graph_data)
+            if layout_result is not None:
+                visualizer.use_layout(graph, layout_result)
+            images = visualizer.render_with_thumbnail(
+                graph, layout=layout, format=format, dpi=dpi, thumbnail_size=thumbnail_size
+            )
+            conn.send(('ok', images, time.perf_counter() - start))
+        except Exception as e:
+            conn.send(('error', str(e), time.perf_counter() - start))
+
+
+class RenderResult(NamedTuple):
+    image: bytes
+    thumbnail: Optional[bytes]
+    render_sec: float
+
+
+class _Job:
+    __slots__ = ('future', 'payload', 'submitted')
+
+    def __init__(self, future: Future, payload: Tuple[Any, ...]):
+        self.future = future
+        self.payload = payload
+        self.submitted = time.perf_counter()
+
+
+class _Worker:
+    def __init__(self, context):
+        self.conn, child_conn = context.Pipe(duplex=True)
+        self.process = context.Process(target=_worker_main, args=(child_conn,), daemon=True)
+        try:
+            self.process.start()
+        except BaseException:
+            self.conn.close()
+            raise
+        finally:
+            child_conn.close()
+        self.ready = False
+        self.started = time.perf_counter()
+        self.jobs_done = 0
+        self.job: Optional[_Job] = None
+        self.deadline: Optional[float] = None
+        # Процесс на замену после max_jobs заданий; до его готовности старый продолжает работать
+        self.replacement: Optional["_Worker"] = None
+
+    def stop(self, timeout: float = 1.0) -> None:
+        """Штатное завершение; процесс, который не вышел за timeout, убивается"""
+        try:
+            self.conn.send(None)
+        except (OSError, ValueError):
+            pass
+        self.process.join(timeout)
+        self.kill()
+
+    def kill(self) -> None:
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+        self.conn.close()
+
+
+class RenderPool:
+    """Долгоживущие процессы отрисовки: pyplot не потокобезопасен, а dot на некоторых графах зависает.
+
+    В каждом процессе библиотеки импортированы и прогреты один раз. Задание, которое не уложилось
+    в job_timeout, завершается ошибкой, а его процесс убивается и заменяется новым. После max_jobs
+    заданий процесс перезапускается, чтобы не копились утечки памяти matplotlib и graphviz;
+    старый процесс принимает задания, пока замена не прогреется.
+    Процессы создаются при первом задании; граф передается словарем graph_to_dict, готовая укладка - вместе с ним.
+    """
+
+    def __init__(self, workers: int = 0, job_timeout: float = 30.0, max_jobs: int = 200, startup_timeout: float = 120.0):
+        self.workers = workers or os.cpu_count() or 1
+        self.job_timeout = job_timeout
+        self.max_jobs = max_jobs
+        self.startup_timeout = startup_timeout
+        self._context = multiprocessing.get_context('spawn')
+        self._pool: List[_Worker] = []
+        self._pending: Deque[_Job] = deque()
+        self._lock = threading.Lock()
+        self._wake_reader, self._wake_writer = self._context.Pipe(duplex=False)
+        self._dispatcher: Optional[threading.Thread] = None
+        self._closed = False
+        self._first_job: Optional[float] = None
+        self._stats = {"submitted": 0, "completed": 0, "failed": 0, "timeouts": 0, "restarts": 0, "recycled": 0, "render_sec": 0.0}
+
+    def submit(
+        self,
+        graph: CompactGraph,
+        layout: str = 'vertical',
+        format: str = 'png',
+        dpi: int = 150,
+        thumbnail_size: int = 0,
+        layout_result: Optional[Layout] = None
+    ) -> "Future[RenderResult]":
+        """Future с RenderResult: изображение, миниатюра (если thumbnail_size > 0) и секунды отрисовки в процессе.
+
+        layout_result - готовая укладка из кэша сервера; без нее процесс укладывает граф сам.
+        """
+        future: Future = Future()
+        job = _Job(future, (graph_to_dict(graph), layout, format, dpi, thumbnail_size, layout_result))
+        with self._lock:
+            if self._closed:
+                raise VisualizationError("Render pool is stopping")
+            self._pending.append(job)
+            self._stats["submitted"] += 1
+            if self._first_job is None:
+                self._first_job = time.perf_counter()
+            if self._dispatcher is None:
+                app_logger.info(f"Starting render pool with {self.workers} workers")
+                # spawn: форк процесса с потоками сервера и открытыми логами небезопасен
+                self._dispatcher = threading.Thread(target=self._dispatch_loop, name="render-pool", daemon=True)
+                self._dispatcher.start()
+        metrics.increment("render_pool_jobs")
+        self._wake()
+        return future
+
+    def render(self, graph: CompactGraph, layout: str = 'vertical', format: str = 'png', dpi: int = 150) -> bytes:
+        """Синхронная отрисовка через пул"""
+        return self.submit(graph, layout=layout, format=format, dpi=dpi).result().image
+
+    def _wake(self) -> None:
+        try:
+            self._wake_writer.send_bytes(b'1')
+        except (OSError, ValueError):
+            pass
+
+    def _dispatch_loop(self) -> None:
+        """Поток пула: раздает задания свободным процессам, принимает результаты и следит за сроками"""
+        while True:
+            with self._lock:
+                if self._closed:
+                    break
+            try:
+                self._dispatch_once()
+            except Exception as e:
+                app_logger.error(f"Render pool dispatcher error: {str(e)}", exc_info=True)
+                time.sleep(0.1)
+
+    def _dispatch_once(self) -> None:
+        with self._lock:
+            self._assign_jobs()
+            waiting = [self._wake_reader] + [worker.conn for worker in self._pool]
+            deadlines = [worker.deadline for worker in self._pool if worker.deadline is not None]
+        timeout = max(0.0, min(deadlines) - time.perf_counter()) if deadlines else None
+
+        for conn in wait(waiting, timeout):
+            if conn is self._wake_reader:
+                while self._wake_reader.poll():
+                    self._wake_reader.recv_bytes()
+                continue
+            with self._lock:
+                worker = next((item for item in self._pool if item.conn is conn), None)
+                if worker is not None:
+                    self._receive(worker)
+
+        with self._lock:
+            self._check_deadlines()
+
+    def _next_job(self) -> Optional[_Job]:
+        # Задания, отмененные, пока ждали в очереди, не отправляются
+        while self._pending:
+            job = self._pending.popleft()
+            if job.future.set_running_or_notify_cancel():
+                return job
+        return None
+
+    def _assign_jobs(self) -> None:
+        while self._pending and len(self._pool) < min(self.workers, len(self._pending) + self._busy()):
+            try:
+                worker = self._start_worker()
+            except Exception as e:
+                # Без процессов задания никто не выполнит: очередь завершается ошибкой, а не ждет вечно
+                if not self._pool:
+                    self._fail_pending(VisualizationError("Failed to start renderer process", {"error": str(e)}))
+                break
+            self._pool.append(worker)
+
+        for worker in list(self._pool):
+            if not self._pending:
+                break
+            if not worker.ready or worker.job is not None:
+                continue
+            job = self._next_job()
+            if job is None:
+                break
+            try:
+                worker.conn.send(job.payload)
+            except (OSError, ValueError):
+                self._replace(worker, "broken pipe")
+                self._stats["failed"] += 1
+                job.future.set_exception(VisualizationError("Renderer process crashed"))
+                continue
+            worker.job = job
+            worker.deadline = time.perf_counter() + self.job_timeout
+
+    def _start_worker(self) -> _Worker:
+        try:
+            worker = _Worker(self._context)
+        except Exception as e:
+            app_logger.error(f"Failed to start renderer process: {str(e)}")
+            metrics.increment("render_pool_start_failures")
+            raise
+        worker.deadline = time.perf_counter() + self.startup_timeout
+        return worker
+
+    def _fail_pending(self, error: Exception) -> None:
+        while self._pending:
+            job = self._next_job()
+            if job is None:
+                break
+            self._stats["failed"] += 1
+            job.future.set_exception(error)
+
+    def _busy(self) -> int:
+        return sum(1 for worker in self._pool if worker.job is not None)
+
+    def _receive(self, worker: _Worker) -> None:
+        try:
+            status, value, elapsed = worker.conn.recv()
+        except (EOFError, OSError):
+            # Процесс упал (например, по памяти): задание завершается ошибкой, процесс заменяется
+            job = worker.job
+            self._replace(worker, "crashed")
+            if job is not None:
+                self._stats["failed"] += 1
+                job.future.set_exception(VisualizationError("Renderer process crashed"))
+            elif not worker.ready and not any(item.ready for item in self._pool):
+                # Процесс упал, не успев прогреться (например, ошибка импорта): перезапуск не поможет
+                self._fail_pending(VisualizationError("Renderer process did not start"))
+            return
+
+        if status == 'ready':
+            worker.ready = True
+            worker.deadline = None
+            retiring = next((item for item in self._pool if item.replacement is worker), None)
+            if retiring is not None and retiring.job is None:
+                self._retire(retiring)
+            return
+
+        job, worker.job, worker.deadline = worker.job, None, None
+        worker.jobs_done += 1
+        self._stats["render_sec"] += elapsed
+        if status == 'ok':
+            self._stats["completed"] += 1
+            job.future.set_result(RenderResult(value[0], value[1], elapsed))
+        else:
+            self._stats["failed"] += 1
+            job.future.set_exception(VisualizationError(f"Failed to render graph: {value}"))
+
+        if self.max_jobs and worker.jobs_done >= self.max_jobs:
+            if worker.replacement is None:
+                # Если замена не запустилась, старый процесс работает дальше, попытка - после следующего задания
+                try:
+                    worker.replacement = self._start_worker()
+                except Exception:
+                    pass
+                else:
+                    self._pool.append(worker.replacement)
+            elif worker.replacement.ready or worker.replacement not in self._pool:
+                self._retire(worker)
+        self._report()
+
+    def _retire(self, worker: _Worker) -> None:
+        self._pool.remove(worker)
+        worker.stop()
+        self._stats["recycled"] += 1
+        metrics.increment("render_pool_recycled")
+
+    def _check_deadlines(self) -> None:
+        now = time.perf_counter()
+        for worker in list(self._pool):
+            if worker.deadline is None or worker.deadline > now:
+                continue
+            job = worker.job
+            if job is None:
+                self._replace(worker, "did not start")
+                if not any(item.ready for item in self._pool):
+                    self._fail_pending(VisualizationError(
+                        "Renderer process did not start",
+                        {"startup_timeout_sec": self.startup_timeout}
+                    ))
+                continue
+            self._replace(worker, "timed out")
+            self._stats["timeouts"] += 1
+            self._stats["failed"] += 1
+            metrics.increment("render_pool_timeouts")
+            job.future.set_exception(VisualizationError(
+                "Rendering timed out",
+                {"timeout_sec": self.job_timeout}
+            ))
+            self._report()
+
+    def _replace(self, worker: _Worker, reason: str) -> None:
+        """Убивает процесс; замена создается в _assign_jobs, когда в очереди есть задания"""
+        app_logger.warning(f"Renderer process {worker.process.pid} {reason}, restarting")
+        self._pool.remove(worker)
+        worker.kill()
+        self._stats["restarts"] += 1
+        metrics.increment("render_pool_restarts")
+
+    def _report(self) -> None:
+        stats = self.stats(locked=True)
+        metrics.set_gauge("render_pool_jobs_per_sec", stats["jobs_per_sec"])
+        metrics.set_gauge("render_pool_timeout_count", stats["timeouts"])
+
+    def stats(self, locked: bool = False) -> Dict[str, Any]:
+        """Счетчики заданий и пропускная способность с первого задания"""
+        if not locked:
+            with self._lock:
+                return self.stats(locked=True)
+        elapsed = time.perf_counter() - self._first_job if self._first_job is not None else 0.0
+        return {
+            **self._stats,
+            "workers": self.workers,
+            "alive_workers": len(self._pool),
+            "queued": len(self._pending),
+            "jobs_per_sec": round(self._stats["completed"] / elapsed, 3) if elapsed > 0 else 0.0
+        }
+
+    def shutdown(self) -> None:
+        """Останавливает процессы; следующее задание запустит пул заново"""
+        with self._lock:
+            self._closed = True
+            dispatcher, self._dispatcher = self._dispatcher, None
+            pool, self._pool = self._pool, []
+            pending, self._pending = list(self._pending), deque()
+        self._wake()
+        if dispatcher is not None:
+            dispatcher.join(timeout=5)
+        for job in pending:
+            job.future.cancel()
+        for worker in pool:
+            if worker.job is not None and not worker.job.future.done():
+                worker.job.future.set_exception(VisualizationError("Render pool is stopped"))
+            worker.stop()
+        with self._lock:
+            self._closed = False
+        if pool:
+            app_logger.info("Render pool stopped")
+
+
+_render_pool: Optional[RenderPool] = None
+_render_pool_lock = threading.Lock()
+
+
+def get_render_pool() -> RenderPool:
+    global _render_pool
+    with _render_pool_lock:
+        if _render_pool is None:
+            _render_pool = RenderPool(settings.render_workers, settings.render_job_timeout_sec, settings.render_worker_max_jobs)
+        return _render_pool
+
+
+def shutdown_render_pool() -> None:
+    with _render_pool_lock:
+        if _render_pool is not None:
+            _render_pool.shutdown()
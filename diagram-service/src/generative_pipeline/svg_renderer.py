@@ -0,0 +1,389 @@
+import io
+import threading
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+from xml.sax.saxutils import escape
+
+import numpy as np
+
+from src.generative_pipeline.layered_layout import Layout
+from src.utils.compact_graph import CompactGraph
+
+try:
+    import resvg_py
+except ImportError:
+    resvg_py = None
+
+
+SVG_DPI = 96
+
+
+def png_rasterizer_available() -> bool:
+    return resvg_py is not None
+
+
+def svg_to_png(svg: bytes, dpi: int = 150, size: Optional[Tuple[int, int]] = None) -> bytes:
+    """Растеризация SVG (resvg); размер в пикселях пересчитывается из 96 dpi SVG в dpi или задается явно"""
+    if size is not None:
+        return bytes(resvg_py.svg_to_bytes(
+            svg_string=svg.decode('utf-8'),
+            width=size[0],
+            height=size[1],
+            background='#ffffff'
+        ))
+    return bytes(resvg_py.svg_to_bytes(
+        svg_string=svg.decode('utf-8'),
+        zoom=dpi / SVG_DPI,
+        background='#ffffff'
+    ))
+
+
+def _number(value: float) -> str:
+    """Число для атрибутов SVG: до сотых, без лишних нулей"""
+    return f"{value:.2f}".rstrip('0').rstrip('.')
+
+
+@lru_cache(maxsize=4096)
+def wrap_label(text: str, max_chars: int, max_lines: int) -> Tuple[str, ...]:
+    """Перенос по словам; слишком длинные слова режутся, лишние строки заменяются многоточием"""
+    lines: List[str] = []
+    current = ''
+    for word in text.split():
+        while len(word) > max_chars:
+            if current:
+                lines.append(current)
+                current = ''
+            lines.append(word[:max_chars - 1] + '-')
+            word = word[max_chars - 1:]
+        if not current:
+            current = word
+        elif len(current) + 1 + len(word) <= max_chars:
+            current = f"{current} {word}"
+        else:
+            lines.append(current)
+            current = word
+    if current:
+        lines.append(current)
+
+    if len(lines) > max_lines:
+        last = lines[max_lines - 1]
+        lines = lines[:max_lines - 1] + [last[:max_chars - 1].rstrip() + '…']
+    return tuple(lines) or ('',)
+
+
+class SVGGeometry(NamedTuple):
+    """Узлы схемы в пикселях SVG: центры, размеры, перенесенные подписи и пересчет укладки в пиксели"""
+    types: List[str]
+    shapes: List[str]
+    wrapped: List[Tuple[str, ...]]
+    outline: np.ndarray
+    cx: np.ndarray
+    cy: np.ndarray
+    widths: np.ndarray
+    heights: np.ndarray
+    to_xy: Callable[[Any, Any], Tuple[np.ndarray, np.ndarray]]
+    shift_x: float
+    shift_y: float
+    width: float
+    height: float
+
+
+class SVGRenderer:
+    """Блок-схема в SVG по готовой укладке LayeredLayout: фигуры из node_styles, перенос текста, подписи ребер.
+
+    Документ собирается строками в буфер потока, который переиспользуется между вызовами.
+    """
+
+    NODE_WIDTH = 180
+    FONT_SIZE = 12
+    LINE_HEIGHT = 15
+    PADDING = 10
+    MAX_LINES = 4
+    NODE_GAP = 30
+    LAYER_GAP = 50
+    MARGIN = 20
+    PAIRED_EDGE_OFFSET = 6
+    # Средняя ширина символа DejaVu Sans/Arial относительно кегля
+    CHAR_WIDTH = 0.6
+
+    # Доля ширины фигуры, занятая текстом, и запас высоты: в ромб и эллипс текст помещается хуже
+    TEXT_AREA = {'box': (1.0, 1.0), 'parallelogram': (0.8, 1.0), 'ellipse': (0.8, 1.3), 'diamond': (0.6, 1.8)}
+
+    # Меньше этого в пикселях растра текст не рисуется, а узлы становятся сплошными блоками
+    MIN_LABEL_PIXELS = 4
+    MIN_SHAPE_PIXELS = 24
+
+    def __init__(self, node_styles: Dict[str, Dict[str, str]]):
+        self.node_styles = node_styles
+        self._local = threading.local()
+
+    def _buffer(self) -> io.StringIO:
+        buffer = getattr(self._local, 'buffer', None)
+        if buffer is None:
+            buffer = self._local.buffer = io.StringIO()
+        buffer.seek(0)
+        buffer.truncate()
+        return buffer
+
+    def _style(self, node_type: str) -> Dict[str, str]:
+        return self.node_styles.get(node_type, self.node_styles['process'])
+
+    def detail_for_zoom(self, zoom: float) -> str:
+        """Детализация для масштаба растра (пикселей на единицу SVG): full, shapes (без текста) или blocks"""
+        if self.FONT_SIZE * zoom >= self.MIN_LABEL_PIXELS:
+            return 'full'
+        if self.NODE_WIDTH * zoom >= self.MIN_SHAPE_PIXELS:
+            return 'shapes'
+        return 'blocks'
+
+    def measure(self, graph: CompactGraph, layout: Layout) -> SVGGeometry:
+        """Размеры и центры узлов в пикселях SVG; не зависит от области отрисовки"""
+        count = graph.number_of_nodes()
+        types = graph.node_values('type', 'process')
+        labels = [str(node if label is None else label) for label, node in zip(graph.node_values('label'), layout.ids)]
+        shapes = [self._style(node_type)['shape'] for node_type in types]
+        # Форма для обрезки ребер по границе: 0 - прямоугольник и параллелограмм, 1 - ромб, 2 - эллипс
+        outline = np.array([{'diamond': 1, 'ellipse': 2}.get(shape, 0) for shape in shapes], dtype=np.int8)
+
+        # Размеры узлов по числу строк текста
+        wrapped = []
+        heights = np.empty(count)
+        for idx, (label, shape) in enumerate(zip(labels, shapes)):
+            width_share, height_share = self.TEXT_AREA.get(shape, (1.0, 1.0))
+            max_chars = max(int((self.NODE_WIDTH - 2 * self.PADDING) * width_share / (self.FONT_SIZE * self.CHAR_WIDTH)), 4)
+            lines = wrap_label(label, max_chars, self.MAX_LINES)
+            wrapped.append(lines)
+            heights[idx] = (len(lines) * self.LINE_HEIGHT + 2 * self.PADDING) * height_share
+        widths = np.full(count, float(self.NODE_WIDTH))
+        row_height = float(heights.max()) if count else 0.0
+
+        # Слой и позиция в слое -> пиксели; ширина шага по слоям больше, чтобы было место подписям ребер
+        if layout.direction == 'horizontal':
+            layer_pitch = self.NODE_WIDTH + 2 * self.LAYER_GAP
+            order_pitch = row_height + self.NODE_GAP
+            def to_xy(x, rank):
+                return np.asarray(rank) * layer_pitch, np.asarray(x) * order_pitch
+        else:
+            layer_pitch = row_height + self.LAYER_GAP
+            order_pitch = self.NODE_WIDTH + self.NODE_GAP
+            def to_xy(x, rank):
+                return np.asarray(x) * order_pitch, np.asarray(rank) * layer_pitch
+
+        cx, cy = to_xy(layout.x, layout.rank)
+        shift_x = self.MARGIN + self.NODE_WIDTH / 2 - (cx.min() if count else 0.0)
+        shift_y = self.MARGIN + row_height / 2 - (cy.min() if count else 0.0)
+        cx = cx + shift_x
+        cy = cy + shift_y
+        width = (cx.max() + self.NODE_WIDTH / 2 + self.MARGIN) if count else 2 * self.MARGIN
+        height = (cy.max() + row_height / 2 + self.MARGIN) if count else 2 * self.MARGIN
+        return SVGGeometry(types, shapes, wrapped, outline, cx, cy, widths, heights, to_xy, shift_x, shift_y, float(width), float(height))
+
+    def render(
+        self,
+        graph: CompactGraph,
+        layout: Layout,
+        viewport: Optional[Tuple[float, float, float, float]] = None,
+        detail: str = 'full',
+        geometry: Optional[SVGGeometry] = None,
+        size: Optional[Tuple[int, int]] = None
+    ) -> bytes:
+        """Документ целиком или только область viewport (x, y, ширина, высота в пикселях SVG).
+
+        В область попадают только пересекающие ее узлы и ребра, поэтому фрагмент большой схемы
+        растеризуется за время, пропорциональное его содержимому. detail (см. detail_for_zoom) убирает
+        на мелких масштабах текст, а затем и отдельные фигуры: раскладка шрифта и элементы по одному
+        стоят дороже, чем видно на растре. size - ширина и высота документа в пикселях (по умолчанию - размер области).
+        """
+        if geometry is None:
+            geometry = self.measure(graph, layout)
+        x0, y0, view_width, view_height = viewport if viewport is not None else (0.0, 0.0, geometry.width, geometry.height)
+        width, height = size if size is not None else (view_width, view_height)
+
+        buffer = self._buffer()
+        write = buffer.write
+        write(
+            f'<svg xmlns="http://www.w3.org/2000/svg" width="{width:.0f}" height="{height:.0f}" '
+            f'viewBox="{" ".join(_number(value) for value in (x0, y0, view_width, view_height))}">'
+            '<defs><marker id="arrow" viewBox="0 0 10 10" refX="10" refY="5" markerWidth="8" markerHeight="8" '
+            'orient="auto-start-reverse"><path d="M0,0L10,5L0,10z" fill="#555"/></marker><style>'
+            f'text{{font-family:"DejaVu Sans",Arial,sans-serif;font-size:{self.FONT_SIZE}px;text-anchor:middle}}'
+            '.e{fill:none;stroke:#555;stroke-width:1.5}'
+            '.l{font-size:11px;fill:#333;stroke:#fff;stroke-width:3px;paint-order:stroke}'
+        )
+        for node_type, style in self.node_styles.items():
+            write(f'.n-{node_type}{{fill:{style["fillcolor"]};stroke:{style["color"]};stroke-width:2}}')
+        write(f'</style></defs><rect x="{_number(x0)}" y="{_number(y0)}" width="100%" height="100%" fill="#ffffff"/>')
+
+        self._write_edges(write, graph, layout, geometry, viewport, detail)
+        nodes = None
+        if viewport is not None:
+            cx, cy, half_width, half_height = geometry.cx, geometry.cy, geometry.widths / 2, geometry.heights / 2
+            nodes = np.flatnonzero(
+                (cx + half_width >= x0) & (cx - half_width <= x0 + view_width)
+                & (cy + half_height >= y0) & (cy - half_height <= y0 + view_height)
+            )
+        if detail == 'blocks':
+            self._write_blocks(write, geometry, nodes)
+        else:
+            self._write_nodes(write, geometry, nodes, labels=detail == 'full')
+
+        write('</svg>')
+        return buffer.getvalue().encode('utf-8')
+
+    def _write_nodes(self, write, geometry: SVGGeometry, nodes: Optional[np.ndarray], labels: bool) -> None:
+        types, shapes, wrapped = geometry.types, geometry.shapes, geometry.wrapped
+        cx, cy, half_width, half_height = geometry.cx, geometry.cy, geometry.widths / 2, geometry.heights / 2
+        if nodes is not None:
+            types = [types[idx] for idx in nodes.tolist()]
+            shapes = [shapes[idx] for idx in nodes.tolist()]
+            wrapped = [wrapped[idx] for idx in nodes.tolist()]
+            cx, cy, half_width, half_height = cx[nodes], cy[nodes], half_width[nodes], half_height[nodes]
+
+        for node_type, shape, lines, x, y, w, h in zip(
+            types, shapes, wrapped, cx.tolist(), cy.tolist(), half_width.tolist(), half_height.tolist()
+        ):
+            css = f'n-{node_type}' if node_type in self.node_styles else 'n-process'
+            if shape == 'ellipse':
+                write(f'<ellipse class="{css}" cx="{x:.1f}" cy="{y:.1f}" rx="{w:.1f}" ry="{h:.1f}"/>')
+            elif shape == 'diamond':
+                write(
+                    f'<polygon class="{css}" points="{x:.1f},{y - h:.1f} {x + w:.1f},{y:.1f} '
+                    f'{x:.1f},{y + h:.1f} {x - w:.1f},{y:.1f}"/>'
+                )
+            elif shape == 'parallelogram':
+                skew = min(15.0, w / 4)
+                write(
+                    f'<polygon class="{css}" points="{x - w + skew:.1f},{y - h:.1f} {x + w:.1f},{y - h:.1f} '
+                    f'{x + w - skew:.1f},{y + h:.1f} {x - w:.1f},{y + h:.1f}"/>'
+                )
+            else:
+                write(f'<rect class="{css}" x="{x - w:.1f}" y="{y - h:.1f}" width="{2 * w:.1f}" height="{2 * h:.1f}" rx="4"/>')
+
+            if not labels:
+                continue
+            # Базовая линия первой строки: блок строк центрируется по вертикали
+            top = y - (len(lines) - 1) * self.LINE_HEIGHT / 2 + self.FONT_SIZE * 0.35
+            write(f'<text x="{x:.1f}" y="{top:.1f}">')
+            for index, line in enumerate(lines):
+                dy = 0 if index == 0 else self.LINE_HEIGHT
+                write(f'<tspan x="{x:.1f}" dy="{dy}">{escape(line)}</tspan>')
+            write('</text>')
+
+    def _write_blocks(self, write, geometry: SVGGeometry, nodes: Optional[np.ndarray]) -> None:
+        """Все узлы одного типа - одним path из прямоугольников"""
+        types = np.array(geometry.types, dtype=object)
+        indices = nodes if nodes is not None else np.arange(len(types))
+        for node_type in dict.fromkeys(types[indices].tolist()):
+            selected = indices[types[indices] == node_type]
+            css = f'n-{node_type}' if node_type in self.node_styles else 'n-process'
+            w, h = geometry.widths[selected], geometry.heights[selected]
+            write(f'<path class="{css}" d="')
+            write(''.join(
+                f'M{x:.0f},{y:.0f}h{width:.0f}v{height:.0f}h-{width:.0f}z'
+                for x, y, width, height in zip(
+                    (geometry.cx[selected] - w / 2).tolist(), (geometry.cy[selected] - h / 2).tolist(), w.tolist(), h.tolist()
+                )
+            ))
+            write('"/>')
+
+    def _write_edges(self, write, graph, layout, geometry: SVGGeometry, viewport, detail: str) -> None:
+        src, dst = graph.edge_arrays()
+        if len(src) == 0:
+            return
+        edge_labels = graph.edge_values('label', '')
+        cx, cy, widths, heights, outline = geometry.cx, geometry.cy, geometry.widths, geometry.heights, geometry.outline
+
+        # Первая точка после источника и последняя перед приемником: излом длинного ребра или другой конец
+        next_x, next_y = cx[dst].copy(), cy[dst].copy()
+        prev_x, prev_y = cx[src].copy(), cy[src].copy()
+        bends: Dict[int, Tuple[np.ndarray, np.ndarray]] = {}
+        for edge_idx, points in layout.bends.items():
+            bx, by = geometry.to_xy([point[0] for point in points], [point[1] for point in points])
+            bx, by = bx + geometry.shift_x, by + geometry.shift_y
+            bends[edge_idx] = (bx, by)
+            next_x[edge_idx], next_y[edge_idx] = bx[0], by[0]
+            prev_x[edge_idx], prev_y[edge_idx] = bx[-1], by[-1]
+
+        start_x, start_y = self._clip(cx[src], cy[src], next_x, next_y, widths[src], heights[src], outline[src])
+        end_x, end_y = self._clip(cx[dst], cy[dst], prev_x, prev_y, widths[dst], heights[dst], outline[dst])
+
+        # Встречные ребра (тело цикла и условие) разводятся в стороны, иначе они сливаются в одну линию
+        keys = src.astype(np.int64) * len(cx) + dst
+        paired = np.isin(dst.astype(np.int64) * len(cx) + src, keys) & (src != dst)
+        if paired.any():
+            dx, dy = end_x - start_x, end_y - start_y
+            length = np.maximum(np.hypot(dx, dy), 1e-9)
+            offset_x = np.where(paired, -dy / length * self.PAIRED_EDGE_OFFSET, 0.0)
+            offset_y = np.where(paired, dx / length * self.PAIRED_EDGE_OFFSET, 0.0)
+            start_x, start_y = start_x + offset_x, start_y + offset_y
+            end_x, end_y = end_x + offset_x, end_y + offset_y
+
+        loops = src == dst
+        edges = range(len(src))
+        if viewport is not None:
+            # Рамка ребра по концам и изломам, с запасом на петлю и подпись
+            low_x, high_x = np.minimum(start_x, end_x), np.maximum(start_x, end_x)
+            low_y, high_y = np.minimum(start_y, end_y), np.maximum(start_y, end_y)
+            for edge_idx, (bx, by) in bends.items():
+                low_x[edge_idx] = min(low_x[edge_idx], bx.min())
+                high_x[edge_idx] = max(high_x[edge_idx], bx.max())
+                low_y[edge_idx] = min(low_y[edge_idx], by.min())
+                high_y[edge_idx] = max(high_y[edge_idx], by.max())
+            x0, y0, view_width, view_height = viewport
+            pad = self.NODE_WIDTH
+            edges = np.flatnonzero(
+                (high_x + pad >= x0) & (low_x - pad <= x0 + view_width)
+                & (high_y + pad >= y0) & (low_y - pad <= y0 + view_height)
+            ).tolist()
+
+        if detail == 'blocks':
+            # Ребра одним path без стрелок и подписей; петли на таком масштабе не видны
+            write('<path class="e" d="')
+            for edge_idx in edges:
+                if loops[edge_idx]:
+                    continue
+                write(f'M{start_x[edge_idx]:.0f},{start_y[edge_idx]:.0f}')
+                if edge_idx in bends:
+                    write(''.join(f'L{x:.0f},{y:.0f}' for x, y in zip(*bends[edge_idx])))
+                write(f'L{end_x[edge_idx]:.0f},{end_y[edge_idx]:.0f}')
+            write('"/>')
+            return
+
+        for edge_idx in edges:
+            if loops[edge_idx]:
+                node = int(src[edge_idx])
+                x, y, w, h = cx[node], cy[node], widths[node] / 2, heights[node] / 2
+                write(
+                    f'<path class="e" marker-end="url(#arrow)" d="M{x + w:.1f},{y - h / 2:.1f} '
+                    f'C{x + w + 40:.1f},{y - h:.1f} {x + w + 40:.1f},{y + h:.1f} {x + w:.1f},{y + h / 2:.1f}"/>'
+                )
+                label_x, label_y = x + w + 30, y
+            else:
+                points = [(start_x[edge_idx], start_y[edge_idx])]
+                if edge_idx in bends:
+                    points.extend(zip(*bends[edge_idx]))
+                points.append((end_x[edge_idx], end_y[edge_idx]))
+                write(
+                    '<polyline class="e" marker-end="url(#arrow)" points="'
+                    + ' '.join(f'{x:.1f},{y:.1f}' for x, y in points)
+                    + '"/>'
+                )
+                # Подпись ближе к источнику: у встречных ребер подписи не накладываются
+                label_x = points[0][0] + (points[1][0] - points[0][0]) * 0.4
+                label_y = points[0][1] + (points[1][1] - points[0][1]) * 0.4
+            label = edge_labels[edge_idx]
+            if label and detail == 'full':
+                write(f'<text class="l" x="{label_x:.1f}" y="{label_y:.1f}">{escape(str(label))}</text>')
+
+    @staticmethod
+    def _clip(x, y, toward_x, toward_y, widths, heights, outline: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Точка выхода отрезка из центра узла на границе его фигуры"""
+        dx, dy = toward_x - x, toward_y - y
+        ax = np.abs(dx) / (widths / 2)
+        ay = np.abs(dy) / (heights / 2)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            # Параметр t вдоль отрезка: прямоугольник - max, ромб - сумма, эллипс - евклидова норма
+            scale = np.where(outline == 1, ax + ay, np.where(outline == 2, np.hypot(ax, ay), np.maximum(ax, ay)))
+            t = np.where(scale > 0, 1 / scale, 0.0)
+        t = np.minimum(t, 1.0)
+        return x + dx * t, y + dy * t
@@ -0,0 +1,529 @@
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple, Union
+
+from src.generative_pipeline.text_lexer import Token
+from src.utils.compact_graph import CompactGraph
+from src.utils.graph_utils import create_directed_graph, add_node, add_edge
+from src.utils.keyword_matcher import get_keyword_matcher
+
+
+# Ключевые слова грамматики - последовательности слов в нижнем регистре; запятые между словами пропускаются
+KEYWORDS: Dict[str, List[Tuple[str, ...]]] = {
+    'if': [('если',), ('if',)],
+    'then': [('то',), ('тогда',), ('then',)],
+    'else': [('иначе',), ('в', 'противном', 'случае'), ('else',), ('otherwise',)],
+    'end_if': [('конец', 'если'), ('конец', 'условия'), ('end', 'if'), ('endif',)],
+    'while': [('пока',), ('повторять', 'пока'), ('цикл', 'пока'), ('while',), ('repeat', 'while')],
+    'for_each': [('для', 'каждого'), ('для', 'каждой'), ('для', 'всех'), ('for', 'each')],
+    'repeat': [('повторять',), ('повторить',), ('repeat',)],
+    'until': [('до', 'тех', 'пор', 'пока'), ('until',)],
+    'do': [('выполнять',), ('делать',), ('do',)],
+    'end_loop': [('конец', 'цикла'), ('конец', 'пока'), ('end', 'loop'), ('end', 'while'), ('endwhile',)],
+    'check': [('проверить',), ('условие',), ('check',), ('condition',)],
+    'connector': [('затем',), ('далее',), ('потом',), ('после', 'этого'), ('next',), ('afterwards',)],
+}
+
+STRUCTURES = ('if', 'while', 'for_each', 'repeat', 'check')
+TERMINATORS = ('else', 'end_if', 'end_loop', 'until')
+CLOSERS = TERMINATORS + ('while',)
+STEP_PREFIXES = ('шаг', 'step')
+
+# Глубже этого вложенность не разбирается: ключевое слово остается частью подписи шага
+MAX_NESTING_DEPTH = 50
+
+
+def _index_keywords() -> Dict[str, List[Tuple[str, Tuple[str, ...]]]]:
+    index: Dict[str, List[Tuple[str, Tuple[str, ...]]]] = {}
+    for kind, sequences in KEYWORDS.items():
+        for words in sequences:
+            index.setdefault(words[0], []).append((kind, words))
+    # Более длинные последовательности проверяются первыми: "повторять пока" раньше "повторять"
+    for candidates in index.values():
+        candidates.sort(key=lambda candidate: -len(candidate[1]))
+    return index
+
+
+_KEYWORD_INDEX = _index_keywords()
+
+
+class Step(NamedTuple):
+    # 'process' | 'start' | 'end' | 'decision'
+    kind: str
+    label: str
+
+
+class Branch(NamedTuple):
+    condition: str
+    then_body: List["Statement"]
+    # None - ветви "иначе" нет
+    else_body: Optional[List["Statement"]]
+
+
+class Loop(NamedTuple):
+    # 'while' - проверка до тела, 'repeat_while' / 'repeat_until' - после, 'repeat' - без условия
+    kind: str
+    condition: str
+    body: List["Statement"]
+
+
+Statement = Union[Step, Branch, Loop]
+Frontier = List[Tuple[str, Optional[str]]]
+
+
+class GrammarParser:
+    """Рекурсивный спуск по токенам описания: программа -> операторы -> ветвления и циклы.
+
+    Ветви и тела циклов бывают строчными ("если X, то A, иначе B.") и блочными: заголовок
+    заканчивает предложение, блок идет до "иначе" / "конец если" / "конец цикла". Каждый
+    токен просматривается ограниченное число раз, поэтому разбор линейный.
+    """
+
+    def __init__(
+        self,
+        text: str,
+        tokens: List[Token],
+        start_keywords: Iterable[str],
+        end_keywords: Iterable[str],
+        trailing_closers: Iterable[str] = ()
+    ):
+        self.text = text
+        self.tokens = tokens
+        self.position = 0
+        self.depth = 0
+        # Позиции начала операторов верхнего уровня и первого заголовка блока, которому нечем закрыться:
+        # по ним потоковый разбор решает, какую часть программы уже можно строить
+        self.statement_starts: List[int] = []
+        self.open_header: Optional[int] = None
+        # Тот же кэшированный матчер, что у SemanticInterpreter; при совпадении обоих "начало" важнее
+        self._step_kinds = get_keyword_matcher(
+            {'start': list(start_keywords), 'end': list(end_keywords)},
+            whole_words=True
+        )
+
+        # Последняя позиция каждого закрывающего слова: блок открывается, только если его есть чем закрыть.
+        # trailing_closers - закрывающие слова в тексте после разбираемого фрагмента
+        self.closers: List[Tuple[int, str]] = []
+        self._last_closer: Dict[str, int] = {kind: len(tokens) for kind in trailing_closers}
+        for position in range(len(tokens)):
+            keyword = self._keyword(CLOSERS, position)
+            if keyword is not None:
+                self.closers.append((position, keyword[0]))
+                self._last_closer[keyword[0]] = max(self._last_closer.get(keyword[0], -1), position)
+
+    # --- Токены ---
+
+    def _kind_at(self, position: int) -> Optional[str]:
+        if position < len(self.tokens):
+            return self.tokens[position].kind
+        return None
+
+    def _at_boundary(self) -> bool:
+        return self._kind_at(self.position) in (None, 'stop')
+
+    def _skip(self, *kinds: str) -> bool:
+        start = self.position
+        while self._kind_at(self.position) in kinds:
+            self.position += 1
+        return self.position > start
+
+    def _keyword(self, kinds: Sequence[str], position: Optional[int] = None) -> Optional[Tuple[str, int]]:
+        """Ключевое слово одного из видов в позиции: (вид, позиция после него)"""
+        position = self.position if position is None else position
+        if self._kind_at(position) != 'word':
+            return None
+
+        for kind, words in _KEYWORD_INDEX.get(self.tokens[position].lower, ()):
+            if kind not in kinds:
+                continue
+            end = position + 1
+            for word in words[1:]:
+                while self._kind_at(end) == 'comma':
+                    end += 1
+                if self._kind_at(end) != 'word' or self.tokens[end].lower != word:
+                    break
+                end += 1
+            else:
+                return kind, end
+        return None
+
+    def _take_keyword(self, kinds: Sequence[str]) -> Optional[str]:
+        keyword = self._keyword(kinds)
+        if keyword is None:
+            return None
+        self.position = keyword[1]
+        return keyword[0]
+
+    def _else_ahead(self) -> bool:
+        position = self.position
+        if self._kind_at(position) == 'comma':
+            position += 1
+        return self._keyword(('else',), position) is not None
+
+    def _label(self, first: int, last: int) -> str:
+        """Исходный текст токенов [first, last) без краевых запятых и двоеточий"""
+        while first < last and self.tokens[first].kind != 'word':
+            first += 1
+        while last > first and self.tokens[last - 1].kind != 'word':
+            last -= 1
+        if first >= last:
+            return ''
+        return self.text[self.tokens[first].start:self.tokens[last - 1].end]
+
+    def _scan_condition(self, stop_kinds: Sequence[str]) -> int:
+        """Конец условия: до знака препинания или ключевого слова из stop_kinds"""
+        while self._kind_at(self.position) == 'word' and self._keyword(stop_kinds) is None:
+            self.position += 1
+        return self.position
+
+    def _skip_separators(self) -> bool:
+        """Запятые и двоеточия после заголовка; True, если среди них было двоеточие"""
+        colon = False
+        while self._kind_at(self.position) in ('comma', 'colon'):
+            colon = colon or self.tokens[self.position].kind == 'colon'
+            self.position += 1
+        return colon
+
+    def _opens_block(self, colon: bool, inline: bool, closers: Sequence[str]) -> bool:
+        """Блочная форма: заголовок закончил предложение или завершен двоеточием, и блок закрывается дальше"""
+        if inline or not (colon or self._at_boundary()):
+            return False
+        if any(self._last_closer.get(kind, -1) >= self.position for kind in closers):
+            return True
+        if self.open_header is None:
+            self.open_header = self.position
+        return False
+
+    def _take_end_marker(self, kinds: Sequence[str]) -> None:
+        """Явное завершение блока ("конец если") - в этом или следующем предложении"""
+        saved = self.position
+        self._skip('stop', 'comma')
+        if self._take_keyword(kinds) is None:
+            self.position = saved
+
+    # --- Грамматика ---
+
+    def parse(self) -> List[Statement]:
+        program: List[Statement] = []
+        while self.position < len(self.tokens):
+            if self._skip('stop', 'comma', 'colon'):
+                continue
+            # Маркер конца блока без открытого блока ничего не меняет
+            if self._take_keyword(TERMINATORS) is not None:
+                continue
+            start = len(program)
+            self.statement_starts.append(self.position)
+            self._append(program, False, False)
+            if len(program) == start:
+                self.statement_starts.pop()
+        return program
+
+    def _append(self, body: List[Statement], inline: bool, in_repeat: bool) -> None:
+        start = self.position
+        statement = self._statement(inline, in_repeat)
+        if statement is not None:
+            body.append(statement)
+        if self.position == start:
+            self.position += 1
+
+    def _block(self, in_repeat: bool) -> List[Statement]:
+        body: List[Statement] = []
+        while self.position < len(self.tokens):
+            if self._skip('stop', 'comma', 'colon'):
+                continue
+            if self._keyword(TERMINATORS) is not None:
+                break
+            if in_repeat and self._repeat_condition_ahead():
+                break
+            self._append(body, False, in_repeat)
+        return body
+
+    def _statement(self, inline: bool, in_repeat: bool) -> Optional[Statement]:
+        start = self.position
+
+        # "Затем, если ...", "Шаг 2: пока ..." - вводные слова перед конструкцией не входят в подписи
+        if self._take_keyword(('connector',)) is None:
+            if (
+                self._kind_at(self.position) == 'word'
+                and self.tokens[self.position].lower in STEP_PREFIXES
+                and self._kind_at(self.position + 1) == 'word'
+                and self.tokens[self.position + 1].lower.isdigit()
+            ):
+                self.position += 2
+        self._skip('comma', 'colon')
+
+        keyword = self._keyword(STRUCTURES)
+        if keyword is None or (keyword[0] != 'check' and self.depth >= MAX_NESTING_DEPTH):
+            self.position = start
+            return self._simple(inline, in_repeat)
+
+        kind = keyword[0]
+        if kind == 'check':
+            return self._check(inline)
+
+        self.depth += 1
+        try:
+            if kind == 'if':
+                return self._branch(inline, in_repeat)
+            if kind == 'repeat':
+                return self._repeat(inline)
+            return self._loop(inline)
+        finally:
+            self.depth -= 1
+
+    def _simple(self, inline: bool, in_repeat: bool) -> Optional[Statement]:
+        first = self.position
+        while self.position < len(self.tokens):
+            kind = self.tokens[self.position].kind
+            if kind == 'stop':
+                break
+            if self._else_ahead():
+                break
+            # "Отправить заказ, если он оплачен" - условие после действия
+            if kind == 'comma' and self.depth < MAX_NESTING_DEPTH and self._keyword(('if',), self.position + 1):
+                step = self._step(first, self.position)
+                self.position += 1
+                return self._postfix_branch(step, inline, in_repeat)
+            self.position += 1
+        return self._step(first, self.position)
+
+    def _step(self, first: int, last: int) -> Optional[Step]:
+        label = self._label(first, last)
+        if not label:
+            return None
+
+        terminator = self.tokens[last] if last < len(self.tokens) else None
+        lower = label.lower()
+        if terminator is not None and terminator.kind == 'stop' and '?' in terminator.text:
+            kind = 'decision'
+        else:
+            kind = self._step_kinds.match(lower) or 'process'
+        return Step(kind, label)
+
+    def _check(self, inline: bool) -> Step:
+        header = self.position
+        self._take_keyword(('check',))
+        self._skip('comma', 'colon')
+        first = self.position
+        while not self._at_boundary() and not self._else_ahead():
+            self.position += 1
+        return Step('decision', self._label(first, self.position) or self._label(header, self.position))
+
+    def _condition(self, header: int, stop_kinds: Sequence[str], include_keyword: bool = False) -> str:
+        first = self.position
+        self._scan_condition(stop_kinds)
+        if include_keyword:
+            return self._label(header, self.position)
+        return self._label(first, self.position) or self._label(header, self.position)
+
+    def _if_condition(self, header: int) -> str:
+        """Условие до "то"; запятые внутри условия допустимы, если "то" есть в том же предложении"""
+        first = self.position
+        position = first
+        while self._kind_at(position) in ('word', 'comma'):
+            keyword = self._keyword(('then', 'else', 'if'), position)
+            if keyword is not None:
+                if keyword[0] == 'then':
+                    self.position = position
+                    return self._label(first, position) or self._label(header, position)
+                break
+            position += 1
+        return self._condition(header, ('then', 'else'))
+
+    def _branch(self, inline: bool, in_repeat: bool) -> Branch:
+        header = self.position
+        self._take_keyword(('if',))
+        condition = self._if_condition(header)
+
+        self._skip('comma')
+        self._take_keyword(('then',))
+        colon = self._skip_separators()
+
+        if self._opens_block(colon, inline, ('else', 'end_if')):
+            then_body = self._block(in_repeat)
+        elif self._at_boundary() or self._else_ahead():
+            then_body = []
+        else:
+            then_body = self._inline_body(True, in_repeat)
+
+        else_body = self._else_part(inline, in_repeat)
+        if not inline:
+            self._take_end_marker(('end_if',))
+        return Branch(condition, then_body, else_body)
+
+    def _postfix_branch(self, step: Optional[Step], inline: bool, in_repeat: bool) -> Branch:
+        self.depth += 1
+        try:
+            header = self.position
+            self._take_keyword(('if',))
+            condition = self._condition(header, ('else',))
+            else_body = self._else_part(inline, in_repeat)
+        finally:
+            self.depth -= 1
+        return Branch(condition, [step] if step is not None else [], else_body)
+
+    def _else_part(self, inline: bool, in_repeat: bool) -> Optional[List[Statement]]:
+        saved = self.position
+        self._skip('comma')
+        if not inline:
+            # "Если X, то A. Иначе B." - ветвь "иначе" в следующем предложении
+            self._skip('stop', 'comma')
+        if self._take_keyword(('else',)) is None:
+            self.position = saved
+            return None
+
+        colon = self._skip_separators()
+        if self._opens_block(colon, inline, ('end_if',)):
+            return self._block(in_repeat)
+        return self._inline_body(inline, in_repeat)
+
+    def _inline_body(self, inline: bool, in_repeat: bool) -> List[Statement]:
+        body: List[Statement] = []
+        if not self._at_boundary():
+            self._append(body, inline, in_repeat)
+        return body
+
+    def _loop(self, inline: bool) -> Loop:
+        header = self.position
+        kind = self._take_keyword(('while', 'for_each'))
+        # "для каждого заказа" - подпись целиком, "пока X" - только условие
+        condition = self._condition(header, ('do',), include_keyword=kind == 'for_each')
+
+        self._skip('comma')
+        self._take_keyword(('do',))
+        colon = self._skip_separators()
+
+        if self._opens_block(colon, inline, ('end_loop',)):
+            body = self._block(False)
+        else:
+            body = self._inline_body(inline, False)
+
+        if not inline:
+            self._take_end_marker(('end_loop',))
+        return Loop('while', condition, body)
+
+    def _repeat(self, inline: bool) -> Statement:
+        header = self.position
+        self._take_keyword(('repeat',))
+        colon = self._skip_separators()
+
+        block = self._opens_block(colon, inline, ('until', 'while', 'end_loop'))
+        if block:
+            body = self._block(True)
+            self._skip('stop', 'comma')
+        else:
+            # "Повторять запрос, пока нет ответа" - тело до условия в том же предложении
+            first = self.position
+            while not self._at_boundary() and not self._repeat_condition_start() and not self._else_ahead():
+                self.position += 1
+            step = self._step(first, self.position)
+            body = [step] if step is not None else []
+            self._skip('comma')
+
+        condition_header = self.position
+        keyword = self._take_keyword(('while', 'until'))
+        if keyword is None:
+            if block:
+                self._take_end_marker(('end_loop',))
+                return Loop('repeat', '', body)
+            # "Повторить попытку" без условия - обычный шаг
+            return self._step(header, self.position)
+
+        condition = self._condition(condition_header, ())
+        return Loop('repeat_while' if keyword == 'while' else 'repeat_until', condition, body)
+
+    def _repeat_condition_start(self) -> bool:
+        position = self.position
+        if self._kind_at(position) == 'comma':
+            position += 1
+        return self._keyword(('while', 'until'), position) is not None
+
+    def _repeat_condition_ahead(self) -> bool:
+        """Предложение "пока X" / "до тех пор, пока X" без тела завершает блок повторения"""
+        keyword = self._keyword(('while', 'until'))
+        if keyword is None:
+            return False
+        if keyword[0] == 'until':
+            return True
+        position = keyword[1]
+        while self._kind_at(position) == 'word' and self._keyword(('do',), position) is None:
+            position += 1
+        return self._kind_at(position) in (None, 'stop')
+
+
+class GraphBuilder:
+    """Граф по AST: ветви сходятся в следующем операторе, циклы замыкаются обратным ребром"""
+
+    def __init__(self):
+        self.graph = create_directed_graph()
+        self.counter = 0
+        self.frontier: Frontier = []
+
+    def build(self, program: List[Statement]) -> CompactGraph:
+        for statement in program:
+            self.emit(statement)
+        return self.graph
+
+    def emit(self, statement: Statement) -> None:
+        """Добавить оператор верхнего уровня после уже построенных"""
+        self.frontier = self._emit(statement, self.frontier)
+
+    def _add(self, node_type: str, label: str) -> str:
+        node_id = f"node_{self.counter}"
+        self.counter += 1
+        add_node(self.graph, node_id, type=node_type, label=label)
+        return node_id
+
+    def _connect(self, frontier: Frontier, target: str) -> None:
+        for source, label in frontier:
+            if self.graph.has_edge(source, target):
+                continue
+            self._link(source, target, label)
+
+    def _link(self, source: str, target: str, label: Optional[str]) -> None:
+        if label:
+            add_edge(self.graph, source, target, label=label)
+        else:
+            add_edge(self.graph, source, target)
+
+    def _emit_body(self, body: List[Statement], frontier: Frontier) -> Frontier:
+        for statement in body:
+            frontier = self._emit(statement, frontier)
+        return frontier
+
+    def _emit(self, statement: Statement, frontier: Frontier) -> Frontier:
+        if isinstance(statement, Step):
+            node = self._add(statement.kind, statement.label)
+            # Начало не продолжает предыдущую ветку, после конца ветка обрывается
+            if statement.kind != 'start':
+                self._connect(frontier, node)
+            if statement.kind == 'end':
+                return []
+            return [(node, None)]
+
+        if isinstance(statement, Branch):
+            decision = self._add('decision', statement.condition)
+            self._connect(frontier, decision)
+            then_frontier = self._emit_body(statement.then_body, [(decision, 'Да')])
+            else_frontier = self._emit_body(statement.else_body or [], [(decision, 'Нет')])
+            return then_frontier + else_frontier
+
+        if statement.kind == 'while':
+            decision = self._add('decision', statement.condition)
+            self._connect(frontier, decision)
+            self._connect(self._emit_body(statement.body, [(decision, 'Да')]), decision)
+            return [(decision, 'Нет')]
+
+        first = self.graph.number_of_nodes()
+        body_frontier = self._emit_body(statement.body, frontier)
+        entry = self.graph.node_id(first) if self.graph.number_of_nodes() > first else None
+
+        if statement.kind == 'repeat':
+            if entry is None:
+                return frontier
+            self._connect(body_frontier, entry)
+            return []
+
+        decision = self._add('decision', statement.condition)
+        self._connect(body_frontier if entry is not None else frontier, decision)
+        repeat_label, leave_label = ('Да', 'Нет') if statement.kind == 'repeat_while' else ('Нет', 'Да')
+        self._connect([(decision, repeat_label)], entry or decision)
+        return [(decision, leave_label)]
@@ -0,0 +1,41 @@
+import re
+from typing import List, NamedTuple
+
+
+SENTENCE_DELIMITERS = re.compile(r'[\.!?;]+')
+
+# Предложение вместе с завершающими знаками; склейка совпадений дает исходный текст
+RAW_SENTENCE_PATTERN = re.compile(r'[^\.!?;]+[\.!?;]*|[\.!?;]+')
+
+# Разделители предложений, запятая, двоеточие и слова: ни одна альтернатива не допускает возвратов
+TOKEN_PATTERN = re.compile(r'(?P<stop>[\.!?;]+)|(?P<comma>,)|(?P<colon>:)|(?P<word>[^\s\.!?;,:]+)')
+
+
+def split_raw_sentences(text: str) -> List[str]:
+    return RAW_SENTENCE_PATTERN.findall(text)
+
+
+class Token(NamedTuple):
+    kind: str
+    text: str
+    lower: str
+    start: int
+    end: int
+
+
+class TextLexer:
+    """Разбиение описания на предложения и токены.
+
+    Выражения компилируются один раз; текст проходится одним сканированием без возвратов.
+    """
+
+    def split(self, text: str) -> List[str]:
+        sentences = SENTENCE_DELIMITERS.split(text)
+        return [s.strip() for s in sentences if s.strip()]
+
+    def tokens(self, text: str) -> List[Token]:
+        """Слова и знаки препинания с позициями в исходном тексте (для подписей узлов)"""
+        return [
+            Token(match.lastgroup, match.group(), match.group().lower(), match.start(), match.end())
+            for match in TOKEN_PATTERN.finditer(text)
+        ]
@@ -1,105 +1,58 @@
-import re
-import networkx as nx
-from typing import List, Dict, Any, Tuple
+from typing import List, Dict, Any, Optional
 
 from src.core.logger import app_logger
 from src.core.exceptions import TextParsingError
-from src.utils.graph_utils import create_directed_graph, add_node, add_edge
+from src.utils.graph_utils import add_node, add_edge
+from src.utils.compact_graph import CompactGraph
+from src.generative_pipeline.text_lexer import TextLexer
+from src.generative_pipeline.text_grammar import STEP_PREFIXES, GrammarParser, GraphBuilder
+from src.generative_pipeline.nlp_pipeline import NLPPipeline
+
+
+# Маркеры шагов для extract_steps: слова-маркеры, идет ли после маркера номер, слова, перед которыми шаг заканчивается
+STEP_MARKERS = [
+    (frozenset(STEP_PREFIXES), True, frozenset(STEP_PREFIXES)),
+    (frozenset(('затем', 'then', 'далее', 'next')), False, frozenset(('затем', 'then', 'далее', 'next'))),
+    (frozenset(('выполнить', 'execute', 'сделать', 'do')), False, frozenset()),
+]
 
 
 class TextToGraphParser:
-    def __init__(self):
+    def __init__(self, nlp: Optional[NLPPipeline] = None):
         app_logger.info("TextToGraphParser initialized")
         
-        self.step_patterns = [
-            r'(?:шаг|step)\s*\d+[:\.]?\s*(.+?)(?=шаг|step|\.|$)',
-            r'(?:затем|then|далее|next)[:\s]+(.+?)(?=затем|then|далее|next|\.|$)',
-            r'(?:выполнить|execute|сделать|do)[:\s]+(.+?)(?=\.|$)',
-        ]
-        
-        self.condition_patterns = [
-            r'если\s+(.+?)\s*,?\s*то\s+(.+?)(?:иначе|else)\s+(.+?)(?=\.|$)',
-            r'if\s+(.+?)\s*then\s+(.+?)(?:else)\s+(.+?)(?=\.|$)',
-            r'проверить\s+(.+?)(?=\.|$)',
-            r'условие[:\s]+(.+?)(?=\.|$)',
-        ]
+        # Морфология и синтаксис (NLP_ENABLED): условия без "если", несколько действий в одном предложении
+        self.nlp = nlp
         
         self.start_keywords = ['начало', 'start', 'старт', 'begin']
         self.end_keywords = ['конец', 'end', 'финиш', 'finish', 'stop', 'завершение']
+        
+        self.lexer = TextLexer()
     
-    def parse(self, text: str) -> nx.DiGraph:
+    def apply_nlp(self, texts: List[str]) -> List[str]:
+        """Описания -> описания в конструкциях грамматики; все предложения идут в модель одним вызовом"""
+        if self.nlp is None:
+            return list(texts)
+        try:
+            return self.nlp.rewrite(list(texts))
+        except Exception as e:
+            # NLP только уточняет разбор: при ошибке модели описание разбирается правилами
+            app_logger.warning(f"NLP processing failed, falling back to rules: {str(e)}")
+            return list(texts)
+    
+    def parse(self, text: str, use_nlp: bool = True) -> CompactGraph:
+        """Описание -> токены -> дерево операторов (ветвления, циклы, слияния) -> граф"""
+        if use_nlp:
+            text = self.apply_nlp([text])[0]
+        
         try:
             app_logger.debug(f"Parsing text of length {len(text)}")
             
-            sentences = self._split_into_sentences(text)
-            app_logger.debug(f"Split into {len(sentences)} sentences")
-            
-            graph = create_directed_graph()
+            tokens = self.lexer.tokens(text)
+            program = GrammarParser(text, tokens, self.start_keywords, self.end_keywords).parse()
+            app_logger.debug(f"Parsed {len(tokens)} tokens into {len(program)} top-level statements")
             
-            node_counter = 0
-            previous_node = None
-            
-            for sentence in sentences:
-                sentence_lower = sentence.lower().strip()
-                
-                if not sentence_lower:
-                    continue
-                
-                if any(kw in sentence_lower for kw in self.start_keywords):
-                    node_id = f"node_{node_counter}"
-                    add_node(graph, node_id, type='start', label=sentence.strip())
-                    previous_node = node_id
-                    node_counter += 1
-                    app_logger.debug(f"Added start node: {node_id}")
-                
-                elif any(kw in sentence_lower for kw in self.end_keywords):
-                    node_id = f"node_{node_counter}"
-                    add_node(graph, node_id, type='end', label=sentence.strip())
-                    if previous_node:
-                        add_edge(graph, previous_node, node_id)
-                    previous_node = node_id
-                    node_counter += 1
-                    app_logger.debug(f"Added end node: {node_id}")
-                
-                elif self._is_condition(sentence_lower):
-                    condition_result = self._parse_condition(sentence)
-                    if condition_result:
-                        decision_node = f"node_{node_counter}"
-                        add_node(graph, decision_node, type='decision', label=condition_result['condition'])
-                        
-                        if previous_node:
-                            add_edge(graph, previous_node, decision_node)
-                        
-                        node_counter += 1
-                        
-                        true_node = f"node_{node_counter}"
-                        add_node(graph, true_node, type='process', label=condition_result.get('true_branch', 'Да'))
-                        add_edge(graph, decision_node, true_node, label='Да')
-                        node_counter += 1
-                        
-                        false_node = f"node_{node_counter}"
-                        add_node(graph, false_node, type='process', label=condition_result.get('false_branch', 'Нет'))
-                        add_edge(graph, decision_node, false_node, label='Нет')
-                        node_counter += 1
-                        
-                        previous_node = decision_node
-                        app_logger.debug(f"Added decision node: {decision_node}")
-                    else:
-                        node_id = f"node_{node_counter}"
-                        add_node(graph, node_id, type='decision', label=sentence.strip())
-                        if previous_node:
-                            add_edge(graph, previous_node, node_id)
-                        previous_node = node_id
-                        node_counter += 1
-                
-                else:
-                    node_id = f"node_{node_counter}"
-                    add_node(graph, node_id, type='process', label=sentence.strip())
-                    if previous_node:
-                        add_edge(graph, previous_node, node_id)
-                    previous_node = node_id
-                    node_counter += 1
-                    app_logger.debug(f"Added process node: {node_id}")
+            graph = GraphBuilder().build(program)
             
             if graph.number_of_nodes() == 0:
                 add_node(graph, "node_0", type='start', label='Начало')
@@ -116,37 +69,32 @@ class TextToGraphParser:
             raise TextParsingError(f"Failed to parse text: {str(e)}")
     
     def _split_into_sentences(self, text: str) -> List[str]:
-        sentences = re.split(r'[\.!?;]+', text)
-        return [s.strip() for s in sentences if s.strip()]
-    
-    def _is_condition(self, text: str) -> bool:
-        condition_keywords = ['если', 'if', 'условие', 'condition', 'проверить', 'check', '?']
-        return any(kw in text for kw in condition_keywords)
-    
-    def _parse_condition(self, sentence: str) -> Dict[str, str]:
-        for pattern in self.condition_patterns:
-            match = re.search(pattern, sentence, re.IGNORECASE)
-            if match:
-                groups = match.groups()
-                if len(groups) >= 3:
-                    return {
-                        'condition': groups[0].strip(),
-                        'true_branch': groups[1].strip(),
-                        'false_branch': groups[2].strip()
-                    }
-                elif len(groups) >= 1:
-                    return {
-                        'condition': groups[0].strip()
-                    }
-        
-        return {'condition': sentence.strip()}
+        return self.lexer.split(text)
     
     def extract_steps(self, text: str) -> List[str]:
+        """Фразы после маркеров шагов ("шаг 1:", "затем", "выполнить") по токенам лексера, за один проход на маркер"""
+        tokens = self.lexer.tokens(text)
         steps = []
         
-        for pattern in self.step_patterns:
-            matches = re.findall(pattern, text, re.IGNORECASE)
-            steps.extend([m.strip() for m in matches])
+        for markers, numbered, closers in STEP_MARKERS:
+            position = 0
+            while position < len(tokens):
+                token = tokens[position]
+                position += 1
+                if token.kind != 'word' or token.lower not in markers:
+                    continue
+                if numbered:
+                    if position >= len(tokens) or not tokens[position].lower.isdigit():
+                        continue
+                    position += 1
+                
+                # Шаг - слова до конца предложения или до следующего маркера той же группы
+                first = position
+                while position < len(tokens) and tokens[position].kind != 'stop' and tokens[position].lower not in closers:
+                    position += 1
+                words = [token for token in tokens[first:position] if token.kind == 'word']
+                if words:
+                    steps.append(text[words[0].start:words[-1].end])
         
         if not steps:
             steps = self._split_into_sentences(text)
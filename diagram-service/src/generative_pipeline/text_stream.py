@@ -0,0 +1,187 @@
+import codecs
+import json
+from typing import Any, Dict, List, Optional
+
+from src.core.exceptions import TextParsingError
+from src.generative_pipeline.text_grammar import GrammarParser, GraphBuilder
+from src.generative_pipeline.text_parser import TextToGraphParser
+from src.utils.compact_graph import CompactGraph
+from src.utils.graph_utils import add_node, add_edge
+
+
+SENTENCE_END_CHARS = '.!?;'
+
+
+class TextChunkDecoder:
+    """Байты тела запроса -> фрагменты текста.
+
+    Обычный текст декодируется инкрементально (многобайтовый символ может прийти в двух чанках);
+    в NDJSON каждая строка - JSON-строка или объект с полем "text".
+    """
+
+    def __init__(self, ndjson: bool = False):
+        self.ndjson = ndjson
+        self._decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        self._line = ''
+
+    def feed(self, data: bytes) -> List[str]:
+        text = self._decoder.decode(data)
+        if not self.ndjson:
+            return [text] if text else []
+
+        lines = (self._line + text).split('\n')
+        self._line = lines.pop()
+        return [chunk for chunk in map(self._parse_line, lines) if chunk]
+
+    def close(self) -> List[str]:
+        text = self._decoder.decode(b'', final=True)
+        if not self.ndjson:
+            return [text] if text else []
+
+        line, self._line = self._line + text, ''
+        chunk = self._parse_line(line)
+        return [chunk] if chunk else []
+
+    @staticmethod
+    def _parse_line(line: str) -> str:
+        line = line.strip()
+        if not line:
+            return ''
+        try:
+            value = json.loads(line)
+        except json.JSONDecodeError as e:
+            raise TextParsingError("Invalid NDJSON line", {"error": str(e), "line": line[:100]})
+
+        if isinstance(value, dict):
+            value = value.get('text', '')
+        if not isinstance(value, str):
+            raise TextParsingError("NDJSON line must be a string or an object with a \"text\" field", {"line": line[:100]})
+        # Строки NDJSON - части одного текста; на границе строк нужен пробел
+        return value + ' '
+
+
+class SentenceSplitter:
+    """Фрагменты текста -> законченные предложения; хвост без знака конца ждет следующего фрагмента"""
+
+    def __init__(self, max_tail: int):
+        self.max_tail = max_tail
+        self._tail = ''
+
+    def feed(self, chunk: str) -> List[str]:
+        # Ищем последний конец предложения только в новом фрагменте: хвост уже проверен
+        end = max(chunk.rfind(char) for char in SENTENCE_END_CHARS)
+        if end < 0:
+            self._tail += chunk
+            if len(self._tail) <= self.max_tail:
+                return []
+            # Очень длинный текст без точек разбирается кусками, чтобы буфер не рос
+            piece, self._tail = self._tail, ''
+            return [piece]
+
+        piece = self._tail + chunk[:end + 1]
+        self._tail = chunk[end + 1:]
+        return [piece]
+
+    def close(self) -> List[str]:
+        piece, self._tail = self._tail, ''
+        return [piece] if piece.strip() else []
+
+
+class _JournalGraphBuilder(GraphBuilder):
+    """GraphBuilder, который запоминает добавленные узлы и ребра для отправки клиенту"""
+
+    def __init__(self):
+        super().__init__()
+        self.events: List[Dict[str, Any]] = []
+
+    def _add(self, node_type: str, label: str) -> str:
+        node_id = super()._add(node_type, label)
+        self.events.append({'event': 'node', 'id': node_id, 'type': node_type, 'label': label})
+        return node_id
+
+    def _link(self, source: str, target: str, label: Optional[str]) -> None:
+        super()._link(source, target, label)
+        self.events.append({'event': 'edge', 'source': source, 'target': target, 'label': label})
+
+    def drain(self) -> List[Dict[str, Any]]:
+        events, self.events = self.events, []
+        return events
+
+
+class StreamingTextParser:
+    """Потоковый разбор описания: предложения -> операторы верхнего уровня -> узлы и ребра графа.
+
+    Текст копится в окне. Окно разбирается заново, когда оно выросло вдвое с прошлого разбора,
+    поэтому каждый символ разбирается O(1) раз в среднем. Построенные операторы из окна уходят.
+    Последний оператор и оператор с незакрытым блоком ("Если X:" без "конец если") остаются в окне,
+    потому что следующий текст может их продолжить. Окно длиннее window_chars сбрасывается
+    целиком, и память остается ограниченной. Вне этого случая граф совпадает с TextToGraphParser.parse.
+    """
+
+    def __init__(self, parser: TextToGraphParser, chunk_chars: int, window_chars: int):
+        self.parser = parser
+        self.chunk_chars = chunk_chars
+        self.window_chars = window_chars
+        self.builder = _JournalGraphBuilder()
+        self.chars_received = 0
+        self._parts: List[str] = []
+        self._size = 0
+        self._held = 0
+        self._head = ''
+
+    @property
+    def graph(self) -> CompactGraph:
+        return self.builder.graph
+
+    def feed(self, sentences: str) -> List[Dict[str, Any]]:
+        """Законченные предложения -> события node/edge для операторов, которые уже не изменятся"""
+        sentences = sentences.strip()
+        if not sentences:
+            return []
+
+        self.chars_received += len(sentences)
+        if len(self._head) < 100:
+            self._head = f"{self._head} {sentences}".strip()[:100]
+        self._parts.append(sentences)
+        self._size += len(sentences) + 1
+
+        if self._size < max(self.chunk_chars, 2 * self._held):
+            return []
+        return self._flush(final=self._size > self.window_chars)
+
+    def close(self) -> List[Dict[str, Any]]:
+        events = self._flush(final=True) if self._parts else []
+
+        if self.graph.number_of_nodes() == 0 and self._head:
+            # Как в TextToGraphParser.parse: текст без распознанных шагов - один процесс
+            for node_id, node_type, label in (
+                ("node_0", 'start', 'Начало'), ("node_1", 'process', self._head), ("node_2", 'end', 'Конец')
+            ):
+                add_node(self.graph, node_id, type=node_type, label=label)
+                events.append({'event': 'node', 'id': node_id, 'type': node_type, 'label': label})
+            for source, target in (("node_0", "node_1"), ("node_1", "node_2")):
+                add_edge(self.graph, source, target)
+                events.append({'event': 'edge', 'source': source, 'target': target, 'label': None})
+        return events
+
+    def _flush(self, final: bool) -> List[Dict[str, Any]]:
+        text = ' '.join(self._parts)
+        tokens = self.parser.lexer.tokens(text)
+        grammar = GrammarParser(text, tokens, self.parser.start_keywords, self.parser.end_keywords)
+        program = grammar.parse()
+
+        ready = len(program)
+        if not final and program:
+            # Последний оператор может продолжиться ("Иначе ..." в следующем предложении)
+            ready -= 1
+            if grammar.open_header is not None:
+                enclosing = sum(1 for start in grammar.statement_starts if start <= grammar.open_header) - 1
+                ready = max(0, min(ready, enclosing))
+
+        for statement in program[:ready]:
+            self.builder.emit(statement)
+
+        held = text[tokens[grammar.statement_starts[ready]].start:] if ready < len(program) else ''
+        self._parts = [held] if held else []
+        self._size = self._held = len(held)
+        return self.builder.drain()
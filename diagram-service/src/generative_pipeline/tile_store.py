@@ -0,0 +1,60 @@
+import threading
+import uuid
+from collections import OrderedDict
+from typing import NamedTuple, Optional
+
+from src.core.config import settings
+from src.core.logger import app_logger
+from src.core.metrics import metrics
+from src.generative_pipeline.canvas import TilePyramid
+from src.generative_pipeline.svg_renderer import SVGGeometry
+from src.utils.compact_graph import CompactGraph
+
+
+class TiledDiagram(NamedTuple):
+    diagram_id: str
+    graph: CompactGraph
+    layout: str
+    pyramid: TilePyramid
+    geometry: SVGGeometry
+
+
+class TiledDiagramStore:
+    """Схемы больше бюджета пикселей, которые отдаются тайлами по запросу; вытесняются по числу (самая давняя первой).
+
+    Хранится граф с готовой геометрией узлов, а не растр: тайл рисуется из SVG только своей области.
+    """
+
+    def __init__(self, max_diagrams: int):
+        self.max_diagrams = max_diagrams
+        self._diagrams: "OrderedDict[str, TiledDiagram]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, graph: CompactGraph, layout: str, pyramid: TilePyramid, geometry: SVGGeometry) -> TiledDiagram:
+        diagram = TiledDiagram(uuid.uuid4().hex, graph, layout, pyramid, geometry)
+        with self._lock:
+            self._diagrams[diagram.diagram_id] = diagram
+            while len(self._diagrams) > self.max_diagrams:
+                evicted, _ = self._diagrams.popitem(last=False)
+                app_logger.debug(f"Tiled diagram {evicted} evicted")
+            metrics.set_gauge("tiled_diagrams", len(self._diagrams))
+        return diagram
+
+    def get(self, diagram_id: str) -> Optional[TiledDiagram]:
+        with self._lock:
+            diagram = self._diagrams.get(diagram_id)
+            if diagram is not None:
+                self._diagrams.move_to_end(diagram_id)
+            return diagram
+
+
+_tile_store: Optional[TiledDiagramStore] = None
+_tile_store_lock = threading.Lock()
+
+
+def get_tile_store() -> TiledDiagramStore:
+    global _tile_store
+    with _tile_store_lock:
+        if _tile_store is None:
+            _tile_store = TiledDiagramStore(settings.tiled_diagrams_max)
+        return _tile_store
@@ -1,17 +1,34 @@
 import networkx as nx
-from typing import Optional, Literal
+from typing import Dict, Optional, Literal, Tuple
 import io
 from PIL import Image
 import numpy as np
 
+from src.core.config import settings
 from src.core.logger import app_logger
 from src.core.exceptions import VisualizationError
+from src.utils.compact_graph import CompactGraph
+from src.utils.graph_utils import as_networkx
+from src.utils.image_utils import bytes_to_numpy, make_thumbnail, numpy_to_bytes
+from src.generative_pipeline.layered_layout import LayeredLayout, Layout
+from src.generative_pipeline.layout_cache import LayoutCache, layout_key
+from src.generative_pipeline.canvas import TilePyramid, fit_scale
+from src.generative_pipeline.svg_renderer import SVG_DPI, SVGGeometry, SVGRenderer, png_rasterizer_available, svg_to_png
 
 
 class GraphVisualizer:
-    def __init__(self):
+    # Шаг укладки в дюймах для matplotlib: вдоль слоя - место под подпись узла, между слоями - под узел и стрелку
+    FIGURE_LABEL_INCHES = 2.2
+    FIGURE_NODE_INCHES = 1.2
+    MIN_FIGURE_INCHES = (3.0, 2.0)
+
+    def __init__(self, layout_cache: bool = True):
         app_logger.info("GraphVisualizer initialized")
         
+        self.layout_engine = LayeredLayout()
+        # Процессам пула укладку присылает сервер, поэтому свой кэш им не нужен
+        self.layout_cache = LayoutCache() if layout_cache else None
+        
         self.node_styles = {
             'start': {
                 'shape': 'ellipse',
@@ -44,41 +61,103 @@ class GraphVisualizer:
                 'color': '#9370DB'
             }
         }
+        
+        self.svg_renderer = SVGRenderer(self.node_styles)
+        self._pygraphviz = None
+        self._pygraphviz_checked = False
     
     def render(
         self,
-        graph: nx.DiGraph,
+        graph: CompactGraph,
         layout: Literal['vertical', 'horizontal', 'auto'] = 'vertical',
         format: str = 'png',
         dpi: int = 150
     ) -> bytes:
+        image_bytes, _ = self.render_with_thumbnail(graph, layout, format, dpi, thumbnail_size=0)
+        return image_bytes
+    
+    def render_with_thumbnail(
+        self,
+        graph: CompactGraph,
+        layout: Literal['vertical', 'horizontal', 'auto'] = 'vertical',
+        format: str = 'png',
+        dpi: int = 150,
+        thumbnail_size: int = 256
+    ) -> Tuple[bytes, Optional[bytes]]:
+        """Изображение и PNG-миниатюра (thumbnail_size=0 - без миниатюры) без второй укладки и декодирования.
+        
+        Миниатюра уменьшается из того же растра matplotlib, из которого кодируется PNG, или растеризуется
+        из той же укладки SVG сразу в своем размере; декодируется только готовый PNG от pygraphviz.
+        """
         try:
             app_logger.debug(f"Rendering graph with {graph.number_of_nodes()} nodes, layout={layout}")
+            pixels = None
             
-            try:
-                import pygraphviz as pgv
-                use_pygraphviz = True
-            except ImportError:
-                app_logger.warning("pygraphviz not available, using matplotlib fallback")
-                use_pygraphviz = False
-            
-            if use_pygraphviz:
-                return self._render_with_pygraphviz(graph, layout, format, dpi)
+            if format == 'svg':
+                image_bytes = self.render_svg(graph, layout)
+            elif self._get_pygraphviz() is not None:
+                image_bytes = self._render_with_pygraphviz(graph, layout, format, dpi)
+            elif format == 'png' and settings.render_engine == 'svg' and png_rasterizer_available():
+                image_bytes = self._render_svg_png(graph, layout, dpi)
+            elif format == 'png':
+                pixels = self._matplotlib_pixels(graph, layout, dpi)
+                image_bytes = numpy_to_bytes(pixels)
+                app_logger.info("Graph rendered successfully with matplotlib")
             else:
-                return self._render_with_matplotlib(graph, layout, format, dpi)
+                image_bytes = self._render_with_matplotlib(graph, layout, format, dpi)
             
         except Exception as e:
             app_logger.error(f"Graph rendering failed: {str(e)}", exc_info=True)
             raise VisualizationError(f"Failed to render graph: {str(e)}")
+        
+        return image_bytes, self._thumbnail(graph, layout, format, image_bytes, pixels, thumbnail_size)
+    
+    def _thumbnail(
+        self,
+        graph: CompactGraph,
+        layout: str,
+        format: str,
+        image_bytes: bytes,
+        pixels: Optional[np.ndarray],
+        thumbnail_size: int
+    ) -> Optional[bytes]:
+        """Миниатюра к готовому изображению; ее ошибка не должна ронять основной рендер"""
+        if not thumbnail_size:
+            return None
+        try:
+            if pixels is not None:
+                return make_thumbnail(pixels, thumbnail_size)
+            if format == 'svg' or (self._get_pygraphviz() is None and format == 'png'):
+                if png_rasterizer_available():
+                    return self._svg_thumbnail(graph, layout, thumbnail_size)
+                return None
+            if format == 'png':
+                return make_thumbnail(bytes_to_numpy(image_bytes), thumbnail_size)
+            return None
+        except Exception as e:
+            app_logger.warning(f"Thumbnail rendering failed: {str(e)}", exc_info=True)
+            return None
+    
+    def _get_pygraphviz(self):
+        """Модуль pygraphviz или None; импорт проверяется один раз на экземпляр"""
+        if self._pygraphviz_checked:
+            return self._pygraphviz
+        try:
+            import pygraphviz
+            self._pygraphviz = pygraphviz
+        except ImportError:
+            app_logger.warning("pygraphviz not available, using built-in renderer")
+        self._pygraphviz_checked = True
+        return self._pygraphviz
     
     def _render_with_pygraphviz(
         self,
-        graph: nx.DiGraph,
+        graph: CompactGraph,
         layout: str,
         format: str,
         dpi: int
     ) -> bytes:
-        import pygraphviz as pgv
+        pgv = self._get_pygraphviz()
         
         agraph = pgv.AGraph(directed=True, strict=False)
         
@@ -107,25 +186,64 @@ class GraphVisualizer:
         
         image_bytes = agraph.draw(format=format)
         
-        app_logger.info(f"Graph rendered successfully with pygraphviz")
+        app_logger.info("Graph rendered successfully with pygraphviz")
         return image_bytes
     
     def _render_with_matplotlib(
         self,
-        graph: nx.DiGraph,
+        graph: CompactGraph,
         layout: str,
         format: str,
         dpi: int
     ) -> bytes:
+        if format == 'png':
+            image_bytes = numpy_to_bytes(self._matplotlib_pixels(graph, layout, dpi))
+            app_logger.info("Graph rendered successfully with matplotlib")
+            return image_bytes
+        
         import matplotlib.pyplot as plt
-        import matplotlib.patches as mpatches
         
-        fig, ax = plt.subplots(figsize=(12, 8), dpi=dpi)
+        fig, dpi = self._draw_with_matplotlib(graph, layout, dpi)
+        buffer = io.BytesIO()
+        plt.savefig(buffer, format=format, dpi=dpi, bbox_inches='tight')
+        buffer.seek(0)
+        image_bytes = buffer.read()
+        plt.close(fig)
         
-        if layout == 'vertical':
-            pos = nx.spring_layout(graph, k=2, iterations=50)
-        else:
-            pos = nx.kamada_kawai_layout(graph)
+        app_logger.info("Graph rendered successfully with matplotlib")
+        return image_bytes
+    
+    def _matplotlib_pixels(self, graph: CompactGraph, layout: str, dpi: int) -> np.ndarray:
+        """RGB-растр фигуры, обрезанный по содержимому, как bbox_inches='tight': один проход отрисовки вместо двух в savefig"""
+        import matplotlib.pyplot as plt
+        
+        fig, dpi = self._draw_with_matplotlib(graph, layout, dpi)
+        try:
+            fig.canvas.draw()
+            pixels = np.asarray(fig.canvas.buffer_rgba())[..., :3]
+            ink = (pixels < 250).any(axis=2)
+            rows, cols = np.flatnonzero(ink.any(axis=1)), np.flatnonzero(ink.any(axis=0))
+            if len(rows):
+                # Поле 0.1 дюйма, как pad_inches у savefig
+                pad = int(round(0.1 * dpi))
+                pixels = pixels[
+                    max(rows[0] - pad, 0):rows[-1] + pad + 1,
+                    max(cols[0] - pad, 0):cols[-1] + pad + 1
+                ]
+            return np.ascontiguousarray(pixels)
+        finally:
+            plt.close(fig)
+    
+    def _draw_with_matplotlib(self, graph: CompactGraph, layout: str, dpi: int):
+        """Фигура со схемой и dpi после бюджета пикселей; закрывает фигуру вызывающий"""
+        import matplotlib.pyplot as plt
+        
+        layout_result = self.compute_layout(graph, layout)
+        width, height, dpi = self.figure_size(layout_result, dpi)
+        fig, ax = plt.subplots(figsize=(width, height), dpi=dpi)
+        
+        pos = layout_result.positions()
+        graph = as_networkx(graph)
         
         node_colors = []
         for node in graph.nodes():
@@ -170,22 +288,134 @@ class GraphVisualizer:
             ax=ax
         )
         
+        # Поля в полшага укладки: маркеры узлов заданы в пунктах, и автомасштаб осей их не учитывает
+        if pos:
+            xs = [point[0] for point in pos.values()]
+            ys = [point[1] for point in pos.values()]
+            if layout_result.direction == 'horizontal':
+                x_pad, y_pad = layout_result.layer_gap / 2, 0.5
+            else:
+                x_pad, y_pad = 0.5, layout_result.layer_gap / 2
+            ax.set_xlim(min(xs) - x_pad, max(xs) + x_pad)
+            ax.set_ylim(min(ys) - y_pad, max(ys) + y_pad)
+        
         ax.axis('off')
         plt.tight_layout()
-        
-        buffer = io.BytesIO()
-        plt.savefig(buffer, format=format, dpi=dpi, bbox_inches='tight')
-        buffer.seek(0)
-        image_bytes = buffer.read()
-        plt.close(fig)
-        
-        app_logger.info(f"Graph rendered successfully with matplotlib")
+        return fig, dpi
+    
+    def figure_size(self, layout: Layout, dpi: float) -> Tuple[float, float, float]:
+        """Размер фигуры в дюймах по протяженности укладки и dpi, сниженный до бюджета пикселей RENDER_MAX_PIXELS"""
+        order_span = float(np.ptp(layout.x)) if len(layout.ids) else 0.0
+        rank_span = float(np.ptp(layout.rank)) if len(layout.ids) else 0.0
+        if layout.direction == 'horizontal':
+            width, height = (rank_span + 1) * self.FIGURE_LABEL_INCHES, (order_span + 1) * self.FIGURE_NODE_INCHES
+        else:
+            width, height = (order_span + 1) * self.FIGURE_LABEL_INCHES, (rank_span + 1) * self.FIGURE_NODE_INCHES
+        width, height = max(width, self.MIN_FIGURE_INCHES[0]), max(height, self.MIN_FIGURE_INCHES[1])
+        scale = fit_scale(width * dpi, height * dpi, settings.render_max_pixels)
+        if scale < 1:
+            app_logger.info(f"Figure {width:.0f}x{height:.0f}in exceeds pixel budget, dpi {dpi} -> {dpi * scale:.1f}")
+        return width, height, dpi * scale
+    
+    def _render_svg_png(self, graph: CompactGraph, layout: str, dpi: int) -> bytes:
+        """PNG через встроенный SVG: масштаб ограничен бюджетом пикселей, детализация - по масштабу"""
+        layout_result = self.compute_layout(graph, layout)
+        geometry = self.svg_renderer.measure(graph, layout_result)
+        zoom = dpi / SVG_DPI * self._svg_budget_scale(geometry, dpi)
+        return self._rasterize_svg(graph, layout_result, geometry, zoom)
+    
+    def _svg_budget_scale(self, geometry: SVGGeometry, dpi: int) -> float:
+        zoom = dpi / SVG_DPI
+        return fit_scale(geometry.width * zoom, geometry.height * zoom, settings.render_max_pixels)
+    
+    def png_scale(self, graph: CompactGraph, layout: str, dpi: int) -> float:
+        """Во сколько раз render(format='png') уменьшит схему до бюджета пикселей: тот же путь отрисовки и те же размеры"""
+        if self._get_pygraphviz() is not None:
+            return 1.0
+        layout_result = self.compute_layout(graph, layout)
+        if settings.render_engine == 'svg' and png_rasterizer_available():
+            return self._svg_budget_scale(self.svg_renderer.measure(graph, layout_result), dpi)
+        return self.figure_size(layout_result, dpi)[2] / dpi
+    
+    def _svg_thumbnail(self, graph: CompactGraph, layout: str, max_size: int) -> bytes:
+        """Миниатюра из той же укладки, растеризованная сразу в своем размере"""
+        layout_result = self.compute_layout(graph, layout)
+        geometry = self.svg_renderer.measure(graph, layout_result)
+        zoom = min(max_size / geometry.width, max_size / geometry.height, 1.0)
+        return self._rasterize_svg(graph, layout_result, geometry, zoom)
+    
+    def _rasterize_svg(self, graph: CompactGraph, layout: Layout, geometry: SVGGeometry, zoom: float) -> bytes:
+        size = (max(round(geometry.width * zoom), 1), max(round(geometry.height * zoom), 1))
+        detail = self.svg_renderer.detail_for_zoom(zoom)
+        svg = self.svg_renderer.render(graph, layout, detail=detail, geometry=geometry, size=size)
+        return svg_to_png(svg, size=size)
+    
+    def tile_pyramid(self, graph: CompactGraph, layout: str, dpi: int, tile_size: int) -> Tuple[TilePyramid, SVGGeometry]:
+        """Пирамида тайлов полного разрешения (SVG при dpi) и геометрия узлов для отрисовки тайлов"""
+        geometry = self.svg_renderer.measure(graph, self.compute_layout(graph, layout))
+        zoom = dpi / SVG_DPI
+        pyramid = TilePyramid(max(int(np.ceil(geometry.width * zoom)), 1), max(int(np.ceil(geometry.height * zoom)), 1), tile_size)
+        return pyramid, geometry
+    
+    def render_tile(
+        self,
+        graph: CompactGraph,
+        layout: str,
+        pyramid: TilePyramid,
+        level: int,
+        col: int,
+        row: int,
+        geometry: Optional[SVGGeometry] = None
+    ) -> bytes:
+        """PNG одного тайла: в SVG попадает только область тайла, поэтому время не зависит от размера схемы"""
+        layout_result = self.compute_layout(graph, layout)
+        if geometry is None:
+            geometry = self.svg_renderer.measure(graph, layout_result)
+        x, y, width, height = pyramid.tile_box(level, col, row)
+        zoom = pyramid.scale(level) * pyramid.width / geometry.width
+        viewport = (x / zoom, y / zoom, width / zoom, height / zoom)
+        detail = self.svg_renderer.detail_for_zoom(zoom)
+        svg = self.svg_renderer.render(graph, layout_result, viewport=viewport, detail=detail, geometry=geometry, size=(width, height))
+        return svg_to_png(svg, size=(width, height))
+    
+    def render_svg(self, graph: CompactGraph, layout: str = 'vertical') -> bytes:
+        """SVG без matplotlib: фигуры и подписи пишутся строками по послойной укладке"""
+        image_bytes = self.svg_renderer.render(graph, self.compute_layout(graph, layout))
+        app_logger.info("Graph rendered successfully as SVG")
         return image_bytes
     
-    def render_to_image(self, graph: nx.DiGraph, **kwargs) -> Image.Image:
+    def compute_layout(self, graph: CompactGraph, layout: str) -> Layout:
+        """Послойная укладка: слой - строка при vertical, столбец при horizontal"""
+        direction = 'horizontal' if layout == 'horizontal' else 'vertical'
+        return graph.cached(f'layered_layout_{direction}', lambda g: self._cached_layout(g, direction))
+    
+    def needs_layout(self, format: str) -> bool:
+        """Нужна ли отрисовке послойная укладка: pygraphviz укладывает граф сам"""
+        return format == 'svg' or self._get_pygraphviz() is None
+    
+    def use_layout(self, graph: CompactGraph, layout_result: Layout) -> None:
+        """Готовая укладка (например, из кэша сервера) для следующих отрисовок этого графа"""
+        graph.cached(f'layered_layout_{layout_result.direction}', lambda g: layout_result)
+    
+    def _cached_layout(self, graph: CompactGraph, direction: str) -> Layout:
+        """Укладка из общего кэша: тот же граф из другого запроса или в другом формате не укладывается заново"""
+        if self.layout_cache is None:
+            return self.layout_engine.compute(graph, direction)
+        key = layout_key(graph, direction)
+        cached = self.layout_cache.get(key)
+        if cached is not None:
+            return cached
+        result = self.layout_engine.compute(graph, direction)
+        self.layout_cache.put(key, result)
+        return result
+    
+    def _layered_positions(self, graph: CompactGraph, layout: str) -> Dict[str, Tuple[float, float]]:
+        return self.compute_layout(graph, layout).positions()
+    
+    def render_to_image(self, graph: CompactGraph, **kwargs) -> Image.Image:
         image_bytes = self.render(graph, **kwargs)
         return Image.open(io.BytesIO(image_bytes))
     
-    def render_to_numpy(self, graph: nx.DiGraph, **kwargs) -> np.ndarray:
+    def render_to_numpy(self, graph: CompactGraph, **kwargs) -> np.ndarray:
         image = self.render_to_image(graph, **kwargs)
         return np.array(image)
@@ -0,0 +1,222 @@
+import numpy as np
+import cv2
+from typing import List, Dict, Any, Tuple, Optional
+
+from src.core.logger import app_logger
+from src.core.exceptions import DetectionError
+from src.ml_pipeline.detector import BoundingBox
+from src.utils.spatial_index import GridIndex
+
+
+class Connector:
+    def __init__(
+        self,
+        source: int,
+        target: int,
+        points: List[Tuple[float, float]],
+        has_arrow: bool,
+        confidence: float,
+        path: Optional[np.ndarray] = None
+    ):
+        self.source = source
+        self.target = target
+        self.points = points
+        self.has_arrow = has_arrow
+        self.confidence = confidence
+        # Упрощенный контур линии (N x 2) - нужен для привязки подписей к соединителю
+        self.path = path if path is not None else np.array(points, dtype=np.float32)
+        self.x1 = float(self.path[:, 0].min())
+        self.y1 = float(self.path[:, 1].min())
+        self.x2 = float(self.path[:, 0].max())
+        self.y2 = float(self.path[:, 1].max())
+    
+    def distance_to(self, x: float, y: float) -> float:
+        """Расстояние от точки до ломаной соединителя"""
+        starts = self.path
+        ends = np.roll(self.path, -1, axis=0) if len(self.path) > 2 else self.path[::-1]
+        segments = ends - starts
+        lengths = np.maximum((segments ** 2).sum(axis=1), 1e-9)
+        point = np.array([x, y], dtype=np.float32)
+        t = np.clip(((point - starts) * segments).sum(axis=1) / lengths, 0.0, 1.0)
+        projections = starts + segments * t[:, None]
+        return float(np.sqrt(((projections - point) ** 2).sum(axis=1)).min())
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "source": int(self.source),
+            "target": int(self.target),
+            "points": [[float(x), float(y)] for x, y in self.points],
+            "has_arrow": bool(self.has_arrow),
+            "confidence": float(self.confidence)
+        }
+
+
+class _Contact:
+    def __init__(self, box_idx: int, point: Tuple[float, float], extent: float):
+        self.box_idx = box_idx
+        self.point = point
+        self.extent = extent
+
+
+class ConnectorDetector:
+    def __init__(
+        self,
+        snap_distance: float = 12.0,
+        min_length: float = 8.0,
+        arrow_ratio: float = 1.8
+    ):
+        self.snap_distance = snap_distance
+        self.min_length = min_length
+        self.arrow_ratio = arrow_ratio
+        app_logger.info(f"ConnectorDetector initialized with snap_distance={snap_distance}")
+
+    def detect(self, binary: np.ndarray, bboxes: List[BoundingBox]) -> List[Connector]:
+        """Поиск соединительных линий и стрелок по бинарной маске детектора"""
+        try:
+            if len(bboxes) < 2:
+                return []
+
+            # Убираем фигуры вместе с их контуром - остаются линии, стрелки и подписи
+            lines_mask = binary.copy()
+            height, width = lines_mask.shape[:2]
+            pad = 2
+            for bbox in bboxes:
+                x1 = max(0, int(bbox.x1) - pad)
+                y1 = max(0, int(bbox.y1) - pad)
+                x2 = min(width, int(bbox.x2) + pad + 1)
+                y2 = min(height, int(bbox.y2) + pad + 1)
+                lines_mask[y1:y2, x1:x2] = 0
+
+            index = self._build_index(bboxes)
+
+            num_labels, labels, stats, _ = cv2.connectedComponentsWithStats(lines_mask, connectivity=8)
+
+            connectors = []
+            seen = set()
+            for label in range(1, num_labels):
+                x, y, w, h, _ = stats[label]
+                if max(w, h) < self.min_length:
+                    continue
+
+                candidates = index.query(
+                    x - self.snap_distance,
+                    y - self.snap_distance,
+                    x + w + self.snap_distance,
+                    y + h + self.snap_distance
+                )
+                if len(candidates) < 2:
+                    continue
+
+                ys, xs = np.nonzero(labels[y:y + h, x:x + w] == label)
+                xs = xs + x
+                ys = ys + y
+
+                contacts = self._find_contacts(xs, ys, candidates, bboxes)
+                if len(contacts) < 2:
+                    continue
+
+                path = self._trace_path(labels[y:y + h, x:x + w] == label, x, y)
+
+                for connector in self._orient(contacts, bboxes, path):
+                    key = (connector.source, connector.target)
+                    if key in seen:
+                        continue
+                    seen.add(key)
+                    connectors.append(connector)
+
+            app_logger.info(f"Detected {len(connectors)} connectors from {num_labels - 1} line components")
+            return connectors
+
+        except Exception as e:
+            app_logger.error(f"Error detecting connectors: {str(e)}", exc_info=True)
+            raise DetectionError(f"Failed to detect connectors: {str(e)}")
+
+    def _build_index(self, bboxes: List[BoundingBox]) -> GridIndex:
+        sizes = sorted(max(b.width, b.height) for b in bboxes)
+        cell_size = max(sizes[len(sizes) // 2], self.snap_distance * 4)
+
+        index = GridIndex(cell_size)
+        for idx, bbox in enumerate(bboxes):
+            index.insert(idx, bbox.x1, bbox.y1, bbox.x2, bbox.y2)
+        return index
+
+    def _find_contacts(
+        self,
+        xs: np.ndarray,
+        ys: np.ndarray,
+        candidates: List[int],
+        bboxes: List[BoundingBox]
+    ) -> List[_Contact]:
+        contacts = []
+        snap = self.snap_distance
+
+        for box_idx in candidates:
+            bbox = bboxes[box_idx]
+            near = (
+                (xs >= bbox.x1 - snap) & (xs <= bbox.x2 + snap) &
+                (ys >= bbox.y1 - snap) & (ys <= bbox.y2 + snap)
+            )
+            if not near.any():
+                continue
+
+            near_xs = xs[near]
+            near_ys = ys[near]
+            point = (float(near_xs.mean()), float(near_ys.mean()))
+
+            # Ширина штриха вдоль стороны фигуры: у наконечника стрелки она заметно больше
+            if bbox.x1 <= point[0] <= bbox.x2:
+                extent = float(near_xs.max() - near_xs.min() + 1)
+            else:
+                extent = float(near_ys.max() - near_ys.min() + 1)
+
+            contacts.append(_Contact(box_idx, point, extent))
+
+        return contacts
+
+    def _trace_path(self, component: np.ndarray, offset_x: int, offset_y: int) -> np.ndarray:
+        contours, _ = cv2.findContours(component.astype(np.uint8), cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        contour = max(contours, key=len)
+        approx = cv2.approxPolyDP(contour, 2.0, True).reshape(-1, 2).astype(np.float32)
+        approx[:, 0] += offset_x
+        approx[:, 1] += offset_y
+        return approx
+
+    def _orient(
+        self,
+        contacts: List[_Contact],
+        bboxes: List[BoundingBox],
+        path: Optional[np.ndarray] = None
+    ) -> List[Connector]:
+        stroke = min(c.extent for c in contacts)
+        heads = [
+            c for c in contacts
+            if c.extent >= stroke * self.arrow_ratio and c.extent >= stroke + 3
+        ]
+        tails = [c for c in contacts if c not in heads]
+
+        if heads and tails:
+            has_arrow = True
+            confidence = 0.9
+        else:
+            # Наконечник не найден - направление по порядку чтения (сверху вниз, слева направо)
+            has_arrow = False
+            confidence = 0.6
+            ordered = sorted(
+                contacts,
+                key=lambda c: (bboxes[c.box_idx].center_y, bboxes[c.box_idx].center_x)
+            )
+            tails = ordered[:1]
+            heads = ordered[1:]
+
+        return [
+            Connector(
+                source=tail.box_idx,
+                target=head.box_idx,
+                points=[tail.point, head.point],
+                has_arrow=has_arrow,
+                confidence=confidence,
+                path=path
+            )
+            for tail in tails
+            for head in heads
+        ]
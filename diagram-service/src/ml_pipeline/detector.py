@@ -1,6 +1,6 @@
 import numpy as np
 import cv2
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 from pathlib import Path
 
 from src.core.logger import app_logger
@@ -47,79 +47,139 @@ class DiagramDetector:
     
     def detect_diagram_elements(self, image: np.ndarray) -> List[BoundingBox]:
         """Детекция элементов диаграмм с использованием OpenCV"""
+        bboxes, _ = self.detect_with_mask(image)
+        return bboxes
+    
+    def compute_binary_mask(self, image: np.ndarray) -> np.ndarray:
+        """Бинарная маска штрихов (белое - чернила), общая для детекции фигур и соединителей"""
+        # Конвертируем в grayscale
+        if len(image.shape) == 3:
+            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        else:
+            gray = image.copy()
+        
+        # Применяем адаптивную бинаризацию для лучшего выделения элементов
+        return cv2.adaptiveThreshold(
+            gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, 
+            cv2.THRESH_BINARY_INV, 11, 2
+        )
+    
+    def detect_with_mask(self, image: np.ndarray) -> Tuple[List[BoundingBox], np.ndarray]:
+        """Детекция элементов, возвращающая также маску штрихов для поиска соединителей"""
         try:
             app_logger.info(f"Detecting diagram elements in image of shape {image.shape}")
             
-            # Конвертируем в grayscale
-            if len(image.shape) == 3:
-                gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-            else:
-                gray = image.copy()
-            
-            # Применяем адаптивную бинаризацию для лучшего выделения элементов
-            binary = cv2.adaptiveThreshold(
-                gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, 
-                cv2.THRESH_BINARY_INV, 11, 2
-            )
-            
-            # Морфологические операции для очистки шума
-            kernel = np.ones((3, 3), np.uint8)
-            binary = cv2.morphologyEx(binary, cv2.MORPH_CLOSE, kernel, iterations=2)
-            binary = cv2.morphologyEx(binary, cv2.MORPH_OPEN, kernel, iterations=1)
-            
-            # Поиск контуров
-            contours, _ = cv2.findContours(binary, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+            binary = self.compute_binary_mask(image)
             
-            app_logger.info(f"Found {len(contours)} contours")
-            
-            bboxes = []
-            min_area = 800  # Минимальная площадь элемента
-            max_area = image.shape[0] * image.shape[1] * 0.5  # Максимум 50% изображения
-            
-            for idx, contour in enumerate(contours):
-                area = cv2.contourArea(contour)
-                
-                # Фильтруем по площади
-                if area < min_area or area > max_area:
-                    continue
-                
-                # Получаем bounding box
-                x, y, w, h = cv2.boundingRect(contour)
-                
-                # Проверяем соотношение сторон (исключаем линии)
-                aspect_ratio = max(w, h) / (min(w, h) + 1)
-                if aspect_ratio > 15:  # Слишком вытянутый - это линия
-                    continue
-                
-                # Проверяем что это не весь фон
-                if w > image.shape[1] * 0.9 or h > image.shape[0] * 0.9:
-                    continue
-                
-                # Определяем тип элемента по форме
-                element_type = self._classify_by_shape(contour, w, h)
-                
-                bbox = BoundingBox(
-                    x1=float(x),
-                    y1=float(y),
-                    x2=float(x + w),
-                    y2=float(y + h),
-                    confidence=0.95,
-                    class_id=idx,
-                    class_name=element_type
-                )
-                
-                bboxes.append(bbox)
+            # Замкнутые фигуры ищем по их внутренним областям - так фигуры,
+            # к которым примыкают линии, не сливаются в один контур
+            bboxes = self._detect_closed_shapes(binary, image.shape)
+            if not bboxes:
+                bboxes = self._detect_blobs(binary, image.shape)
             
             # Сортируем по позиции (сверху вниз, слева направо)
             bboxes.sort(key=lambda b: (b.center_y, b.center_x))
             
             app_logger.info(f"Detected {len(bboxes)} diagram elements")
-            return bboxes
+            return bboxes, binary
             
         except Exception as e:
             app_logger.error(f"Error detecting diagram elements: {str(e)}", exc_info=True)
             raise DetectionError(f"Failed to detect diagram elements: {str(e)}")
     
+    def _is_element_candidate(self, contour, image_shape) -> bool:
+        area = cv2.contourArea(contour)
+        min_area = 800  # Минимальная площадь элемента
+        max_area = image_shape[0] * image_shape[1] * 0.5  # Максимум 50% изображения
+        
+        # Фильтруем по площади
+        if area < min_area or area > max_area:
+            return False
+        
+        x, y, w, h = cv2.boundingRect(contour)
+        
+        # Проверяем соотношение сторон (исключаем линии)
+        aspect_ratio = max(w, h) / (min(w, h) + 1)
+        if aspect_ratio > 15:  # Слишком вытянутый - это линия
+            return False
+        
+        # Проверяем что это не весь фон
+        if w > image_shape[1] * 0.9 or h > image_shape[0] * 0.9:
+            return False
+        
+        return True
+    
+    def _detect_closed_shapes(self, binary: np.ndarray, image_shape) -> List[BoundingBox]:
+        contours, hierarchy = cv2.findContours(binary, cv2.RETR_CCOMP, cv2.CHAIN_APPROX_SIMPLE)
+        if hierarchy is None:
+            return []
+        
+        holes = [
+            (idx, contour) for idx, contour in enumerate(contours)
+            if hierarchy[0][idx][3] != -1 and self._is_element_candidate(contour, image_shape)
+        ]
+        app_logger.info(f"Found {len(holes)} closed regions")
+        
+        # Области, замкнутые соединителями между фигурами, намного крупнее самих фигур
+        if len(holes) >= 3:
+            areas = sorted(cv2.contourArea(contour) for _, contour in holes)
+            max_area = areas[len(areas) // 2] * 6
+            holes = [(idx, contour) for idx, contour in holes if cv2.contourArea(contour) <= max_area]
+        
+        height, width = binary.shape[:2]
+        stroke = 2  # Внутренняя область меньше фигуры на толщину контура
+        
+        bboxes = []
+        for idx, contour in holes:
+            x, y, w, h = cv2.boundingRect(contour)
+            element_type = self._classify_by_shape(contour, w, h)
+            
+            bboxes.append(BoundingBox(
+                x1=float(max(0, x - stroke)),
+                y1=float(max(0, y - stroke)),
+                x2=float(min(width, x + w + stroke)),
+                y2=float(min(height, y + h + stroke)),
+                confidence=0.95,
+                class_id=idx,
+                class_name=element_type
+            ))
+        
+        return bboxes
+    
+    def _detect_blobs(self, binary: np.ndarray, image_shape) -> List[BoundingBox]:
+        # Морфологические операции для очистки шума
+        kernel = np.ones((3, 3), np.uint8)
+        cleaned = cv2.morphologyEx(binary, cv2.MORPH_CLOSE, kernel, iterations=2)
+        cleaned = cv2.morphologyEx(cleaned, cv2.MORPH_OPEN, kernel, iterations=1)
+        
+        # Поиск контуров
+        contours, _ = cv2.findContours(cleaned, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        
+        app_logger.info(f"Found {len(contours)} contours")
+        
+        bboxes = []
+        for idx, contour in enumerate(contours):
+            if not self._is_element_candidate(contour, image_shape):
+                continue
+            
+            # Получаем bounding box
+            x, y, w, h = cv2.boundingRect(contour)
+            
+            # Определяем тип элемента по форме
+            element_type = self._classify_by_shape(contour, w, h)
+            
+            bboxes.append(BoundingBox(
+                x1=float(x),
+                y1=float(y),
+                x2=float(x + w),
+                y2=float(y + h),
+                confidence=0.95,
+                class_id=idx,
+                class_name=element_type
+            ))
+        
+        return bboxes
+    
     def _classify_by_shape(self, contour, width: float, height: float) -> str:
         """Классификация элемента по форме контура"""
         
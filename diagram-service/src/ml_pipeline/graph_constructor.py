@@ -1,11 +1,13 @@
-import networkx as nx
-from typing import List, Dict, Any, Tuple
+from typing import List, Dict, Any, Tuple, Optional
 import numpy as np
 
 from src.core.logger import app_logger
 from src.core.exceptions import GraphConstructionError
 from src.ml_pipeline.detector import BoundingBox
+from src.ml_pipeline.connector_detector import Connector
 from src.utils.graph_utils import create_directed_graph, add_node, add_edge
+from src.utils.spatial_index import StripIndex
+from src.utils.compact_graph import CompactGraph
 
 
 class GraphConstructor:
@@ -14,7 +16,13 @@ class GraphConstructor:
         self.horizontal_threshold = horizontal_threshold
         app_logger.info(f"GraphConstructor initialized with v_threshold={vertical_threshold}, h_threshold={horizontal_threshold}")
     
-    def construct(self, bboxes: List[BoundingBox], texts: Dict[int, str]) -> nx.DiGraph:
+    def construct(
+        self,
+        bboxes: List[BoundingBox],
+        texts: Dict[int, str],
+        connectors: Optional[List[Connector]] = None,
+        connector_texts: Optional[Dict[int, Any]] = None
+    ) -> CompactGraph:
         try:
             app_logger.debug(f"Constructing graph from {len(bboxes)} bounding boxes")
             
@@ -22,15 +30,7 @@ class GraphConstructor:
             
             for idx, bbox in enumerate(bboxes):
                 node_id = f"node_{idx}"
-                text_obj = texts.get(idx, "")
-                
-                # Извлекаем текст из OCRResult если это объект
-                if hasattr(text_obj, 'text'):
-                    text = text_obj.text
-                elif isinstance(text_obj, str):
-                    text = text_obj
-                else:
-                    text = ""
+                text = self._text_of(texts.get(idx, ""))
                 
                 add_node(
                     graph,
@@ -42,7 +42,10 @@ class GraphConstructor:
                     confidence=bbox.confidence
                 )
             
-            self._connect_nodes(graph, bboxes)
+            if connectors is not None:
+                self._connect_by_connectors(graph, connectors, connector_texts or {})
+            else:
+                self._connect_nodes(graph, bboxes)
             
             app_logger.info(f"Graph constructed: {graph.number_of_nodes()} nodes, {graph.number_of_edges()} edges")
             return graph
@@ -51,21 +54,63 @@ class GraphConstructor:
             app_logger.error(f"Graph construction failed: {str(e)}", exc_info=True)
             raise GraphConstructionError(f"Failed to construct graph: {str(e)}")
     
-    def _connect_nodes(self, graph: nx.DiGraph, bboxes: List[BoundingBox]):
+    def _text_of(self, text_obj: Any) -> str:
+        # Извлекаем текст из OCRResult если это объект
+        if hasattr(text_obj, 'text'):
+            return text_obj.text
+        elif isinstance(text_obj, str):
+            return text_obj
+        return ""
+    
+    def _connect_by_connectors(
+        self,
+        graph: CompactGraph,
+        connectors: List[Connector],
+        connector_texts: Dict[int, Any]
+    ):
+        for idx, connector in enumerate(connectors):
+            source = f"node_{connector.source}"
+            target = f"node_{connector.target}"
+            if source == target or graph.has_edge(source, target):
+                continue
+            
+            attributes = {'confidence': connector.confidence}
+            label = self._text_of(connector_texts.get(idx, ""))
+            if label:
+                attributes['label'] = label
+            
+            add_edge(graph, source, target, **attributes)
+            app_logger.debug(f"Connected {source} -> {target} by detected connector")
+    
+    def _connect_nodes(self, graph: CompactGraph, bboxes: List[BoundingBox]):
         nodes = list(graph.nodes())
+        centers = [(bbox.center_x, bbox.center_y) for bbox in bboxes]
+        
+        # Кандидаты ниже - в вертикальной полосе шириной 2*h_threshold, правее - в горизонтальной высотой 2*v_threshold
+        columns = StripIndex(self.horizontal_threshold).build(centers)
+        rows = StripIndex(self.vertical_threshold).build([(y, x) for x, y in centers])
         
         for i, node1 in enumerate(nodes):
             bbox1 = bboxes[i]
+            x, y = centers[i]
+            
+            below = columns.query_after(x, self.horizontal_threshold, y + self.vertical_threshold - self._slack(y))
+            right = rows.query_after(y, self.vertical_threshold, x + self.horizontal_threshold - self._slack(x))
             
-            for j, node2 in enumerate(nodes):
+            # Порядок добавления ребер совпадает с полным перебором пар
+            for j in sorted(set(below) | set(right)):
                 if i == j:
                     continue
                 
                 bbox2 = bboxes[j]
                 
                 if self._should_connect(bbox1, bbox2):
-                    add_edge(graph, node1, node2)
-                    app_logger.debug(f"Connected {node1} -> {node2}")
+                    add_edge(graph, node1, nodes[j])
+                    app_logger.debug(f"Connected {node1} -> {nodes[j]}")
+    
+    def _slack(self, value: float) -> float:
+        # Запас на округление: точную проверку делает _should_connect
+        return 1e-6 * (abs(value) + self.vertical_threshold + self.horizontal_threshold + 1.0)
     
     def _should_connect(self, bbox1: BoundingBox, bbox2: BoundingBox) -> bool:
         dx = bbox2.center_x - bbox1.center_x
@@ -79,8 +124,14 @@ class GraphConstructor:
         
         return False
     
-    def construct_with_flow_analysis(self, bboxes: List[BoundingBox], texts: Dict[int, str]) -> nx.DiGraph:
-        graph = self.construct(bboxes, texts)
+    def construct_with_flow_analysis(
+        self,
+        bboxes: List[BoundingBox],
+        texts: Dict[int, str],
+        connectors: Optional[List[Connector]] = None,
+        connector_texts: Optional[Dict[int, Any]] = None
+    ) -> CompactGraph:
+        graph = self.construct(bboxes, texts, connectors, connector_texts)
         
         self._identify_start_end_nodes(graph, bboxes)
         
@@ -88,23 +139,31 @@ class GraphConstructor:
         
         return graph
     
-    def _identify_start_end_nodes(self, graph: nx.DiGraph, bboxes: List[BoundingBox]):
+    def _identify_start_end_nodes(self, graph: CompactGraph, bboxes: List[BoundingBox]):
         nodes = list(graph.nodes())
         
         if not nodes:
             return
         
-        topmost_idx = min(range(len(bboxes)), key=lambda i: bboxes[i].center_y)
+        # Верхний и нижний узлы за один проход (при равенстве - первый, как у min/max)
+        topmost_idx = 0
+        bottommost_idx = 0
+        for idx in range(1, len(bboxes)):
+            center_y = bboxes[idx].center_y
+            if center_y < bboxes[topmost_idx].center_y:
+                topmost_idx = idx
+            if center_y > bboxes[bottommost_idx].center_y:
+                bottommost_idx = idx
+        
         topmost_node = nodes[topmost_idx]
         graph.nodes[topmost_node]['type'] = 'start'
         app_logger.debug(f"Identified start node: {topmost_node}")
         
-        bottommost_idx = max(range(len(bboxes)), key=lambda i: bboxes[i].center_y)
         bottommost_node = nodes[bottommost_idx]
         graph.nodes[bottommost_node]['type'] = 'end'
         app_logger.debug(f"Identified end node: {bottommost_node}")
     
-    def _refine_connections(self, graph: nx.DiGraph, bboxes: List[BoundingBox]):
+    def _refine_connections(self, graph: CompactGraph, bboxes: List[BoundingBox]):
         nodes = list(graph.nodes())
         
         for node in nodes:
@@ -116,7 +175,7 @@ class GraphConstructor:
                     graph.nodes[node]['type'] = 'decision'
                     app_logger.debug(f"Changed {node} to decision (multiple outputs)")
     
-    def construct_from_coordinates(self, coordinates: List[Tuple[float, float]], labels: List[str]) -> nx.DiGraph:
+    def construct_from_coordinates(self, coordinates: List[Tuple[float, float]], labels: List[str]) -> CompactGraph:
         graph = create_directed_graph()
         
         for idx, (x, y) in enumerate(coordinates):
@@ -0,0 +1,97 @@
+import numpy as np
+import cv2
+from typing import List, Dict, Any, Tuple, Optional
+
+from src.core.logger import app_logger
+from src.core.config import settings
+from src.ml_pipeline.detector import BoundingBox
+
+
+class InkStats:
+    def __init__(self, ink_ratio: float, mean_stroke_width: float, has_text: bool):
+        self.ink_ratio = ink_ratio
+        self.mean_stroke_width = mean_stroke_width
+        self.has_text = has_text
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "ink_ratio": float(self.ink_ratio),
+            "mean_stroke_width": float(self.mean_stroke_width),
+            "has_text": bool(self.has_text)
+        }
+
+
+class InkIntegrals:
+    """Интегральные изображения маски: сумма чернил и горизонтальных переходов за O(1)"""
+
+    def __init__(self, binary: np.ndarray):
+        ink = (binary > 0).astype(np.uint8)
+        transitions = np.zeros_like(ink)
+        transitions[:, 1:] = ink[:, 1:] != ink[:, :-1]
+
+        self.ink = cv2.integral(ink)
+        self.transitions = cv2.integral(transitions)
+        self.height, self.width = ink.shape[:2]
+
+    @staticmethod
+    def _region_sum(integral: np.ndarray, x1: int, y1: int, x2: int, y2: int) -> int:
+        return int(integral[y2, x2] - integral[y1, x2] - integral[y2, x1] + integral[y1, x1])
+
+    def region(self, x1: int, y1: int, x2: int, y2: int) -> Tuple[int, int]:
+        return (
+            self._region_sum(self.ink, x1, y1, x2, y2),
+            self._region_sum(self.transitions, x1, y1, x2, y2)
+        )
+
+
+class InkPrefilter:
+    def __init__(
+        self,
+        min_ink_ratio: Optional[float] = None,
+        max_stroke_width: Optional[float] = None
+    ):
+        self.min_ink_ratio = min_ink_ratio if min_ink_ratio is not None else settings.ocr_min_ink_ratio
+        self.max_stroke_width = max_stroke_width if max_stroke_width is not None else settings.ocr_max_stroke_width
+        app_logger.info(
+            f"InkPrefilter initialized with min_ink_ratio={self.min_ink_ratio}, "
+            f"max_stroke_width={self.max_stroke_width}"
+        )
+
+    def stats(self, integrals: InkIntegrals, bbox: BoundingBox) -> InkStats:
+        # Центральное окно фигуры: туда не попадают контуры прямоугольников, ромбов и овалов
+        x1 = int(bbox.x1 + bbox.width * 0.25)
+        x2 = int(bbox.x1 + bbox.width * 0.75)
+        y1 = int(bbox.y1 + bbox.height * 0.3)
+        y2 = int(bbox.y1 + bbox.height * 0.7)
+
+        x1 = min(max(0, x1), integrals.width)
+        x2 = min(max(0, x2), integrals.width)
+        y1 = min(max(0, y1), integrals.height)
+        y2 = min(max(0, y2), integrals.height)
+
+        area = (x2 - x1) * (y2 - y1)
+        if area <= 0:
+            return InkStats(0.0, 0.0, False)
+
+        ink, transitions = integrals.region(x1, y1, x2, y2)
+        ink_ratio = ink / area
+        # Средняя длина горизонтального отрезка чернил - оценка толщины штриха
+        runs = max(transitions / 2, 1)
+        mean_stroke_width = ink / runs
+
+        has_text = ink_ratio >= self.min_ink_ratio and mean_stroke_width <= self.max_stroke_width
+        return InkStats(ink_ratio, mean_stroke_width, has_text)
+
+    def select(self, binary: np.ndarray, bboxes: List[BoundingBox]) -> Tuple[List[int], Dict[int, InkStats]]:
+        """Индексы фигур, в которых может быть текст, и статистика по всем фигурам"""
+        integrals = InkIntegrals(binary)
+
+        selected = []
+        all_stats = {}
+        for idx, bbox in enumerate(bboxes):
+            stats = self.stats(integrals, bbox)
+            all_stats[idx] = stats
+            if stats.has_text:
+                selected.append(idx)
+
+        return selected, all_stats
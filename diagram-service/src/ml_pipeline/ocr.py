@@ -1,11 +1,19 @@
+import time
 import numpy as np
 from typing import List, Dict, Any, Optional, Tuple
 import cv2
 
 from src.core.logger import app_logger
 from src.core.config import settings
-from src.core.exceptions import OCRError
+from src.core.exceptions import ModelLoadError
+from src.core.metrics import metrics
 from src.ml_pipeline.detector import BoundingBox
+from src.ml_pipeline.connector_detector import Connector
+from src.ml_pipeline.ink_prefilter import InkPrefilter
+from src.ml_pipeline.ocr_cache import OCRCache
+from src.ml_pipeline.ocr_models import get_model_pool, language_for_script
+from src.ml_pipeline.script_detector import get_script_detector
+from src.utils.spatial_index import GridIndex
 
 
 class OCRResult:
@@ -13,7 +21,7 @@ class OCRResult:
         self.text = text
         self.confidence = confidence
         self.bbox = bbox
-    
+
     def to_dict(self) -> Dict[str, Any]:
         return {
             "text": self.text,
@@ -25,80 +33,385 @@ class OCRResult:
 class TextRecognizer:
     def __init__(self, lang: Optional[str] = None):
         self.lang = lang or settings.paddle_ocr_lang
-        self.use_paddle = False
-        self.ocr = None
-        
-        app_logger.info(f"Initializing TextRecognizer")
-        # Не загружаем PaddleOCR сразу - будем использовать простое извлечение текста
-        app_logger.info("Using simple text extraction (PaddleOCR disabled)")
-    
-    def recognize_in_bboxes(self, image: np.ndarray, bboxes: List[BoundingBox]) -> Dict[int, OCRResult]:
-        """Извлечение текста из bounding boxes"""
+        self.languages = [code.strip() for code in self.lang.split(',') if code.strip()]
+        self.rec_height = settings.ocr_rec_height
+        self.batch_size = settings.ocr_batch_size
+        self.confidence_threshold = settings.ocr_confidence_threshold
+        self.edge_label_distance = settings.ocr_edge_label_distance
+        self.prefilter = InkPrefilter() if settings.ocr_prefilter_enabled else None
+        self.cache = OCRCache()
+
+        # Модели языков общие для всех распознавателей процесса и загружаются лениво
+        self.pool = get_model_pool()
+        self.script_detector = get_script_detector() if len(self.languages) > 1 else None
+
+        app_logger.info(f"Initializing TextRecognizer with languages={self.languages}")
+
+    def recognize_in_bboxes(
+        self,
+        image: np.ndarray,
+        bboxes: List[BoundingBox],
+        binary: Optional[np.ndarray] = None
+    ) -> Dict[int, OCRResult]:
+        """Извлечение текста из bounding boxes одним пакетным вызовом распознавателя"""
         try:
-            results = {}
-            
-            for idx, bbox in enumerate(bboxes):
+            start_time = time.time()
+
+            if not self.pool.is_available():
+                return {}
+
+            candidates = self._select_text_regions(image, bboxes, binary)
+
+            line_images = []
+            line_owners = []
+            box_coords = {}
+
+            for idx in candidates:
+                bbox = bboxes[idx]
                 # Вырезаем область изображения
                 x1, y1 = int(bbox.x1), int(bbox.y1)
                 x2, y2 = int(bbox.x2), int(bbox.y2)
-                
+
                 # Проверяем границы
                 x1 = max(0, x1)
                 y1 = max(0, y1)
                 x2 = min(image.shape[1], x2)
                 y2 = min(image.shape[0], y2)
-                
+
                 if x2 <= x1 or y2 <= y1:
                     continue
-                
-                roi = image[y1:y2, x1:x2]
-                
-                # Простое извлечение текста - используем тип элемента как текст
-                # В реальной системе здесь был бы OCR
-                text = self._extract_text_simple(roi, bbox)
-                
-                if text:
-                    results[idx] = OCRResult(
-                        text=text,
-                        confidence=0.8,
-                        bbox=(x1, y1, x2, y2)
-                    )
-            
-            app_logger.info(f"Extracted text from {len(results)} bounding boxes")
+
+                box_coords[idx] = (x1, y1, x2, y2)
+
+                for line in self._split_lines(image[y1:y2, x1:x2]):
+                    line_images.append(self._normalize_roi(line))
+                    line_owners.append(idx)
+
+            if not line_images:
+                return {}
+
+            recognized = self._recognize_batch(line_images)
+
+            lines_by_box: Dict[int, List[Tuple[str, float]]] = {}
+            for owner, (text, score) in zip(line_owners, recognized):
+                if text and score >= self.confidence_threshold:
+                    lines_by_box.setdefault(owner, []).append((text, score))
+
+            results = {}
+            for idx, lines in lines_by_box.items():
+                results[idx] = OCRResult(
+                    text=' '.join(text for text, _ in lines),
+                    confidence=float(np.mean([score for _, score in lines])),
+                    bbox=box_coords[idx]
+                )
+
+            app_logger.info(
+                f"Extracted text from {len(results)} bounding boxes "
+                f"({len(line_images)} lines in one batch, {time.time() - start_time:.3f}s)"
+            )
             return results
-            
+
         except Exception as e:
             app_logger.error(f"Error in text recognition: {str(e)}", exc_info=True)
             return {}
-    
-    def _extract_text_simple(self, roi: np.ndarray, bbox: BoundingBox) -> str:
-        """Простое извлечение текста - генерируем описание на основе типа элемента"""
-        
-        # Словарь типов элементов
-        type_names = {
-            "start": "Начало",
-            "end": "Конец",
-            "process": "Процесс",
-            "decision": "Условие",
-            "data": "Данные",
-            "subprocess": "Подпроцесс"
-        }
-        
-        element_type = bbox.class_name
-        base_name = type_names.get(element_type, "Элемент")
-        
-        # Генерируем уникальное имя на основе позиции
-        element_id = int(bbox.center_y / 100) * 100 + int(bbox.center_x / 100)
-        
-        return f"{base_name} {element_id}"
-    
+
+    def _select_text_regions(
+        self,
+        image: np.ndarray,
+        bboxes: List[BoundingBox],
+        binary: Optional[np.ndarray]
+    ) -> List[int]:
+        """Отсев пустых и залитых областей до вызова OCR"""
+        if self.prefilter is None or not bboxes:
+            return list(range(len(bboxes)))
+
+        if binary is None:
+            gray = cv2.cvtColor(image, cv2.COLOR_RGB2GRAY) if len(image.shape) == 3 else image
+            binary = cv2.adaptiveThreshold(
+                gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
+                cv2.THRESH_BINARY_INV, 11, 2
+            )
+
+        selected, _ = self.prefilter.select(binary, bboxes)
+        skipped = len(bboxes) - len(selected)
+
+        metrics.increment("ocr_regions_total", len(bboxes))
+        metrics.increment("ocr_regions_skipped", skipped)
+        app_logger.info(f"Ink prefilter skipped {skipped} of {len(bboxes)} regions without text")
+
+        return selected
+
+    def _split_lines(self, roi: np.ndarray) -> List[np.ndarray]:
+        """Разбиение области на строки текста по горизонтальной проекции чернил"""
+        # Отступаем от контура фигуры
+        inset = 3
+        if roi.shape[0] <= inset * 2 or roi.shape[1] <= inset * 2:
+            return []
+        roi = roi[inset:-inset, inset:-inset]
+
+        gray = cv2.cvtColor(roi, cv2.COLOR_RGB2GRAY) if len(roi.shape) == 3 else roi
+        _, ink = cv2.threshold(gray, 0, 1, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+
+        # Строки ищем по центральной части, чтобы скругления и наклонные стороны фигур не давали ложных строк
+        margin = roi.shape[1] // 10
+        row_profile = ink[:, margin:roi.shape[1] - margin].sum(axis=1)
+        has_ink = row_profile > 1
+
+        lines = []
+        start = None
+        for row, filled in enumerate(np.append(has_ink, False)):
+            if filled and start is None:
+                start = row
+            elif not filled and start is not None:
+                if row - start >= 4:
+                    columns = np.nonzero(ink[start:row].any(axis=0))[0]
+                    pad = 2
+                    top = max(0, start - pad)
+                    bottom = min(roi.shape[0], row + pad)
+                    left = max(0, int(columns[0]) - pad)
+                    right = min(roi.shape[1], int(columns[-1]) + 1 + pad)
+                    lines.append(roi[top:bottom, left:right])
+                start = None
+
+        return lines
+
+    def _normalize_roi(self, roi: np.ndarray) -> np.ndarray:
+        """Приведение строки к общей высоте распознавателя (BGR, 3 канала)"""
+        if len(roi.shape) == 2:
+            roi = cv2.cvtColor(roi, cv2.COLOR_GRAY2BGR)
+        else:
+            roi = cv2.cvtColor(roi, cv2.COLOR_RGB2BGR)
+
+        height, width = roi.shape[:2]
+        new_width = max(1, int(round(width * self.rec_height / height)))
+        return cv2.resize(roi, (new_width, self.rec_height), interpolation=cv2.INTER_LINEAR)
+
+    def _recognize_batch(self, line_images: List[np.ndarray]) -> List[Tuple[str, float]]:
+        results: List[Optional[Tuple[str, float]]] = [None] * len(line_images)
+
+        # Одинаковые подписи ("Да", "Нет", "Начало") распознаем один раз - в кадре и между запросами
+        pending: Dict[Tuple, List[int]] = {}
+        for position, roi in enumerate(line_images):
+            key = self.cache.roi_key(roi, self._route(roi))
+            if key in pending:
+                pending[key].append(position)
+                metrics.increment("ocr_cache_batch_duplicates")
+                continue
+
+            cached = self.cache.get(key)
+            if cached is not None:
+                results[position] = cached
+            else:
+                pending[key] = [position]
+
+        # Ключ кэша начинается с языка строки: каждую группу распознает одна модель
+        by_lang: Dict[str, List[Tuple]] = {}
+        for key in pending:
+            by_lang.setdefault(key[0], []).append(key)
+
+        for lang, keys in by_lang.items():
+            rois = [line_images[pending[key][0]] for key in keys]
+            used_lang, recognized = self._recognize_with(lang, rois)
+
+            for key, value in zip(keys, recognized):
+                # Результат запасной модели или пустой ответ не должен закрепиться в кэше
+                if used_lang == lang:
+                    self.cache.put(key, value)
+                for position in pending[key]:
+                    results[position] = value
+
+        app_logger.debug(f"Recognized {len(pending)} of {len(line_images)} lines, rest served from cache")
+        return results
+
+    def _route(self, roi: np.ndarray) -> str:
+        """Язык строки по письменности, определенной по пикселям; без уверенного ответа - основной"""
+        lang = self.languages[0]
+        if self.script_detector is not None:
+            lang = language_for_script(self.script_detector.detect(roi), self.languages) or lang
+        metrics.increment(f"ocr_lines_routed_{lang}")
+        return lang
+
+    def _fallback_chain(self, lang: str) -> List[str]:
+        return [lang] + [code for code in self.languages if code != lang]
+
+    def _recognize_with(self, lang: str, rois: List[np.ndarray]) -> Tuple[Optional[str], List[Tuple[str, float]]]:
+        """Распознавание моделью языка строки; если она не загружается - следующей моделью из списка"""
+        for candidate in self._fallback_chain(lang):
+            try:
+                with self.pool.acquire(candidate) as engine:
+                    if engine is None:
+                        continue
+                    # Распознаватель сам группирует строки по rec_batch_num и сортирует по ширине
+                    rec_res, _ = engine.text_recognizer(rois)
+            except ModelLoadError as e:
+                app_logger.warning(f"OCR model {candidate} unavailable for {len(rois)} lines: {str(e)}")
+                continue
+
+            if candidate != lang:
+                metrics.increment("ocr_language_fallbacks", len(rois))
+            return candidate, [(text.strip(), float(score)) for text, score in rec_res]
+
+        return None, [('', 0.0)] * len(rois)
+
+    def _detect_lines(self, bgr: np.ndarray) -> Optional[np.ndarray]:
+        # Детектор строк не зависит от языка: подойдет любая загружаемая модель
+        for candidate in self._fallback_chain(self.languages[0]):
+            try:
+                with self.pool.acquire(candidate) as engine:
+                    if engine is None:
+                        continue
+                    dt_boxes, _ = engine.text_detector(bgr)
+                    return dt_boxes
+            except ModelLoadError as e:
+                app_logger.warning(f"OCR model {candidate} unavailable for text detection: {str(e)}")
+        return None
+
     def recognize(self, image: np.ndarray) -> List[OCRResult]:
         """Распознавание всего текста на изображении"""
         try:
-            # Простая заглушка - возвращаем пустой список
-            # В реальной системе здесь был бы полный OCR
-            return []
-            
+            return self._recognize_lines(image, self._detect_line_boxes(image))
         except Exception as e:
             app_logger.error(f"Error in OCR: {str(e)}", exc_info=True)
             return []
+
+    def _detect_line_boxes(self, image: np.ndarray) -> List[Tuple[float, float, float, float]]:
+        """Рамки строк текста на всей странице (без распознавания)"""
+        bgr = cv2.cvtColor(image, cv2.COLOR_RGB2BGR) if len(image.shape) == 3 else image
+        dt_boxes = self._detect_lines(bgr)
+        if dt_boxes is None or len(dt_boxes) == 0:
+            return []
+
+        coords = []
+        for points in dt_boxes:
+            x1 = max(0, int(np.floor(points[:, 0].min())))
+            y1 = max(0, int(np.floor(points[:, 1].min())))
+            x2 = min(image.shape[1], int(np.ceil(points[:, 0].max())))
+            y2 = min(image.shape[0], int(np.ceil(points[:, 1].max())))
+            if x2 <= x1 or y2 <= y1:
+                continue
+            coords.append((float(x1), float(y1), float(x2), float(y2)))
+        return coords
+
+    def _recognize_lines(
+        self,
+        image: np.ndarray,
+        coords: List[Tuple[float, float, float, float]]
+    ) -> List[OCRResult]:
+        if not coords:
+            return []
+
+        crops = [
+            self._normalize_roi(image[int(y1):int(y2), int(x1):int(x2)])
+            for x1, y1, x2, y2 in coords
+        ]
+
+        results = []
+        for bbox, (text, score) in zip(coords, self._recognize_batch(crops)):
+            if not text or score < self.confidence_threshold:
+                continue
+            results.append(OCRResult(text=text, confidence=score, bbox=bbox))
+
+        return results
+
+    def recognize_page(
+        self,
+        image: np.ndarray,
+        bboxes: List[BoundingBox],
+        connectors: Optional[List[Connector]] = None,
+        binary: Optional[np.ndarray] = None
+    ) -> Tuple[Dict[int, OCRResult], Dict[int, OCRResult]]:
+        """Одна детекция строк на всей странице и привязка строк к фигурам и соединителям"""
+        start_time = time.time()
+        connectors = connectors or []
+
+        shape_index = GridIndex(self._cell_size(bboxes))
+        for idx, bbox in enumerate(bboxes):
+            shape_index.insert(idx, bbox.x1, bbox.y1, bbox.x2, bbox.y2)
+
+        try:
+            coords = self._detect_line_boxes(image)
+            # Строки внутри фигур, отсеянных префильтром чернил, не распознаются; подписи вне фигур остаются
+            candidates = set(self._select_text_regions(image, bboxes, binary))
+            if len(candidates) < len(bboxes):
+                owners = [self._line_owner(shape_index, bboxes, box) for box in coords]
+                coords = [box for box, owner in zip(coords, owners) if owner is None or owner in candidates]
+            lines = self._recognize_lines(image, coords)
+        except Exception as e:
+            app_logger.error(f"Error in OCR: {str(e)}", exc_info=True)
+            lines = []
+
+        connector_index = GridIndex(max(self.edge_label_distance * 4, 1.0))
+        for idx, connector in enumerate(connectors):
+            connector_index.insert(
+                idx,
+                connector.x1 - self.edge_label_distance,
+                connector.y1 - self.edge_label_distance,
+                connector.x2 + self.edge_label_distance,
+                connector.y2 + self.edge_label_distance
+            )
+
+        shape_lines: Dict[int, List[OCRResult]] = {}
+        edge_lines: Dict[int, List[OCRResult]] = {}
+
+        for line in lines:
+            x1, y1, x2, y2 = line.bbox
+            center_x = (x1 + x2) / 2
+            center_y = (y1 + y2) / 2
+
+            owner = self._line_owner(shape_index, bboxes, line.bbox)
+            if owner is not None:
+                shape_lines.setdefault(owner, []).append(line)
+                continue
+
+            # Иначе это подпись ближайшего соединителя ("Да"/"Нет")
+            best_idx = None
+            best_distance = self.edge_label_distance
+            for idx in connector_index.query_point(center_x, center_y):
+                distance = connectors[idx].distance_to(center_x, center_y)
+                if distance <= best_distance:
+                    best_idx = idx
+                    best_distance = distance
+            if best_idx is not None:
+                edge_lines.setdefault(best_idx, []).append(line)
+
+        texts = {idx: self._merge_lines(group) for idx, group in shape_lines.items()}
+        edge_texts = {idx: self._merge_lines(group) for idx, group in edge_lines.items()}
+
+        app_logger.info(
+            f"Assigned {len(lines)} text lines to {len(texts)} shapes and "
+            f"{len(edge_texts)} connectors in {time.time() - start_time:.3f}s"
+        )
+        return texts, edge_texts
+
+    def _line_owner(
+        self,
+        shape_index: GridIndex,
+        bboxes: List[BoundingBox],
+        line_bbox: Tuple[float, float, float, float]
+    ) -> Optional[int]:
+        # Строка принадлежит наименьшей фигуре, содержащей ее центр
+        x1, y1, x2, y2 = line_bbox
+        containing = shape_index.query_point((x1 + x2) / 2, (y1 + y2) / 2)
+        if not containing:
+            return None
+        return min(containing, key=lambda idx: bboxes[idx].area)
+
+    def _cell_size(self, bboxes: List[BoundingBox]) -> float:
+        if not bboxes:
+            return 100.0
+        sizes = sorted(max(b.width, b.height) for b in bboxes)
+        return max(sizes[len(sizes) // 2], 1.0)
+
+    def _merge_lines(self, lines: List[OCRResult]) -> OCRResult:
+        # Порядок чтения: сверху вниз, слева направо
+        ordered = sorted(lines, key=lambda line: (line.bbox[1], line.bbox[0]))
+        return OCRResult(
+            text=' '.join(line.text for line in ordered),
+            confidence=float(np.mean([line.confidence for line in ordered])),
+            bbox=(
+                min(line.bbox[0] for line in ordered),
+                min(line.bbox[1] for line in ordered),
+                max(line.bbox[2] for line in ordered),
+                max(line.bbox[3] for line in ordered)
+            )
+        )
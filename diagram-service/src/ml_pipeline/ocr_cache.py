@@ -0,0 +1,73 @@
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple
+import numpy as np
+import cv2
+
+from src.core.logger import app_logger
+from src.core.config import settings
+from src.core.metrics import metrics
+
+
+class OCRCache:
+    """LRU-кэш результатов распознавания по перцептивному хэшу строки"""
+
+    def __init__(self, max_size: Optional[int] = None, hash_height: int = 12):
+        self.max_size = max_size if max_size is not None else settings.ocr_cache_size
+        self.hash_height = hash_height
+        self._entries: "OrderedDict[Tuple, Tuple[str, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        app_logger.info(f"OCRCache initialized with max_size={self.max_size}")
+
+    def roi_key(self, roi: np.ndarray, lang: str) -> Tuple:
+        """dHash нормализованной строки; ширина хэша зависит от пропорций, чтобы разные по длине подписи не совпадали"""
+        gray = cv2.cvtColor(roi, cv2.COLOR_BGR2GRAY) if len(roi.shape) == 3 else roi
+        height, width = gray.shape[:2]
+        hash_width = int(min(96, max(8, round(width / height * self.hash_height))))
+
+        small = cv2.resize(gray, (hash_width + 1, self.hash_height), interpolation=cv2.INTER_AREA)
+        bits = small[:, 1:] > small[:, :-1]
+        return (lang, hash_width, np.packbits(bits).tobytes())
+
+    def get(self, key: Tuple) -> Optional[Tuple[str, float]]:
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self._misses += 1
+            else:
+                self._entries.move_to_end(key)
+                self._hits += 1
+        self._report(hit=value is not None)
+        return value
+
+    def put(self, key: Tuple, value: Tuple[str, float]) -> None:
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+            size = len(self._entries)
+        metrics.set_gauge("ocr_cache_size", size)
+
+    def _report(self, hit: bool) -> None:
+        metrics.increment("ocr_cache_hits" if hit else "ocr_cache_misses")
+        metrics.set_gauge("ocr_cache_hit_rate", self.hit_rate)
+
+    @property
+    def hit_rate(self) -> float:
+        total = self._hits + self._misses
+        return self._hits / total if total else 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": self.hit_rate
+            }
@@ -0,0 +1,189 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from src.core.logger import app_logger
+from src.core.config import settings
+from src.core.exceptions import ModelLoadError
+from src.core.metrics import metrics
+
+
+SCRIPT_LANGUAGES = {
+    'cyrillic': ['ru', 'uk', 'be', 'bg', 'sr', 'mn', 'cyrillic'],
+    'latin': ['en', 'latin', 'fr', 'de', 'es', 'it', 'pt'],
+}
+
+
+def language_for_script(script: Optional[str], languages: List[str]) -> Optional[str]:
+    for lang in languages:
+        if lang in SCRIPT_LANGUAGES.get(script, ()):
+            return lang
+    return None
+
+
+def _current_rss_mb() -> Optional[float]:
+    try:
+        with open('/proc/self/statm') as statm:
+            pages = int(statm.read().split()[1])
+        return pages * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def _load_paddle_model(lang: str):
+    from paddleocr import PaddleOCR
+
+    return PaddleOCR(
+        lang=lang,
+        use_angle_cls=False,
+        use_gpu=settings.device == "cuda",
+        rec_batch_num=settings.ocr_batch_size,
+        show_log=False
+    )
+
+
+class _PooledModel:
+    def __init__(self, lang: str, engine: Any, memory_mb: float):
+        self.lang = lang
+        self.engine = engine
+        self.memory_mb = memory_mb
+        self.in_use = 0
+        # Предикторы Paddle не потокобезопасны - вызовы одной модели сериализуем
+        self.inference_lock = threading.Lock()
+
+
+class OCRModelPool:
+    """Пул языковых моделей OCR: ленивая загрузка, общий доступ из потоков, LRU-вытеснение по памяти"""
+
+    def __init__(
+        self,
+        memory_budget_mb: Optional[float] = None,
+        loader: Optional[Callable[[str], Any]] = None
+    ):
+        self.memory_budget_mb = memory_budget_mb if memory_budget_mb is not None else settings.ocr_model_memory_budget_mb
+        self.memory_estimate_mb = settings.ocr_model_memory_estimate_mb
+        self._loader = loader or _load_paddle_model
+        self._models: "OrderedDict[str, _PooledModel]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._load_locks: Dict[str, threading.Lock] = {}
+        self._failed_languages = set()
+        self._available: Optional[bool] = None if loader is None else True
+        app_logger.info(f"OCRModelPool initialized with memory_budget_mb={self.memory_budget_mb}")
+
+    def is_available(self) -> bool:
+        if self._available is None:
+            try:
+                import paddleocr  # noqa: F401
+                self._available = True
+            except ImportError:
+                app_logger.warning("paddleocr not available, text recognition disabled")
+                self._available = False
+        return self._available
+
+    @contextmanager
+    def acquire(self, lang: str) -> Iterator[Any]:
+        """Выдает модель языка для одного вызова; пока модель занята, она не вытесняется"""
+        entry = self._checkout(lang)
+        if entry is None:
+            yield None
+            return
+
+        try:
+            with entry.inference_lock:
+                yield entry.engine
+        finally:
+            with self._lock:
+                entry.in_use -= 1
+                # Модели, которые не удалось вытеснить, пока они были заняты
+                self._evict(0, keep=lang)
+                self._report()
+
+    def _checkout(self, lang: str) -> Optional[_PooledModel]:
+        if not self.is_available() or lang in self._failed_languages:
+            return None
+
+        with self._lock:
+            entry = self._models.get(lang)
+            if entry is not None:
+                entry.in_use += 1
+                self._models.move_to_end(lang)
+                return entry
+            load_lock = self._load_locks.setdefault(lang, threading.Lock())
+
+        # Загружаем вне общей блокировки: другие языки в это время продолжают работать
+        with load_lock:
+            with self._lock:
+                entry = self._models.get(lang)
+                if entry is not None:
+                    entry.in_use += 1
+                    self._models.move_to_end(lang)
+                    return entry
+                self._evict(self.memory_estimate_mb)
+
+            entry = self._load(lang)
+            if entry is None:
+                return None
+
+            with self._lock:
+                entry.in_use += 1
+                self._models[lang] = entry
+                self._evict(0, keep=lang)
+                self._report()
+            return entry
+
+    def _load(self, lang: str) -> Optional[_PooledModel]:
+        rss_before = _current_rss_mb()
+        start_time = time.time()
+        try:
+            app_logger.info(f"Loading OCR model for language: {lang}")
+            engine = self._loader(lang)
+        except Exception as e:
+            self._failed_languages.add(lang)
+            app_logger.error(f"Failed to load OCR model for {lang}: {str(e)}")
+            raise ModelLoadError(f"Failed to load OCR model for {lang}: {str(e)}")
+
+        rss_after = _current_rss_mb()
+        memory_mb = self.memory_estimate_mb
+        if rss_before is not None and rss_after is not None and rss_after > rss_before:
+            memory_mb = rss_after - rss_before
+
+        metrics.increment("ocr_model_loads")
+        app_logger.info(f"Loaded OCR model {lang} in {time.time() - start_time:.2f}s (~{memory_mb:.0f} MB)")
+        return _PooledModel(lang, engine, memory_mb)
+
+    def _evict(self, needed_mb: float, keep: Optional[str] = None) -> None:
+        # Вызывается под self._lock
+        total = sum(entry.memory_mb for entry in self._models.values())
+        for lang in list(self._models.keys()):
+            if total + needed_mb <= self.memory_budget_mb:
+                break
+            entry = self._models[lang]
+            if lang == keep or entry.in_use > 0:
+                continue
+            del self._models[lang]
+            total -= entry.memory_mb
+            metrics.increment("ocr_model_evictions")
+            app_logger.info(f"Evicted OCR model {lang} to stay within {self.memory_budget_mb} MB")
+
+    def _report(self) -> None:
+        metrics.set_gauge("ocr_models_loaded", len(self._models))
+        metrics.set_gauge("ocr_models_memory_mb", sum(entry.memory_mb for entry in self._models.values()))
+
+    def loaded_languages(self) -> List[str]:
+        with self._lock:
+            return list(self._models.keys())
+
+
+_default_pool: Optional[OCRModelPool] = None
+_default_pool_lock = threading.Lock()
+
+
+def get_model_pool() -> OCRModelPool:
+    global _default_pool
+    with _default_pool_lock:
+        if _default_pool is None:
+            _default_pool = OCRModelPool()
+        return _default_pool
@@ -0,0 +1,143 @@
+import threading
+from typing import List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from src.core.logger import app_logger
+
+
+SCRIPT_ALPHABETS = {
+    'cyrillic': "абвгдежзийклмнопрстуфхцчшщъыьэюяАБВГДЕЖЗИЙКЛМНОПРСТУФХЦЧШЩЪЫЬЭЮЯ",
+    'latin': "abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ",
+}
+TEMPLATE_FONTS = ['DejaVu Sans', 'DejaVu Serif']
+
+
+class ScriptDetector:
+    """Определение письменности строки по пикселям до распознавания: глифы сравниваются с шаблонами букв"""
+
+    def __init__(
+        self,
+        glyph_size: int = 16,
+        min_similarity: float = 0.75,
+        min_margin: float = 0.05,
+        shared_similarity: float = 0.85
+    ):
+        self.glyph_size = glyph_size
+        self.min_similarity = min_similarity
+        self.min_margin = min_margin
+        self.shared_similarity = shared_similarity
+        self.scripts = list(SCRIPT_ALPHABETS.keys())
+        self._templates, self._template_scripts = self._build_templates()
+
+    def detect(self, roi: np.ndarray) -> Optional[str]:
+        """Письменность строки или None, если голосов различающих букв недостаточно"""
+        if self._templates is None:
+            return None
+
+        gray = cv2.cvtColor(roi, cv2.COLOR_BGR2GRAY) if len(roi.shape) == 3 else roi
+        _, ink = cv2.threshold(gray, 0, 1, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+        count, labels, stats, _ = cv2.connectedComponentsWithStats(ink, connectivity=8)
+        if count <= 1:
+            return None
+
+        # Точки, знаки препинания и шум не голосуют
+        min_height = 0.3 * stats[1:, cv2.CC_STAT_HEIGHT].max()
+        glyphs = []
+        for label in range(1, count):
+            x, y, width, height, area = stats[label]
+            if height < min_height or area < 6:
+                continue
+            glyphs.append(self._glyph_vector(labels[y:y + height, x:x + width] == label))
+        if not glyphs:
+            return None
+
+        votes = [0] * len(self.scripts)
+        similarity = np.stack(glyphs) @ self._templates.T
+        for row in similarity:
+            best = int(row.argmax())
+            script = self._template_scripts[best]
+            # Общие для письменностей начертания (о, с, Т, Н...) не голосуют
+            if script < 0 or row[best] < self.min_similarity:
+                continue
+            if row[best] - row[self._template_scripts != script].max() < self.min_margin:
+                continue
+            votes[script] += 1
+
+        winner = int(np.argmax(votes))
+        runner_up = max(votes[:winner] + votes[winner + 1:], default=0)
+        if votes[winner] == 0 or votes[winner] < 2 * runner_up:
+            return None
+        return self.scripts[winner]
+
+    def _glyph_vector(self, mask: np.ndarray) -> np.ndarray:
+        # Вписываем глиф в квадрат с сохранением пропорций, чтобы "l" и "о" не растягивались в одно
+        height, width = mask.shape
+        side = max(height, width)
+        canvas = np.zeros((side, side), dtype=np.float32)
+        top = (side - height) // 2
+        left = (side - width) // 2
+        canvas[top:top + height, left:left + width] = mask
+        vector = cv2.resize(canvas, (self.glyph_size, self.glyph_size), interpolation=cv2.INTER_AREA).ravel()
+        vector -= vector.mean()
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+
+    def _build_templates(self) -> Tuple[Optional[np.ndarray], Optional[np.ndarray]]:
+        try:
+            from matplotlib import font_manager
+            from PIL import Image, ImageDraw, ImageFont
+        except ImportError:
+            app_logger.warning("matplotlib/Pillow not available, script detection by pixels disabled")
+            return None, None
+
+        vectors: List[np.ndarray] = []
+        scripts: List[int] = []
+        for family in TEMPLATE_FONTS:
+            try:
+                font = ImageFont.truetype(font_manager.findfont(family, fallback_to_default=False), 40)
+            except (OSError, ValueError) as e:
+                app_logger.warning(f"Template font {family} not found: {str(e)}")
+                continue
+
+            for script, alphabet in enumerate(SCRIPT_ALPHABETS.values()):
+                for char in alphabet:
+                    image = Image.new('L', (80, 80), 0)
+                    ImageDraw.Draw(image).text((10, 10), char, font=font, fill=255)
+                    ink = (np.array(image) > 127).astype(np.uint8)
+                    count, labels, stats, _ = cv2.connectedComponentsWithStats(ink, connectivity=8)
+                    if count <= 1:
+                        continue
+                    # Основной штрих буквы, без точек и бреве - как компоненты строки
+                    label = 1 + int(np.argmax(stats[1:, cv2.CC_STAT_AREA]))
+                    x, y, width, height = stats[label, :4]
+                    vectors.append(self._glyph_vector(labels[y:y + height, x:x + width] == label))
+                    scripts.append(script)
+
+        if not vectors:
+            return None, None
+
+        templates = np.stack(vectors)
+        template_scripts = np.array(scripts)
+        # Буквы, похожие на букву другой письменности (а/a, Р/P, п/n), помечаем общими
+        similarity = templates @ templates.T
+        shared = [
+            similarity[index][template_scripts != template_scripts[index]].max() >= self.shared_similarity
+            for index in range(len(templates))
+        ]
+        template_scripts[shared] = -1
+        app_logger.info(f"ScriptDetector built {len(templates)} glyph templates ({int(np.sum(shared))} shared)")
+        return templates, template_scripts
+
+
+_default_detector: Optional[ScriptDetector] = None
+_default_detector_lock = threading.Lock()
+
+
+def get_script_detector() -> ScriptDetector:
+    global _default_detector
+    with _default_detector_lock:
+        if _default_detector is None:
+            _default_detector = ScriptDetector()
+        return _default_detector
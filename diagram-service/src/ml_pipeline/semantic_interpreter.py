@@ -1,8 +1,12 @@
-import networkx as nx
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional, Tuple
+import numpy as np
 
 from src.core.logger import app_logger
-from src.utils.graph_utils import get_node_successors, get_node_predecessors, calculate_node_levels
+from src.utils.graph_utils import get_node_successors, calculate_node_levels
+from src.utils.keyword_matcher import get_keyword_matcher
+from src.utils.graph_algorithms import analyze_cycles
+from src.utils.compact_graph import CompactGraph
+from src.utils.analysis_context import AnalysisContext
 
 
 class SemanticInterpreter:
@@ -16,125 +20,130 @@ class SemanticInterpreter:
             'process': ['обработка', 'process', 'действие', 'action', 'выполнить', 'execute'],
             'data': ['данные', 'data', 'ввод', 'input', 'вывод', 'output']
         }
+        self.keyword_matcher = get_keyword_matcher(self.shape_keywords)
     
-    def interpret(self, graph: nx.DiGraph) -> Dict[str, Any]:
+    def analyze(self, graph: CompactGraph) -> AnalysisContext:
+        """Интерпретация графа; результат - общий контекст для шаблонов, генератора кода и форматтера"""
         try:
             app_logger.debug(f"Interpreting graph with {graph.number_of_nodes()} nodes")
             
-            self._classify_node_types(graph)
+            levels = calculate_node_levels(graph)
             
-            self._analyze_flow(graph)
+            if isinstance(graph, CompactGraph):
+                nodes_info, edges_info = self._interpret_columns(graph, levels)
+            else:
+                nodes_info, edges_info = self._interpret_nodes(graph, levels)
             
-            self._extract_logic(graph)
-            
-            interpretation = {
-                'nodes': self._extract_nodes_info(graph),
-                'edges': self._extract_edges_info(graph),
-                'flow_type': self._determine_flow_type(graph),
-                'complexity': self._calculate_complexity(graph)
-            }
+            context = AnalysisContext(nodes_info, edges_info, levels, analyze_cycles(graph))
             
             app_logger.info("Graph interpretation complete")
-            return interpretation
+            return context
             
         except Exception as e:
             app_logger.error(f"Semantic interpretation failed: {str(e)}", exc_info=True)
-            return {'nodes': [], 'edges': [], 'flow_type': 'unknown', 'complexity': 0}
+            return AnalysisContext.from_graph(graph, flow_type='unknown')
+    
+    def interpret(self, graph: CompactGraph) -> Dict[str, Any]:
+        return self.analyze(graph).to_interpretation()
     
-    def _classify_node_types(self, graph: nx.DiGraph):
+    def _interpret_nodes(
+        self,
+        graph: CompactGraph,
+        levels: Dict[str, int]
+    ) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """Один проход по узлам: тип, уровень, степени, условия ветвлений, описания узлов и ребер"""
+        nodes_info = []
+        edges_info = []
+        
         for node in graph.nodes():
-            label = graph.nodes[node].get('label', '').lower()
-            current_type = graph.nodes[node].get('type', 'process')
+            attributes = graph.nodes[node]
+            current_type = attributes.get('type', 'process')
+            successors = get_node_successors(graph, node)
             
-            for node_type, keywords in self.shape_keywords.items():
-                if any(keyword in label for keyword in keywords):
-                    graph.nodes[node]['type'] = node_type
-                    app_logger.debug(f"Classified {node} as {node_type} based on label")
-                    break
+            # Тип по ключевым словам подписи, затем по ветвлению (от исходного типа узла)
+            keyword_type = self.keyword_matcher.match(attributes.get('label', '').lower())
+            if keyword_type is not None:
+                attributes['type'] = keyword_type
+                app_logger.debug(f"Classified {node} as {keyword_type} based on label")
             
-            successors = get_node_successors(graph, node)
             if len(successors) > 1 and current_type != 'decision':
-                graph.nodes[node]['type'] = 'decision'
+                attributes['type'] = 'decision'
                 app_logger.debug(f"Classified {node} as decision based on branching")
-    
-    def _analyze_flow(self, graph: nx.DiGraph):
-        levels = calculate_node_levels(graph)
-        
-        for node in graph.nodes():
-            graph.nodes[node]['level'] = levels.get(node, 0)
-        
-        for node in graph.nodes():
-            successors = get_node_successors(graph, node)
-            predecessors = get_node_predecessors(graph, node)
             
-            graph.nodes[node]['out_degree'] = len(successors)
-            graph.nodes[node]['in_degree'] = len(predecessors)
-    
-    def _extract_logic(self, graph: nx.DiGraph):
-        for node in graph.nodes():
-            node_type = graph.nodes[node].get('type', 'process')
+            attributes['level'] = levels.get(node, 0)
+            attributes['out_degree'] = len(successors)
+            attributes['in_degree'] = graph.in_degree(node)
             
-            if node_type == 'decision':
-                successors = get_node_successors(graph, node)
-                if len(successors) == 2:
-                    graph.edges[node, successors[0]]['condition'] = 'true'
-                    graph.edges[node, successors[1]]['condition'] = 'false'
-    
-    def _extract_nodes_info(self, graph: nx.DiGraph) -> List[Dict[str, Any]]:
-        nodes_info = []
-        for node in graph.nodes():
-            node_data = dict(graph.nodes[node])
+            if attributes.get('type', 'process') == 'decision' and len(successors) == 2:
+                graph.edges[node, successors[0]]['condition'] = 'true'
+                graph.edges[node, successors[1]]['condition'] = 'false'
+            
+            node_data = dict(attributes)
             node_data['id'] = node
             nodes_info.append(node_data)
-        return nodes_info
-    
-    def _extract_edges_info(self, graph: nx.DiGraph) -> List[Dict[str, Any]]:
-        edges_info = []
-        for source, target in graph.edges():
-            edge_data = dict(graph.edges[source, target])
-            edge_data['source'] = source
-            edge_data['target'] = target
-            edges_info.append(edge_data)
-        return edges_info
+            
+            # Ребра узла в порядке graph.edges(): по источникам, затем в порядке добавления
+            for successor in successors:
+                edge_data = dict(graph.edges[node, successor])
+                edge_data['source'] = node
+                edge_data['target'] = successor
+                edges_info.append(edge_data)
+        
+        return nodes_info, edges_info
     
-    def _determine_flow_type(self, graph: nx.DiGraph) -> str:
-        has_cycles = False
-        try:
-            cycles = list(nx.simple_cycles(graph))
-            has_cycles = len(cycles) > 0
-        except:
-            pass
+    def _interpret_columns(
+        self,
+        graph: CompactGraph,
+        levels: Dict[str, int]
+    ) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """То же, что _interpret_nodes, но по столбцам CompactGraph без обращения к узлам по одному"""
+        node_ids = list(graph.nodes())
+        out_indptr, _, out_edge_ids = graph.out_csr()
+        out_degrees = np.diff(out_indptr).tolist()
+        in_degrees = np.diff(graph.in_csr()[0]).tolist()
+        out_indptr = out_indptr.tolist()
+        out_edge_ids = out_edge_ids.tolist()
         
-        has_branches = any(
-            len(get_node_successors(graph, node)) > 1
-            for node in graph.nodes()
-        )
+        original_types = graph.node_values('type', 'process')
+        types = list(original_types)
         
-        if has_cycles:
-            return 'cyclic'
-        elif has_branches:
-            return 'branching'
-        else:
-            return 'sequential'
-    
-    def _calculate_complexity(self, graph: nx.DiGraph) -> int:
-        num_nodes = graph.number_of_nodes()
-        num_edges = graph.number_of_edges()
-        num_decisions = sum(
-            1 for node in graph.nodes()
-            if graph.nodes[node].get('type') == 'decision'
-        )
+        for idx, label in enumerate(graph.node_values('label', '')):
+            keyword_type = self.keyword_matcher.match(label.lower())
+            if keyword_type is not None:
+                types[idx] = keyword_type
+            
+            if out_degrees[idx] > 1 and original_types[idx] != 'decision':
+                types[idx] = 'decision'
+            
+            if types[idx] == 'decision' and out_degrees[idx] == 2:
+                first = out_indptr[idx]
+                graph.set_edge_value(out_edge_ids[first], 'condition', 'true')
+                graph.set_edge_value(out_edge_ids[first + 1], 'condition', 'false')
+        
+        graph.set_node_values('type', types)
+        graph.set_node_values('level', [levels.get(node, 0) for node in node_ids])
+        graph.set_node_values('out_degree', out_degrees)
+        graph.set_node_values('in_degree', in_degrees)
+        
+        nodes_info = graph.node_rows()
+        for node, node_data in zip(node_ids, nodes_info):
+            node_data['id'] = node
         
-        complexity = num_nodes + num_edges + (num_decisions * 2)
-        return complexity
+        edges_info = graph.edge_rows()
+        for (source, target), edge_data in zip(graph.edges(), edges_info):
+            edge_data['source'] = source
+            edge_data['target'] = target
+        
+        return nodes_info, edges_info
     
-    def generate_description(self, graph: nx.DiGraph) -> str:
+    def generate_description(self, graph: CompactGraph, context: Optional[AnalysisContext] = None) -> str:
         try:
-            interpretation = self.interpret(graph)
+            if context is None:
+                context = self.analyze(graph)
             
             description_parts = []
             
-            flow_type = interpretation['flow_type']
+            flow_type = context.flow_type
             if flow_type == 'sequential':
                 description_parts.append("Алгоритм выполняется последовательно.")
             elif flow_type == 'branching':
@@ -142,10 +151,7 @@ class SemanticInterpreter:
             elif flow_type == 'cyclic':
                 description_parts.append("Алгоритм содержит циклы.")
             
-            nodes = interpretation['nodes']
-            sorted_nodes = sorted(nodes, key=lambda n: n.get('level', 0))
-            
-            for node in sorted_nodes:
+            for node in context.ordered_nodes:
                 node_type = node.get('type', 'process')
                 label = node.get('label', '')
                 
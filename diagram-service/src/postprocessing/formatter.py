@@ -1,10 +1,11 @@
 import base64
 import time
 from typing import Dict, Any, Optional
-import networkx as nx
 
 from src.core.logger import app_logger
 from src.api.models.responses import UnifiedResponse, GraphRepresentation, Artifacts, NodeRepresentation, EdgeRepresentation
+from src.utils.compact_graph import CompactGraph
+from src.utils.analysis_context import AnalysisContext
 
 
 class ResponseFormatter:
@@ -13,13 +14,14 @@ class ResponseFormatter:
     
     def format_analyze_response(
         self,
-        graph: nx.DiGraph,
+        graph: CompactGraph,
         description: str,
         processing_time: float,
-        metadata: Optional[Dict[str, Any]] = None
+        metadata: Optional[Dict[str, Any]] = None,
+        context: Optional[AnalysisContext] = None
     ) -> UnifiedResponse:
         try:
-            graph_repr = self._graph_to_representation(graph)
+            graph_repr = self._graph_to_representation(graph, context)
             
             response = UnifiedResponse(
                 task_type="image_to_text",
@@ -39,15 +41,16 @@ class ResponseFormatter:
     
     def format_generate_response(
         self,
-        graph: nx.DiGraph,
+        graph: CompactGraph,
         description: str,
         diagram_image: Optional[bytes] = None,
         diagram_code: Optional[str] = None,
         processing_time: float = 0.0,
-        metadata: Optional[Dict[str, Any]] = None
+        metadata: Optional[Dict[str, Any]] = None,
+        context: Optional[AnalysisContext] = None
     ) -> UnifiedResponse:
         try:
-            graph_repr = self._graph_to_representation(graph)
+            graph_repr = self._graph_to_representation(graph, context)
             
             artifacts = Artifacts()
             
@@ -75,29 +78,32 @@ class ResponseFormatter:
             app_logger.error(f"Failed to format generate response: {str(e)}")
             raise
     
-    def _graph_to_representation(self, graph: nx.DiGraph) -> GraphRepresentation:
-        nodes = []
-        for node_id in graph.nodes():
-            node_data = graph.nodes[node_id]
-            
-            node_repr = NodeRepresentation(
-                id=node_id,
+    def _graph_to_representation(
+        self,
+        graph: CompactGraph,
+        context: Optional[AnalysisContext] = None
+    ) -> GraphRepresentation:
+        if context is None:
+            context = AnalysisContext.from_graph(graph)
+        
+        nodes = [
+            NodeRepresentation(
+                id=node_data['id'],
                 type=node_data.get('type', 'process'),
                 label=node_data.get('label', ''),
                 position=node_data.get('position', None)
             )
-            nodes.append(node_repr)
+            for node_data in context.nodes
+        ]
         
-        edges = []
-        for source, target in graph.edges():
-            edge_data = graph.edges[source, target]
-            
-            edge_repr = EdgeRepresentation(
-                source=source,
-                target=target,
+        edges = [
+            EdgeRepresentation(
+                source=edge_data['source'],
+                target=edge_data['target'],
                 label=edge_data.get('label', None)
             )
-            edges.append(edge_repr)
+            for edge_data in context.edges
+        ]
         
         return GraphRepresentation(nodes=nodes, edges=edges)
     
@@ -110,10 +116,11 @@ class ResponseFormatter:
         detected_elements = []
         
         for idx, bbox in enumerate(bboxes):
+            text_obj = texts.get(idx, "")
             element = {
                 "id": idx,
                 "bbox": bbox.to_dict() if hasattr(bbox, 'to_dict') else bbox,
-                "text": texts.get(idx, "")
+                "text": text_obj.text if hasattr(text_obj, 'text') else text_obj
             }
             detected_elements.append(element)
         
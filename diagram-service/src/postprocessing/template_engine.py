@@ -1,10 +1,11 @@
 from jinja2 import Environment, FileSystemLoader, Template
 from pathlib import Path
-import networkx as nx
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 
 from src.core.logger import app_logger
 from src.core.config import settings
+from src.utils.compact_graph import CompactGraph
+from src.utils.analysis_context import AnalysisContext
 
 
 class TemplateEngine:
@@ -23,9 +24,9 @@ class TemplateEngine:
             app_logger.warning(f"Failed to load templates from {self.template_dir}: {str(e)}")
             self.env = None
     
-    def render_description(self, graph: nx.DiGraph) -> str:
+    def render_description(self, graph: CompactGraph, analysis: Optional[AnalysisContext] = None) -> str:
         try:
-            context = self._prepare_graph_context(graph)
+            context = self._prepare_graph_context(graph, analysis)
             
             if self.env:
                 try:
@@ -43,32 +44,34 @@ class TemplateEngine:
             app_logger.error(f"Description rendering failed: {str(e)}")
             return "Не удалось сгенерировать описание алгоритма."
     
-    def _prepare_graph_context(self, graph: nx.DiGraph) -> Dict[str, Any]:
-        nodes_data = []
-        for node in graph.nodes():
-            node_info = {
-                'id': node,
-                'type': graph.nodes[node].get('type', 'process'),
-                'label': graph.nodes[node].get('label', ''),
-                'level': graph.nodes[node].get('level', 0)
+    def _prepare_graph_context(self, graph: CompactGraph, analysis: Optional[AnalysisContext] = None) -> Dict[str, Any]:
+        # Узлы, ребра и слои берутся из общего контекста запроса; без него контекст строится по графу
+        if analysis is None:
+            analysis = AnalysisContext.from_graph(graph)
+        
+        def node_info(node: Dict[str, Any]) -> Dict[str, Any]:
+            return {
+                'id': node['id'],
+                'type': node.get('type', 'process'),
+                'label': node.get('label', ''),
+                'level': analysis.levels.get(node['id'], 0)
             }
-            nodes_data.append(node_info)
         
-        nodes_data.sort(key=lambda n: n['level'])
+        nodes_data = [node_info(node) for node in analysis.ordered_nodes]
         
-        edges_data = []
-        for source, target in graph.edges():
-            edge_info = {
-                'source': source,
-                'target': target,
-                'label': graph.edges[source, target].get('label', '')
+        edges_data = [
+            {
+                'source': edge['source'],
+                'target': edge['target'],
+                'label': edge.get('label', '')
             }
-            edges_data.append(edge_info)
+            for edge in analysis.edges
+        ]
         
-        start_nodes = [n for n in nodes_data if n['type'] == 'start']
-        end_nodes = [n for n in nodes_data if n['type'] == 'end']
-        decision_nodes = [n for n in nodes_data if n['type'] == 'decision']
-        process_nodes = [n for n in nodes_data if n['type'] == 'process']
+        start_nodes = [node_info(node) for node in analysis.nodes_of_type('start')]
+        end_nodes = [node_info(node) for node in analysis.nodes_of_type('end')]
+        decision_nodes = [node_info(node) for node in analysis.nodes_of_type('decision')]
+        process_nodes = [node_info(node) for node in analysis.nodes_of_type('process')]
         
         return {
             'nodes': nodes_data,
@@ -0,0 +1,82 @@
+from typing import Any, Dict, List, Optional
+
+from src.utils.compact_graph import CompactGraph
+from src.utils.graph_algorithms import CycleInfo, analyze_cycles, node_levels
+
+
+class AnalysisContext:
+    """Результаты разбора графа, собранные один раз на запрос.
+
+    Интерпретатор, шаблоны, генератор кода и форматтер ответа читают узлы, ребра,
+    смежность и уровни отсюда, а не обходят граф каждый заново.
+    """
+
+    def __init__(
+        self,
+        nodes: List[Dict[str, Any]],
+        edges: List[Dict[str, Any]],
+        levels: Dict[Any, int],
+        cycles: CycleInfo,
+        flow_type: Optional[str] = None
+    ):
+        # nodes - в порядке узлов графа, edges - в порядке graph.edges(); у каждого есть id / source, target
+        self.nodes = nodes
+        self.edges = edges
+        self.levels = levels
+        self.cycles = cycles
+
+        self.node_by_id = {node['id']: node for node in nodes}
+        self.successors: Dict[Any, List[Any]] = {node['id']: [] for node in nodes}
+        for edge in edges:
+            self.successors[edge['source']].append(edge['target'])
+
+        self.ordered_nodes = sorted(nodes, key=lambda node: levels.get(node['id'], 0))
+        self.nodes_by_type: Dict[str, List[Dict[str, Any]]] = {}
+        for node in self.ordered_nodes:
+            self.nodes_by_type.setdefault(node.get('type', 'process'), []).append(node)
+
+        self.has_branches = any(len(targets) > 1 for targets in self.successors.values())
+        self._flow_type = flow_type
+
+    @classmethod
+    def from_graph(cls, graph: CompactGraph, flow_type: Optional[str] = None) -> "AnalysisContext":
+        """Контекст по текущим атрибутам графа, без семантической интерпретации"""
+        if isinstance(graph, CompactGraph):
+            nodes = graph.node_rows()
+            for node_id, node in zip(graph.nodes(), nodes):
+                node['id'] = node_id
+            edges = graph.edge_rows()
+            for (source, target), edge in zip(graph.edges(), edges):
+                edge['source'] = source
+                edge['target'] = target
+        else:
+            nodes = [dict(graph.nodes[node], id=node) for node in graph.nodes()]
+            edges = [dict(graph.edges[source, target], source=source, target=target) for source, target in graph.edges()]
+
+        return cls(nodes, edges, node_levels(graph), analyze_cycles(graph), flow_type)
+
+    def nodes_of_type(self, node_type: str) -> List[Dict[str, Any]]:
+        """Узлы типа в порядке уровней"""
+        return self.nodes_by_type.get(node_type, [])
+
+    @property
+    def flow_type(self) -> str:
+        if self._flow_type is not None:
+            return self._flow_type
+        if self.cycles.has_cycles:
+            return 'cyclic'
+        if self.has_branches:
+            return 'branching'
+        return 'sequential'
+
+    @property
+    def complexity(self) -> int:
+        return len(self.nodes) + len(self.edges) + len(self.nodes_of_type('decision')) * 2
+
+    def to_interpretation(self) -> Dict[str, Any]:
+        return {
+            'nodes': self.nodes,
+            'edges': self.edges,
+            'flow_type': self.flow_type,
+            'complexity': self.complexity
+        }
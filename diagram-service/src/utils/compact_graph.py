@@ -0,0 +1,739 @@
+import threading
+from collections.abc import Mapping, MutableMapping
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import networkx as nx
+import numpy as np
+
+
+_MISSING = object()
+_INT_MISSING = np.iinfo(np.int32).min
+_INT_MAX = np.iinfo(np.int32).max
+
+
+# Таблицы общие для всех графов процесса, поэтому ограничены: коды хранятся в int16
+MAX_INTERNED_NAMES = 1024
+
+
+class TypeInterner:
+    """Таблица кодов для повторяющихся строк (типы узлов, условия ребер)"""
+
+    def __init__(self, names: Tuple[str, ...] = (), max_size: int = MAX_INTERNED_NAMES):
+        self.max_size = min(max_size, int(np.iinfo(np.int16).max) + 1)
+        self._codes: Dict[str, int] = {}
+        self._names: List[str] = []
+        self._lock = threading.Lock()
+        for name in names:
+            self.code(name)
+
+    def code(self, name: str) -> int:
+        code = self._codes.get(name)
+        if code is None:
+            with self._lock:
+                code = self._codes.get(name)
+                if code is None:
+                    if len(self._names) >= self.max_size:
+                        raise OverflowError(f"TypeInterner is full ({self.max_size} names), cannot add {name!r}")
+                    code = len(self._names)
+                    self._names.append(name)
+                    self._codes[name] = code
+        return code
+
+    def has_room_for(self, name: str) -> bool:
+        return name in self._codes or len(self._names) < self.max_size
+
+    def __deepcopy__(self, memo: Dict[int, Any]) -> "TypeInterner":
+        # Таблица общая для процесса: копии графа ссылаются на нее же
+        return self
+
+    def name(self, code: int) -> str:
+        return self._names[code]
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+
+NODE_TYPES = TypeInterner(('process', 'start', 'end', 'decision', 'data'))
+EDGE_CONDITIONS = TypeInterner(('true', 'false'))
+
+
+class _CodeColumn:
+    def __init__(self, interner: TypeInterner, capacity: int):
+        self.interner = interner
+        self.data = np.full(capacity, -1, dtype=np.int16)
+
+    def grow(self, capacity: int) -> None:
+        data = np.full(capacity, -1, dtype=np.int16)
+        data[:len(self.data)] = self.data
+        self.data = data
+
+    def accepts(self, value: Any) -> bool:
+        # Строки сверх размера таблицы хранятся как редкие атрибуты узла
+        return isinstance(value, str) and self.interner.has_room_for(value)
+
+    def get(self, idx: int) -> Any:
+        code = self.data[idx]
+        return _MISSING if code < 0 else self.interner.name(code)
+
+    def values(self, count: int) -> List[Any]:
+        names = self.interner._names
+        return [names[code] if code >= 0 else _MISSING for code in self.data[:count].tolist()]
+
+    def set(self, idx: int, value: Any) -> None:
+        self.data[idx] = self.interner.code(value)
+
+    def clear(self, idx: int) -> None:
+        self.data[idx] = -1
+
+    def clear_range(self, start: int, stop: int) -> None:
+        self.data[start:stop] = -1
+
+
+class _IntColumn:
+    def __init__(self, capacity: int):
+        self.data = np.full(capacity, _INT_MISSING, dtype=np.int32)
+
+    def grow(self, capacity: int) -> None:
+        data = np.full(capacity, _INT_MISSING, dtype=np.int32)
+        data[:len(self.data)] = self.data
+        self.data = data
+
+    def accepts(self, value: Any) -> bool:
+        return (
+            isinstance(value, (int, np.integer)) and not isinstance(value, bool)
+            and _INT_MISSING < value <= _INT_MAX
+        )
+
+    def get(self, idx: int) -> Any:
+        value = self.data[idx]
+        return _MISSING if value == _INT_MISSING else int(value)
+
+    def values(self, count: int) -> List[Any]:
+        return [_MISSING if value == _INT_MISSING else value for value in self.data[:count].tolist()]
+
+    def set(self, idx: int, value: Any) -> None:
+        self.data[idx] = value
+
+    def clear(self, idx: int) -> None:
+        self.data[idx] = _INT_MISSING
+
+    def clear_range(self, start: int, stop: int) -> None:
+        self.data[start:stop] = _INT_MISSING
+
+
+class _FloatColumn:
+    def __init__(self, capacity: int, width: int = 0):
+        # width=0 - скаляр, иначе вектор фиксированной длины (позиция, bbox)
+        self.width = width
+        shape = (capacity, width) if width else (capacity,)
+        self.data = np.zeros(shape, dtype=np.float64)
+        self.present = np.zeros(capacity, dtype=bool)
+
+    def grow(self, capacity: int) -> None:
+        shape = (capacity, self.width) if self.width else (capacity,)
+        data = np.zeros(shape, dtype=np.float64)
+        data[:len(self.data)] = self.data
+        present = np.zeros(capacity, dtype=bool)
+        present[:len(self.present)] = self.present
+        self.data = data
+        self.present = present
+
+    def accepts(self, value: Any) -> bool:
+        if not self.width:
+            return isinstance(value, (float, np.floating))
+        return (
+            isinstance(value, (list, tuple)) and len(value) == self.width
+            and all(isinstance(v, (int, float, np.integer, np.floating)) and not isinstance(v, bool) for v in value)
+        )
+
+    def get(self, idx: int) -> Any:
+        if not self.present[idx]:
+            return _MISSING
+        if self.width:
+            return [float(v) for v in self.data[idx]]
+        return float(self.data[idx])
+
+    def values(self, count: int) -> List[Any]:
+        return [
+            value if present else _MISSING
+            for value, present in zip(self.data[:count].tolist(), self.present[:count].tolist())
+        ]
+
+    def set(self, idx: int, value: Any) -> None:
+        self.data[idx] = value
+        self.present[idx] = True
+
+    def clear(self, idx: int) -> None:
+        self.present[idx] = False
+
+    def clear_range(self, start: int, stop: int) -> None:
+        self.present[start:stop] = False
+
+
+class _ObjectColumn:
+    def __init__(self, capacity: int):
+        self.data: List[Any] = [_MISSING] * capacity
+
+    def grow(self, capacity: int) -> None:
+        self.data.extend([_MISSING] * (capacity - len(self.data)))
+
+    def accepts(self, value: Any) -> bool:
+        return isinstance(value, str)
+
+    def get(self, idx: int) -> Any:
+        return self.data[idx]
+
+    def values(self, count: int) -> List[Any]:
+        return self.data[:count]
+
+    def set(self, idx: int, value: Any) -> None:
+        self.data[idx] = value
+
+    def clear(self, idx: int) -> None:
+        self.data[idx] = _MISSING
+
+    def clear_range(self, start: int, stop: int) -> None:
+        self.data[start:stop] = [_MISSING] * (stop - start)
+
+
+def _node_columns(capacity: int) -> Dict[str, Any]:
+    return {
+        'type': _CodeColumn(NODE_TYPES, capacity),
+        'label': _ObjectColumn(capacity),
+        'position': _FloatColumn(capacity, 2),
+        'bbox': _FloatColumn(capacity, 4),
+        'confidence': _FloatColumn(capacity),
+        'level': _IntColumn(capacity),
+        'in_degree': _IntColumn(capacity),
+        'out_degree': _IntColumn(capacity),
+    }
+
+
+def _edge_columns(capacity: int) -> Dict[str, Any]:
+    return {
+        'label': _ObjectColumn(capacity),
+        'confidence': _FloatColumn(capacity),
+        'condition': _CodeColumn(EDGE_CONDITIONS, capacity),
+    }
+
+
+def _set_attribute(columns: Dict[str, Any], extras: Dict[int, Dict[str, Any]], idx: int, key: str, value: Any) -> None:
+    column = columns.get(key)
+    extra = extras.get(idx)
+    if column is not None and column.accepts(value):
+        column.set(idx, value)
+        if extra is not None:
+            extra.pop(key, None)
+    else:
+        if column is not None:
+            column.clear(idx)
+        extras.setdefault(idx, {})[key] = value
+
+
+class _AttributeView(MutableMapping):
+    """Словарь атрибутов узла или ребра поверх столбцов; редкие атрибуты хранятся отдельно"""
+
+    __slots__ = ('_graph', '_columns', '_extras', '_idx')
+
+    def __init__(self, graph: "CompactGraph", columns: Dict[str, Any], extras: Dict[int, Dict[str, Any]], idx: int):
+        self._graph = graph
+        self._columns = columns
+        self._extras = extras
+        self._idx = idx
+
+    def __getitem__(self, key: str) -> Any:
+        column = self._columns.get(key)
+        if column is not None:
+            value = column.get(self._idx)
+            if value is not _MISSING:
+                return value
+        extra = self._extras.get(self._idx)
+        if extra is not None and key in extra:
+            return extra[key]
+        raise KeyError(key)
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        _set_attribute(self._columns, self._extras, self._idx, key, value)
+        self._graph.version += 1
+
+    def __delitem__(self, key: str) -> None:
+        found = False
+        column = self._columns.get(key)
+        if column is not None and column.get(self._idx) is not _MISSING:
+            column.clear(self._idx)
+            found = True
+        extra = self._extras.get(self._idx)
+        if extra is not None and key in extra:
+            del extra[key]
+            found = True
+        if not found:
+            raise KeyError(key)
+        self._graph.version += 1
+
+    def __iter__(self) -> Iterator[str]:
+        for key, column in self._columns.items():
+            if column.get(self._idx) is not _MISSING:
+                yield key
+        yield from self._extras.get(self._idx, {})
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def __repr__(self) -> str:
+        return repr(dict(self))
+
+
+class _NodeView(Mapping):
+    def __init__(self, graph: "CompactGraph"):
+        self._graph = graph
+
+    def __call__(self, data: bool = False):
+        if data:
+            return [(node, self[node]) for node in self]
+        return self
+
+    def __getitem__(self, node: Any) -> _AttributeView:
+        graph = self._graph
+        return _AttributeView(graph, graph._node_columns, graph._node_extras, graph._index[node])
+
+    def __iter__(self) -> Iterator[Any]:
+        return iter(self._graph._ids)
+
+    def __len__(self) -> int:
+        return len(self._graph._ids)
+
+    def __contains__(self, node: Any) -> bool:
+        return node in self._graph._index
+
+
+class _EdgeView(Mapping):
+    def __init__(self, graph: "CompactGraph"):
+        self._graph = graph
+
+    def __call__(self, data: bool = False):
+        if data:
+            return [(source, target, self[source, target]) for source, target in self]
+        return self
+
+    def __getitem__(self, edge: Tuple[Any, Any]) -> _AttributeView:
+        graph = self._graph
+        edge_idx = graph._edge_idx(edge[0], edge[1])
+        if edge_idx is None:
+            raise KeyError(edge)
+        return _AttributeView(graph, graph._edge_columns, graph._edge_extras, edge_idx)
+
+    def __iter__(self) -> Iterator[Tuple[Any, Any]]:
+        # Порядок как у networkx: по узлам-источникам, внутри - в порядке добавления
+        graph = self._graph
+        indptr, indices, _ = graph.out_csr()
+        ids = graph._ids
+        for node_idx in range(len(ids)):
+            source = ids[node_idx]
+            for target_idx in indices[indptr[node_idx]:indptr[node_idx + 1]]:
+                yield source, ids[target_idx]
+
+    def __len__(self) -> int:
+        return self._graph._num_edges
+
+    def __contains__(self, edge: Any) -> bool:
+        return self._graph.has_edge(edge[0], edge[1])
+
+
+class CompactGraph:
+    """Ориентированный граф в массивах: коды типов, CSR-смежность, атрибуты по столбцам"""
+
+    def __init__(self, capacity: int = 16):
+        self.graph: Dict[str, Any] = {}
+        # version меняется при любой правке, structure_version - только при изменении узлов и ребер
+        self.version = 0
+        self.structure_version = 0
+
+        self._ids: List[Any] = []
+        self._index: Dict[Any, int] = {}
+        self._node_capacity = capacity
+        self._node_columns = _node_columns(capacity)
+        self._node_extras: Dict[int, Dict[str, Any]] = {}
+
+        self._num_edges = 0
+        self._edge_capacity = capacity
+        self._src = np.zeros(capacity, dtype=np.int32)
+        self._dst = np.zeros(capacity, dtype=np.int32)
+        self._edge_lookup: Dict[int, int] = {}
+        self._edge_columns = _edge_columns(capacity)
+        self._edge_extras: Dict[int, Dict[str, Any]] = {}
+
+        self._csr_cache: Dict[str, Tuple[int, Tuple[np.ndarray, np.ndarray, np.ndarray]]] = {}
+        self._analysis_cache: Dict[str, Tuple[int, Any]] = {}
+
+        self.nodes = _NodeView(self)
+        self.edges = _EdgeView(self)
+
+    # --- построение ---
+
+    def add_node(self, node_id: Any, **attributes) -> None:
+        idx = self._index.get(node_id)
+        if idx is None:
+            idx = len(self._ids)
+            if idx == self._node_capacity:
+                self._node_capacity *= 2
+                for column in self._node_columns.values():
+                    column.grow(self._node_capacity)
+            self._ids.append(node_id)
+            self._index[node_id] = idx
+            self.structure_version += 1
+            self.version += 1
+
+        if attributes:
+            view = _AttributeView(self, self._node_columns, self._node_extras, idx)
+            for key, value in attributes.items():
+                view[key] = value
+
+    def add_edge(self, source: Any, target: Any, **attributes) -> None:
+        if source not in self._index:
+            self.add_node(source)
+        if target not in self._index:
+            self.add_node(target)
+
+        source_idx = self._index[source]
+        target_idx = self._index[target]
+        key = (source_idx << 32) | target_idx
+        edge_idx = self._edge_lookup.get(key)
+
+        if edge_idx is None:
+            edge_idx = self._num_edges
+            if edge_idx == self._edge_capacity:
+                self._edge_capacity *= 2
+                self._src = np.resize(self._src, self._edge_capacity)
+                self._dst = np.resize(self._dst, self._edge_capacity)
+                for column in self._edge_columns.values():
+                    column.grow(self._edge_capacity)
+            self._src[edge_idx] = source_idx
+            self._dst[edge_idx] = target_idx
+            self._edge_lookup[key] = edge_idx
+            self._num_edges += 1
+            self.structure_version += 1
+            self.version += 1
+
+        if attributes:
+            view = _AttributeView(self, self._edge_columns, self._edge_extras, edge_idx)
+            for name, value in attributes.items():
+                view[name] = value
+
+    def add_nodes_from(self, nodes) -> None:
+        for node in nodes:
+            if isinstance(node, tuple):
+                self.add_node(node[0], **node[1])
+            else:
+                self.add_node(node)
+
+    def add_edges_from(self, edges) -> None:
+        for edge in edges:
+            self.add_edge(edge[0], edge[1], **(edge[2] if len(edge) > 2 else {}))
+
+    def truncate(self, num_nodes: int, num_edges: int) -> None:
+        """Откат к первым num_nodes узлам и num_edges ребрам; оставшиеся ребра не должны ссылаться на удаляемые узлы"""
+        if num_nodes >= len(self._ids) and num_edges >= self._num_edges:
+            return
+
+        num_edges = min(num_edges, self._num_edges)
+        sources = self._src[num_edges:self._num_edges].tolist()
+        targets = self._dst[num_edges:self._num_edges].tolist()
+        for edge_idx, source_idx, target_idx in zip(range(num_edges, self._num_edges), sources, targets):
+            del self._edge_lookup[(source_idx << 32) | target_idx]
+            self._edge_extras.pop(edge_idx, None)
+        for column in self._edge_columns.values():
+            column.clear_range(num_edges, self._num_edges)
+        self._num_edges = num_edges
+
+        num_nodes = min(num_nodes, len(self._ids))
+        for idx in range(num_nodes, len(self._ids)):
+            del self._index[self._ids[idx]]
+            self._node_extras.pop(idx, None)
+        for column in self._node_columns.values():
+            column.clear_range(num_nodes, len(self._ids))
+        del self._ids[num_nodes:]
+
+        self.structure_version += 1
+        self.version += 1
+
+    # --- запросы в духе networkx ---
+
+    def is_directed(self) -> bool:
+        return True
+
+    def number_of_nodes(self) -> int:
+        return len(self._ids)
+
+    def number_of_edges(self) -> int:
+        return self._num_edges
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __iter__(self) -> Iterator[Any]:
+        return iter(self._ids)
+
+    def __contains__(self, node: Any) -> bool:
+        return node in self._index
+
+    def has_node(self, node: Any) -> bool:
+        return node in self._index
+
+    def has_edge(self, source: Any, target: Any) -> bool:
+        return self._edge_idx(source, target) is not None
+
+    def successors(self, node: Any) -> Iterator[Any]:
+        indptr, indices, _ = self.out_csr()
+        idx = self._index[node]
+        ids = self._ids
+        return iter([ids[i] for i in indices[indptr[idx]:indptr[idx + 1]].tolist()])
+
+    def predecessors(self, node: Any) -> Iterator[Any]:
+        indptr, indices, _ = self.in_csr()
+        idx = self._index[node]
+        ids = self._ids
+        return iter([ids[i] for i in indices[indptr[idx]:indptr[idx + 1]].tolist()])
+
+    def out_degree(self, node: Any = None):
+        indptr = self.out_csr()[0]
+        if node is None:
+            return list(zip(self._ids, np.diff(indptr).tolist()))
+        idx = self._index[node]
+        return int(indptr[idx + 1] - indptr[idx])
+
+    def in_degree(self, node: Any = None):
+        indptr = self.in_csr()[0]
+        if node is None:
+            return list(zip(self._ids, np.diff(indptr).tolist()))
+        idx = self._index[node]
+        return int(indptr[idx + 1] - indptr[idx])
+
+    # --- столбцовый доступ ---
+
+    def node_index(self, node: Any) -> int:
+        return self._index[node]
+
+    def node_id(self, idx: int) -> Any:
+        return self._ids[idx]
+
+    def type_codes(self) -> np.ndarray:
+        """Коды типов узлов (NODE_TYPES), -1 - тип не задан; без копирования"""
+        return self._node_columns['type'].data[:len(self._ids)]
+
+    def edge_arrays(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Индексы источников и приемников ребер в порядке добавления; без копирования"""
+        return self._src[:self._num_edges], self._dst[:self._num_edges]
+
+    def out_csr(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """(indptr, indices, edge_ids) исходящей смежности; пересчитывается только после изменения структуры"""
+        return self._csr('out')
+
+    def in_csr(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        return self._csr('in')
+
+    def _csr(self, direction: str) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        cached = self._csr_cache.get(direction)
+        if cached is not None and cached[0] == self.structure_version:
+            return cached[1]
+
+        src, dst = self.edge_arrays()
+        if direction == 'in':
+            src, dst = dst, src
+
+        # Устойчивая сортировка сохраняет порядок добавления ребер у каждого узла
+        edge_ids = np.argsort(src, kind='stable').astype(np.int32)
+        indices = dst[edge_ids]
+        counts = np.bincount(src, minlength=len(self._ids))
+        indptr = np.zeros(len(self._ids) + 1, dtype=np.int32)
+        np.cumsum(counts, out=indptr[1:])
+
+        csr = (indptr, indices, edge_ids)
+        self._csr_cache[direction] = (self.structure_version, csr)
+        return csr
+
+    def cached(self, key: str, compute) -> Any:
+        """Результат анализа структуры графа; пересчитывается только после изменения узлов или ребер"""
+        entry = self._analysis_cache.get(key)
+        if entry is not None and entry[0] == self.structure_version:
+            return entry[1]
+        value = compute(self)
+        self._analysis_cache[key] = (self.structure_version, value)
+        return value
+
+    def node_values(self, name: str, default: Any = None) -> List[Any]:
+        """Значения атрибута для всех узлов в порядке узлов"""
+        return self._column_values(self._node_columns, self._node_extras, len(self._ids), name, default)
+
+    def edge_values(self, name: str, default: Any = None) -> List[Any]:
+        """Значения атрибута для всех ребер в порядке добавления (индексы edge_ids из CSR)"""
+        return self._column_values(self._edge_columns, self._edge_extras, self._num_edges, name, default)
+
+    def set_node_values(self, name: str, values: List[Any]) -> None:
+        for idx, value in enumerate(values):
+            _set_attribute(self._node_columns, self._node_extras, idx, name, value)
+        self.version += 1
+
+    def set_edge_value(self, edge_idx: int, name: str, value: Any) -> None:
+        _set_attribute(self._edge_columns, self._edge_extras, edge_idx, name, value)
+        self.version += 1
+
+    def node_rows(self) -> List[Dict[str, Any]]:
+        """Атрибуты всех узлов словарями - как dict(graph.nodes[node]) для каждого узла"""
+        return self._rows(self._node_columns, self._node_extras, range(len(self._ids)))
+
+    def edge_rows(self) -> List[Dict[str, Any]]:
+        """Атрибуты всех ребер в порядке graph.edges()"""
+        return self._rows(self._edge_columns, self._edge_extras, self.out_csr()[2].tolist())
+
+    def _column_values(
+        self,
+        columns: Dict[str, Any],
+        extras: Dict[int, Dict[str, Any]],
+        count: int,
+        name: str,
+        default: Any
+    ) -> List[Any]:
+        column = columns.get(name)
+        values = list(column.values(count)) if column is not None else [_MISSING] * count
+        for idx, extra in extras.items():
+            if name in extra:
+                values[idx] = extra[name]
+        return [default if value is _MISSING else value for value in values]
+
+    def _rows(self, columns: Dict[str, Any], extras: Dict[int, Dict[str, Any]], order) -> List[Dict[str, Any]]:
+        count = len(self._ids) if columns is self._node_columns else self._num_edges
+        column_values = [(name, column.values(count)) for name, column in columns.items()]
+        rows = []
+        for idx in order:
+            row = {}
+            for name, values in column_values:
+                value = values[idx]
+                if value is not _MISSING:
+                    row[name] = value
+            extra = extras.get(idx)
+            if extra:
+                row.update(extra)
+            rows.append(row)
+        return rows
+
+    def _edge_idx(self, source: Any, target: Any) -> Optional[int]:
+        source_idx = self._index.get(source)
+        target_idx = self._index.get(target)
+        if source_idx is None or target_idx is None:
+            return None
+        return self._edge_lookup.get((source_idx << 32) | target_idx)
+
+    # --- адаптеры networkx ---
+
+    def as_networkx(self) -> nx.DiGraph:
+        """Представление для алгоритмов networkx без копирования данных (только чтение)"""
+        return NetworkXView(self)
+
+    def to_networkx(self) -> nx.DiGraph:
+        """Обычный изменяемый nx.DiGraph - копия графа"""
+        graph = nx.DiGraph()
+        graph.graph.update(self.graph)
+        graph.add_nodes_from((node, dict(self.nodes[node])) for node in self._ids)
+        graph.add_edges_from((source, target, dict(self.edges[source, target])) for source, target in self.edges)
+        return graph
+
+    @classmethod
+    def from_networkx(cls, graph: nx.DiGraph) -> "CompactGraph":
+        compact = cls(capacity=max(16, graph.number_of_nodes(), graph.number_of_edges()))
+        compact.graph.update(graph.graph)
+        for node, data in graph.nodes(data=True):
+            compact.add_node(node, **data)
+        for source, target, data in graph.edges(data=True):
+            compact.add_edge(source, target, **data)
+        return compact
+
+    def copy(self) -> "CompactGraph":
+        return CompactGraph.from_networkx(self.as_networkx())
+
+
+class _AdjacencyView(Mapping):
+    """node -> {сосед: атрибуты ребра} поверх CSR"""
+
+    def __init__(self, graph: CompactGraph, direction: str):
+        self._graph = graph
+        self._direction = direction
+
+    def __getitem__(self, node: Any) -> "_NeighborView":
+        return _NeighborView(self._graph, self._direction, self._graph._index[node])
+
+    def __iter__(self) -> Iterator[Any]:
+        return iter(self._graph._ids)
+
+    def __len__(self) -> int:
+        return len(self._graph._ids)
+
+    def __contains__(self, node: Any) -> bool:
+        return node in self._graph._index
+
+
+class _NeighborView(Mapping):
+    def __init__(self, graph: CompactGraph, direction: str, idx: int):
+        self._graph = graph
+        self._idx = idx
+        indptr, indices, edge_ids = graph._csr(direction)
+        self._neighbors = indices[indptr[idx]:indptr[idx + 1]]
+        self._edge_ids = edge_ids[indptr[idx]:indptr[idx + 1]]
+
+    def __getitem__(self, node: Any) -> _AttributeView:
+        graph = self._graph
+        neighbor_idx = graph._index[node]
+        for position, candidate in enumerate(self._neighbors):
+            if candidate == neighbor_idx:
+                return _AttributeView(graph, graph._edge_columns, graph._edge_extras, int(self._edge_ids[position]))
+        raise KeyError(node)
+
+    def __iter__(self) -> Iterator[Any]:
+        ids = self._graph._ids
+        return iter([ids[i] for i in self._neighbors.tolist()])
+
+    def __len__(self) -> int:
+        return len(self._neighbors)
+
+    def __contains__(self, node: Any) -> bool:
+        neighbor_idx = self._graph._index.get(node)
+        return neighbor_idx is not None and bool((self._neighbors == neighbor_idx).any())
+
+
+class NetworkXView(nx.DiGraph):
+    """nx.DiGraph, чьи словари узлов и смежности читают массивы CompactGraph напрямую"""
+
+    def __init__(self, compact: Optional[CompactGraph] = None, **attr):
+        if compact is None or not isinstance(compact, CompactGraph):
+            # Алгоритмы networkx создают графы через self.__class__() - отдаем им обычный граф
+            super().__init__(compact, **attr)
+            return
+
+        self.graph = compact.graph
+        self._node = compact.nodes
+        self._adj = _AdjacencyView(compact, 'out')
+        self._pred = _AdjacencyView(compact, 'in')
+        self.__networkx_cache__ = {}
+        self.compact = compact
+
+    # Копирующие методы DiGraph пишут в словари смежности или глубоко копируют атрибуты -
+    # представление отдает их обычному графу-копии
+
+    def copy(self, as_view: bool = False) -> nx.DiGraph:
+        if getattr(self, 'compact', None) is None:
+            return super().copy(as_view=as_view)
+        return self.compact.to_networkx().copy(as_view=as_view)
+
+    def reverse(self, copy: bool = True) -> nx.DiGraph:
+        if getattr(self, 'compact', None) is None:
+            return super().reverse(copy=copy)
+        return self.compact.to_networkx().reverse(copy=copy)
+
+    def to_directed(self, as_view: bool = False) -> nx.DiGraph:
+        if getattr(self, 'compact', None) is None:
+            return super().to_directed(as_view=as_view)
+        return self.compact.to_networkx().to_directed(as_view=as_view)
+
+    def to_undirected(self, reciprocal: bool = False, as_view: bool = False) -> nx.Graph:
+        if getattr(self, 'compact', None) is None:
+            return super().to_undirected(reciprocal=reciprocal, as_view=as_view)
+        return self.compact.to_networkx().to_undirected(reciprocal=reciprocal, as_view=as_view)
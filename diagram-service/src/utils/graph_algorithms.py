@@ -0,0 +1,217 @@
+from itertools import islice
+from typing import Any, Dict, List, Optional, Tuple
+
+import networkx as nx
+
+from src.core.config import settings
+from src.utils.compact_graph import CompactGraph
+
+
+def int_adjacency(graph: Any) -> Tuple[List[Any], List[int], List[int]]:
+    """(ids, indptr, indices) исходящей смежности в виде списков целых индексов"""
+    if isinstance(graph, CompactGraph):
+        indptr, indices, _ = graph.out_csr()
+        return list(graph.nodes), indptr.tolist(), indices.tolist()
+
+    ids = list(graph.nodes())
+    index = {node: idx for idx, node in enumerate(ids)}
+    indptr = [0]
+    indices = []
+    for node in ids:
+        indices.extend(index[successor] for successor in graph.successors(node))
+        indptr.append(len(indices))
+    return ids, indptr, indices
+
+
+class CycleInfo:
+    def __init__(
+        self,
+        has_cycles: bool,
+        loop_headers: List[Any],
+        num_loops: int,
+        components: List[List[Any]]
+    ):
+        self.has_cycles = has_cycles
+        self.loop_headers = loop_headers
+        self.num_loops = num_loops
+        # Сильно связные компоненты с циклом (несколько узлов или петля)
+        self.components = components
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "has_cycles": self.has_cycles,
+            "loop_headers": list(self.loop_headers),
+            "num_loops": self.num_loops
+        }
+
+
+def strongly_connected_components(indptr: List[int], indices: List[int]) -> Tuple[List[int], int]:
+    """Итеративный алгоритм Тарьяна: номер компоненты для каждого узла и число компонент.
+
+    Компоненты нумеруются в обратном топологическом порядке конденсации (стоки первыми).
+    """
+    count = len(indptr) - 1
+    index = [-1] * count
+    lowlink = [0] * count
+    on_stack = [False] * count
+    component = [-1] * count
+    stack: List[int] = []
+    next_index = 0
+    num_components = 0
+
+    for root in range(count):
+        if index[root] != -1:
+            continue
+
+        # Кадр обхода: (узел, позиция следующего соседа)
+        work = [(root, indptr[root])]
+        index[root] = lowlink[root] = next_index
+        next_index += 1
+        stack.append(root)
+        on_stack[root] = True
+
+        while work:
+            node, position = work[-1]
+            end = indptr[node + 1]
+
+            while position < end:
+                successor = indices[position]
+                position += 1
+                if index[successor] == -1:
+                    work[-1] = (node, position)
+                    index[successor] = lowlink[successor] = next_index
+                    next_index += 1
+                    stack.append(successor)
+                    on_stack[successor] = True
+                    work.append((successor, indptr[successor]))
+                    break
+                if on_stack[successor] and index[successor] < lowlink[node]:
+                    lowlink[node] = index[successor]
+            else:
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    if lowlink[node] < lowlink[parent]:
+                        lowlink[parent] = lowlink[node]
+
+                if lowlink[node] == index[node]:
+                    while True:
+                        member = stack.pop()
+                        on_stack[member] = False
+                        component[member] = num_components
+                        if member == node:
+                            break
+                    num_components += 1
+
+    return component, num_components
+
+
+def analyze_cycles(graph: Any) -> CycleInfo:
+    """Наличие циклов, заголовки и число циклов за O(V+E) без перечисления всех циклов"""
+    if isinstance(graph, CompactGraph):
+        return graph.cached('cycles', _analyze_cycles)
+    return _analyze_cycles(graph)
+
+
+def _analyze_cycles(graph: Any) -> CycleInfo:
+    ids, indptr, indices = int_adjacency(graph)
+    count = len(ids)
+    component, num_components = strongly_connected_components(indptr, indices)
+
+    sizes = [0] * num_components
+    for comp in component:
+        sizes[comp] += 1
+
+    cyclic = [size > 1 for size in sizes]
+    for node in range(count):
+        for position in range(indptr[node], indptr[node + 1]):
+            if indices[position] == node:
+                cyclic[component[node]] = True
+
+    # Заголовок цикла - узел, в который входит обратное ребро DFS (обход от корней в порядке узлов)
+    headers = set()
+    state = [0] * count
+    has_incoming = [False] * count
+    for target in indices:
+        has_incoming[target] = True
+    roots = [node for node in range(count) if not has_incoming[node]]
+    for root in roots + list(range(count)):
+        if state[root] != 0:
+            continue
+        state[root] = 1
+        work = [(root, indptr[root])]
+        while work:
+            node, position = work[-1]
+            if position < indptr[node + 1]:
+                work[-1] = (node, position + 1)
+                successor = indices[position]
+                if state[successor] == 0:
+                    state[successor] = 1
+                    work.append((successor, indptr[successor]))
+                elif state[successor] == 1:
+                    headers.add(successor)
+            else:
+                state[node] = 2
+                work.pop()
+
+    members: Dict[int, List[Any]] = {}
+    for node in range(count):
+        if cyclic[component[node]]:
+            members.setdefault(component[node], []).append(ids[node])
+
+    return CycleInfo(
+        has_cycles=any(cyclic),
+        loop_headers=[ids[node] for node in sorted(headers)],
+        num_loops=sum(cyclic),
+        components=list(members.values())
+    )
+
+
+def node_levels(graph: Any) -> Dict[Any, int]:
+    """Уровень узла - длина самого длинного пути до него в графе сильно связных компонент.
+
+    Узлы одного цикла получают общий уровень, истоки - уровень 0. Для CompactGraph
+    результат кэшируется до изменения структуры графа; возвращаемый словарь не изменять.
+    """
+    if isinstance(graph, CompactGraph):
+        return graph.cached('levels', _node_levels)
+    return _node_levels(graph)
+
+
+def _node_levels(graph: Any) -> Dict[Any, int]:
+    ids, indptr, indices = int_adjacency(graph)
+    component, num_components = strongly_connected_components(indptr, indices)
+
+    # Тарьян нумерует компоненты от стоков к истокам: обратный порядок номеров топологический
+    members: List[List[int]] = [[] for _ in range(num_components)]
+    for node, comp in enumerate(component):
+        members[comp].append(node)
+
+    component_level = [0] * num_components
+    for comp in range(num_components - 1, -1, -1):
+        next_level = component_level[comp] + 1
+        for node in members[comp]:
+            for position in range(indptr[node], indptr[node + 1]):
+                target = component[indices[position]]
+                if target != comp and component_level[target] < next_level:
+                    component_level[target] = next_level
+
+    return {node_id: component_level[component[node]] for node, node_id in enumerate(ids)}
+
+
+def enumerate_cycles(graph: Any, limit: Optional[int] = None, length_bound: Optional[int] = None) -> List[List[Any]]:
+    """Перечисление простых циклов с жестким ограничением на их число"""
+    cap = settings.max_enumerated_cycles
+    limit = cap if limit is None else min(limit, cap)
+    if limit <= 0:
+        return []
+
+    nx_graph = graph.as_networkx() if isinstance(graph, CompactGraph) else graph
+    # Перечисляем только внутри циклических компонент - ациклические части графа не обходятся
+    cycles: List[List[Any]] = []
+    for members in analyze_cycles(graph).components:
+        subgraph = nx_graph.subgraph(members)
+        cycles.extend(islice(nx.simple_cycles(subgraph, length_bound=length_bound), limit - len(cycles)))
+        if len(cycles) >= limit:
+            break
+    return cycles
@@ -1,29 +1,41 @@
 import networkx as nx
-from typing import List, Dict, Any, Tuple, Optional
+from typing import List, Dict, Any, Tuple, Optional, Union
 
 from src.core.logger import app_logger
 from src.core.exceptions import GraphConstructionError
+from src.utils.compact_graph import CompactGraph
+from src.utils.graph_algorithms import analyze_cycles, enumerate_cycles, node_levels
 
 
-def create_directed_graph() -> nx.DiGraph:
-    return nx.DiGraph()
+GraphLike = Union[CompactGraph, nx.DiGraph]
 
 
-def add_node(graph: nx.DiGraph, node_id: str, **attributes) -> None:
+def create_directed_graph() -> CompactGraph:
+    return CompactGraph()
+
+
+def as_networkx(graph: GraphLike) -> nx.DiGraph:
+    """nx.DiGraph для алгоритмов networkx; CompactGraph отдается представлением без копирования"""
+    if isinstance(graph, CompactGraph):
+        return graph.as_networkx()
+    return graph
+
+
+def add_node(graph: GraphLike, node_id: str, **attributes) -> None:
     graph.add_node(node_id, **attributes)
 
 
-def add_edge(graph: nx.DiGraph, source: str, target: str, **attributes) -> None:
+def add_edge(graph: GraphLike, source: str, target: str, **attributes) -> None:
     graph.add_edge(source, target, **attributes)
 
 
-def validate_graph(graph: nx.DiGraph) -> Tuple[bool, List[str]]:
+def validate_graph(graph: GraphLike) -> Tuple[bool, List[str]]:
     errors = []
     
     if graph.number_of_nodes() == 0:
         errors.append("Graph has no nodes")
     
-    if not nx.is_weakly_connected(graph):
+    if not nx.is_weakly_connected(as_networkx(graph)):
         errors.append("Graph is not connected")
     
     start_nodes = [n for n in graph.nodes() if graph.nodes[n].get('type') == 'start']
@@ -43,19 +55,19 @@ def validate_graph(graph: nx.DiGraph) -> Tuple[bool, List[str]]:
     return len(errors) == 0, errors
 
 
-def find_cycles(graph: nx.DiGraph) -> List[List[str]]:
+def find_cycles(graph: GraphLike, limit: Optional[int] = None) -> List[List[str]]:
+    """Простые циклы графа; их число ограничено settings.max_enumerated_cycles"""
     try:
-        cycles = list(nx.simple_cycles(graph))
-        return cycles
+        return enumerate_cycles(graph, limit)
     except Exception as e:
         app_logger.warning(f"Failed to find cycles: {str(e)}")
         return []
 
 
-def topological_sort(graph: nx.DiGraph) -> Optional[List[str]]:
+def topological_sort(graph: GraphLike) -> Optional[List[str]]:
     try:
-        if nx.is_directed_acyclic_graph(graph):
-            return list(nx.topological_sort(graph))
+        if nx.is_directed_acyclic_graph(as_networkx(graph)):
+            return list(nx.topological_sort(as_networkx(graph)))
         else:
             app_logger.warning("Graph contains cycles, cannot perform topological sort")
             return None
@@ -64,15 +76,15 @@ def topological_sort(graph: nx.DiGraph) -> Optional[List[str]]:
         return None
 
 
-def get_node_successors(graph: nx.DiGraph, node_id: str) -> List[str]:
+def get_node_successors(graph: GraphLike, node_id: str) -> List[str]:
     return list(graph.successors(node_id))
 
 
-def get_node_predecessors(graph: nx.DiGraph, node_id: str) -> List[str]:
+def get_node_predecessors(graph: GraphLike, node_id: str) -> List[str]:
     return list(graph.predecessors(node_id))
 
 
-def graph_to_dict(graph: nx.DiGraph) -> Dict[str, Any]:
+def graph_to_dict(graph: GraphLike) -> Dict[str, Any]:
     nodes = []
     for node_id in graph.nodes():
         node_data = {"id": node_id}
@@ -88,8 +100,8 @@ def graph_to_dict(graph: nx.DiGraph) -> Dict[str, Any]:
     return {"nodes": nodes, "edges": edges}
 
 
-def dict_to_graph(data: Dict[str, Any]) -> nx.DiGraph:
-    graph = nx.DiGraph()
+def dict_to_graph(data: Dict[str, Any]) -> CompactGraph:
+    graph = create_directed_graph()
     
     for node in data.get("nodes", []):
         node_id = node.pop("id")
@@ -103,48 +115,27 @@ def dict_to_graph(data: Dict[str, Any]) -> nx.DiGraph:
     return graph
 
 
-def calculate_node_levels(graph: nx.DiGraph) -> Dict[str, int]:
-    levels = {}
-    
-    start_nodes = [n for n in graph.nodes() if graph.in_degree(n) == 0]
-    
-    if not start_nodes:
-        start_nodes = list(graph.nodes())[:1]
-    
-    for start in start_nodes:
-        levels[start] = 0
-    
-    visited = set(start_nodes)
-    queue = list(start_nodes)
-    
-    while queue:
-        current = queue.pop(0)
-        current_level = levels[current]
-        
-        for successor in graph.successors(current):
-            if successor not in visited:
-                levels[successor] = current_level + 1
-                visited.add(successor)
-                queue.append(successor)
-            else:
-                levels[successor] = max(levels[successor], current_level + 1)
-    
-    return levels
+def calculate_node_levels(graph: GraphLike) -> Dict[str, int]:
+    """Слои узлов за O(V+E): конденсация циклов и самый длинный путь от истоков"""
+    return node_levels(graph)
 
 
-def get_graph_statistics(graph: nx.DiGraph) -> Dict[str, Any]:
+def get_graph_statistics(graph: GraphLike) -> Dict[str, Any]:
+    cycles = analyze_cycles(graph)
     return {
         "num_nodes": graph.number_of_nodes(),
         "num_edges": graph.number_of_edges(),
-        "is_dag": nx.is_directed_acyclic_graph(graph),
-        "is_connected": nx.is_weakly_connected(graph),
-        "num_cycles": len(find_cycles(graph)),
-        "density": nx.density(graph)
+        "is_dag": not cycles.has_cycles,
+        "is_connected": nx.is_weakly_connected(as_networkx(graph)),
+        # Число циклических компонент, а не всех простых циклов - считается за O(V+E)
+        "num_cycles": cycles.num_loops,
+        "loop_headers": cycles.loop_headers,
+        "density": nx.density(as_networkx(graph))
     }
 
 
-def merge_graphs(graph1: nx.DiGraph, graph2: nx.DiGraph) -> nx.DiGraph:
-    merged = nx.DiGraph()
+def merge_graphs(graph1: GraphLike, graph2: GraphLike) -> CompactGraph:
+    merged = create_directed_graph()
     merged.add_nodes_from(graph1.nodes(data=True))
     merged.add_nodes_from(graph2.nodes(data=True))
     merged.add_edges_from(graph1.edges(data=True))
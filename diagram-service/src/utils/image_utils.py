@@ -59,8 +59,9 @@ def resize_image(image: np.ndarray, max_size: int = 1920, keep_aspect_ratio: boo
         
         if keep_aspect_ratio:
             scale = max_size / max(height, width)
-            new_width = int(width * scale)
-            new_height = int(height * scale)
+            # Узкая высокая схема не должна сжаться в 0 пикселей по короткой стороне
+            new_width = max(int(width * scale), 1)
+            new_height = max(int(height * scale), 1)
         else:
             new_width = max_size
             new_height = max_size
@@ -73,6 +74,14 @@ def resize_image(image: np.ndarray, max_size: int = 1920, keep_aspect_ratio: boo
         raise ImageProcessingError(f"Failed to resize image: {str(e)}")
 
 
+def make_thumbnail(image: np.ndarray, max_size: int = 256) -> bytes:
+    """PNG-миниатюра из уже декодированного или отрисованного растра: не больше max_size по большей стороне"""
+    try:
+        return numpy_to_bytes(resize_image(image, max_size=max_size, keep_aspect_ratio=True))
+    except Exception as e:
+        raise ImageProcessingError(f"Failed to create thumbnail: {str(e)}")
+
+
 def convert_to_rgb(image: np.ndarray) -> np.ndarray:
     try:
         if len(image.shape) == 2:
@@ -0,0 +1,74 @@
+import re
+import threading
+from typing import Dict, List, Optional, Tuple
+
+
+# Окончания русских словоформ: "началом", "завершения"; латинские слова совпадают только целиком
+WORD_ENDING = '[а-яё]*'
+
+
+class KeywordMatcher:
+    """Поиск ключевых слов нескольких групп заранее скомпилированными выражениями.
+
+    Результат совпадает с проверкой групп по порядку через `any(keyword in text ...)`:
+    возвращается первая по порядку группа, хотя бы одно слово которой входит в текст.
+    При whole_words ключевое слово должно быть отдельным словом (с русским окончанием):
+    "end" находится в "the end", но не в "endpoint".
+    """
+
+    def __init__(self, groups: Dict[str, List[str]], whole_words: bool = False):
+        self.groups = list(groups.keys())
+        self.whole_words = whole_words
+        self._priority: Dict[str, int] = {}
+        for priority, keywords in enumerate(groups.values()):
+            for keyword in keywords:
+                if keyword:
+                    self._priority.setdefault(keyword, priority)
+
+        # Общее выражение отсекает тексты без ключевых слов за один проход;
+        # альтернативы упорядочены по приоритету группы
+        keywords = sorted(self._priority, key=lambda keyword: (self._priority[keyword], -len(keyword)))
+        self._any = self._compile(keywords) if keywords else None
+        self._group_patterns = [
+            self._compile([keyword for keyword in group_keywords if keyword]) if any(group_keywords) else None
+            for group_keywords in groups.values()
+        ]
+
+    def _compile(self, keywords: List[str]) -> "re.Pattern":
+        alternation = '|'.join(re.escape(keyword) for keyword in keywords)
+        if self.whole_words:
+            # Группа 1 - само ключевое слово без окончания
+            return re.compile(r'(?<!\w)(' + alternation + ')' + WORD_ENDING + r'(?!\w)')
+        return re.compile(alternation)
+
+    def match(self, text: str) -> Optional[str]:
+        """Группа с наивысшим приоритетом среди найденных в тексте слов"""
+        if self._any is None:
+            return None
+
+        found = self._any.search(text)
+        if found is None:
+            return None
+
+        # Найденное слово задает верхнюю границу; проверяем только более приоритетные группы
+        best = self._priority[found.group(1 if self.whole_words else 0)]
+        for priority in range(best):
+            pattern = self._group_patterns[priority]
+            if pattern is not None and pattern.search(text):
+                return self.groups[priority]
+        return self.groups[best]
+
+
+_matchers: Dict[Tuple, KeywordMatcher] = {}
+_matchers_lock = threading.Lock()
+
+
+def get_keyword_matcher(groups: Dict[str, List[str]], whole_words: bool = False) -> KeywordMatcher:
+    """Общий скомпилированный матчер для одинакового набора групп"""
+    key = (whole_words,) + tuple((name, tuple(keywords)) for name, keywords in groups.items())
+    with _matchers_lock:
+        matcher = _matchers.get(key)
+        if matcher is None:
+            matcher = KeywordMatcher(groups, whole_words)
+            _matchers[key] = matcher
+        return matcher
@@ -0,0 +1,106 @@
+import math
+from bisect import bisect_right
+from typing import Dict, List, Optional, Tuple
+
+
+class GridIndex:
+    """Равномерная сетка для быстрого поиска прямоугольников по области"""
+
+    def __init__(self, cell_size: float):
+        self.cell_size = max(float(cell_size), 1.0)
+        self._cells: Dict[Tuple[int, int], List[int]] = {}
+        self._rects: Dict[int, Tuple[float, float, float, float]] = {}
+
+    def __len__(self) -> int:
+        return len(self._rects)
+
+    def _cell_range(self, x1: float, y1: float, x2: float, y2: float):
+        size = self.cell_size
+        return (
+            int(math.floor(x1 / size)),
+            int(math.floor(y1 / size)),
+            int(math.floor(x2 / size)),
+            int(math.floor(y2 / size)),
+        )
+
+    def insert(self, item_id: int, x1: float, y1: float, x2: float, y2: float) -> None:
+        self._rects[item_id] = (x1, y1, x2, y2)
+        cx1, cy1, cx2, cy2 = self._cell_range(x1, y1, x2, y2)
+        for cx in range(cx1, cx2 + 1):
+            for cy in range(cy1, cy2 + 1):
+                self._cells.setdefault((cx, cy), []).append(item_id)
+
+    def query(self, x1: float, y1: float, x2: float, y2: float) -> List[int]:
+        """Идентификаторы прямоугольников, пересекающих область, по возрастанию"""
+        found = set()
+        cx1, cy1, cx2, cy2 = self._cell_range(x1, y1, x2, y2)
+        for cx in range(cx1, cx2 + 1):
+            for cy in range(cy1, cy2 + 1):
+                for item_id in self._cells.get((cx, cy), ()):
+                    if item_id in found:
+                        continue
+                    rx1, ry1, rx2, ry2 = self._rects[item_id]
+                    if rx1 <= x2 and x1 <= rx2 and ry1 <= y2 and y1 <= ry2:
+                        found.add(item_id)
+        return sorted(found)
+
+    def query_point(self, x: float, y: float) -> List[int]:
+        return self.query(x, y, x, y)
+
+    def nearest(self, x: float, y: float, max_distance: float) -> Optional[int]:
+        """Ближайший прямоугольник в пределах max_distance (расстояние до границы)"""
+        best_id = None
+        best_distance = max_distance
+        for item_id in self.query(x - max_distance, y - max_distance, x + max_distance, y + max_distance):
+            distance = self.distance_to(item_id, x, y)
+            if distance < best_distance or (best_id is None and distance <= max_distance):
+                best_id = item_id
+                best_distance = distance
+        return best_id
+
+    def distance_to(self, item_id: int, x: float, y: float) -> float:
+        rx1, ry1, rx2, ry2 = self._rects[item_id]
+        dx = max(rx1 - x, 0.0, x - rx2)
+        dy = max(ry1 - y, 0.0, y - ry2)
+        return math.hypot(dx, dy)
+
+
+class StripIndex:
+    """Точки, разложенные по полосам вдоль одной оси и отсортированные по другой внутри полосы"""
+
+    def __init__(self, strip_size: float):
+        self.strip_size = max(float(strip_size), 1.0)
+        self._strips: Dict[int, Tuple[List[float], List[int], List[float]]] = {}
+
+    def build(self, points: List[Tuple[float, float]]) -> "StripIndex":
+        """points[i] = (поперечная координата, продольная координата)"""
+        buckets: Dict[int, List[Tuple[float, int, float]]] = {}
+        for item_id, (across, along) in enumerate(points):
+            strip = int(math.floor(across / self.strip_size))
+            buckets.setdefault(strip, []).append((along, item_id, across))
+
+        self._strips = {}
+        for strip, items in buckets.items():
+            items.sort()
+            self._strips[strip] = (
+                [along for along, _, _ in items],
+                [item_id for _, item_id, _ in items],
+                [across for _, _, across in items],
+            )
+        return self
+
+    def query_after(self, across: float, half_width: float, along_min: float) -> List[int]:
+        """Точки с |поперечная - across| < half_width и продольной координатой строго больше along_min"""
+        found = []
+        # Соседние полосы берем с запасом, чтобы округление на границе полосы не теряло точки
+        first = int(math.floor((across - half_width) / self.strip_size)) - 1
+        last = int(math.floor((across + half_width) / self.strip_size)) + 1
+        for strip in range(first, last + 1):
+            bucket = self._strips.get(strip)
+            if bucket is None:
+                continue
+            alongs, ids, acrosses = bucket
+            for pos in range(bisect_right(alongs, along_min), len(alongs)):
+                if abs(acrosses[pos] - across) < half_width:
+                    found.append(ids[pos])
+        return found
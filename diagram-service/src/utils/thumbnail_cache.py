@@ -0,0 +1,86 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+from src.core.config import settings
+from src.core.logger import app_logger
+from src.core.metrics import metrics
+
+
+def thumbnail_key(data: bytes) -> str:
+    """Идентификатор миниатюры - хэш исходного изображения: та же схема или тот же файл дают тот же ключ"""
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+class ThumbnailCache:
+    """LRU-кэш PNG-миниатюр сгенерированных схем и загруженных изображений, из него отдается /previews"""
+
+    def __init__(self, max_size: Optional[int] = None):
+        self.max_size = max_size if max_size is not None else settings.thumbnail_cache_size
+        self._entries: "OrderedDict[str, bytes]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        app_logger.info(f"ThumbnailCache initialized with max_size={self.max_size}")
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self._misses += 1
+            else:
+                self._entries.move_to_end(key)
+                self._hits += 1
+        self._report(hit=value is not None)
+        return value
+
+    def put(self, key: str, value: bytes) -> None:
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+            size = len(self._entries)
+        metrics.set_gauge("thumbnail_cache_size", size)
+
+    def get_or_create(self, key: str, create: Callable[[], bytes]) -> bytes:
+        """Миниатюра из кэша; create вызывается только при промахе"""
+        value = self.get(key)
+        if value is None:
+            value = create()
+            self.put(key, value)
+        return value
+
+    def _report(self, hit: bool) -> None:
+        metrics.increment("thumbnail_cache_hits" if hit else "thumbnail_cache_misses")
+        metrics.set_gauge("thumbnail_cache_hit_rate", self.hit_rate)
+
+    @property
+    def hit_rate(self) -> float:
+        total = self._hits + self._misses
+        return self._hits / total if total else 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": self.hit_rate
+            }
+
+
+_thumbnail_cache: Optional[ThumbnailCache] = None
+_thumbnail_cache_lock = threading.Lock()
+
+
+def get_thumbnail_cache() -> ThumbnailCache:
+    global _thumbnail_cache
+    with _thumbnail_cache_lock:
+        if _thumbnail_cache is None:
+            _thumbnail_cache = ThumbnailCache()
+        return _thumbnail_cache
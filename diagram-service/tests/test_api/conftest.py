@@ -0,0 +1,17 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from src.api.main import app
+from src.core.config import settings
+
+
+@pytest.fixture(scope="package")
+def client():
+    # Выход из контекста запускает shutdown приложения: процессы пула отрисовки останавливаются
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+@pytest.fixture
+def api():
+    return settings.api_prefix
@@ -0,0 +1,48 @@
+import base64
+import io
+
+import pytest
+from PIL import Image
+
+from src.api.routes import generate
+from src.core.config import settings
+
+
+TEXT = "Начало. " + " ".join(f"Шаг {idx}: действие номер {idx}." for idx in range(40)) + " Конец."
+
+
+def test_oversized_png_is_served_as_tiles(client, api, monkeypatch):
+    if not generate.png_rasterizer_available():
+        pytest.skip("PNG rasterizer for SVG tiles is not installed")
+    # Бюджет пикселей сервера меньше схемы: ответ получает пирамиду тайлов полного разрешения
+    monkeypatch.setattr(settings, "render_max_pixels", 200_000)
+
+    response = client.post(f"{api}/generate", json={"description": TEXT, "output_format": "image"})
+    assert response.status_code == 200
+    body = response.json()
+    tiles = body["metadata"]["tiles"]
+    assert tiles is not None
+    assert base64.b64decode(body["artifacts"]["diagram_image_base64"]).startswith(b'\x89PNG')
+
+    pyramid = client.get(f"{api}/diagrams/{tiles['diagram_id']}/tiles").json()
+    assert pyramid["diagram_id"] == tiles["diagram_id"]
+    assert pyramid["max_level"] == tiles["max_level"]
+
+    tile = client.get(tiles["url"].format(level=tiles["max_level"], col=0, row=0))
+    assert tile.status_code == 200
+    assert tile.headers["content-type"] == "image/png"
+    assert "immutable" in tile.headers["cache-control"]
+    assert max(Image.open(io.BytesIO(tile.content)).size) <= settings.render_tile_size
+
+    assert client.get(tiles["url"].format(level=tiles["max_level"], col=9999, row=0)).status_code == 404
+
+
+def test_small_png_has_no_tiles(client, api):
+    response = client.post(f"{api}/generate", json={"description": "Начало. Шаг. Конец.", "output_format": "image"})
+    assert response.status_code == 200
+    assert response.json()["metadata"]["tiles"] is None
+
+
+def test_unknown_diagram_is_not_found(client, api):
+    assert client.get(f"{api}/diagrams/missing/tiles").status_code == 404
+    assert client.get(f"{api}/diagrams/missing/tiles/0/0_0.png").status_code == 404
@@ -0,0 +1,36 @@
+import io
+
+from PIL import Image
+
+from src.core.config import settings
+
+
+def generated_preview(client, api, description: str):
+    response = client.post(f"{api}/generate", json={"description": description, "output_format": "image"})
+    assert response.status_code == 200
+    return response.json()["metadata"]["preview"]
+
+
+def test_generated_diagram_preview_is_cached(client, api):
+    preview = generated_preview(client, api, "Начало. Проверить заказ. Конец.")
+    assert preview["url"] == f"{api}/previews/{preview['preview_id']}.png"
+
+    response = client.get(preview["url"])
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "image/png"
+    assert response.headers["etag"] == f'"{preview["preview_id"]}"'
+    assert "immutable" in response.headers["cache-control"]
+    assert max(Image.open(io.BytesIO(response.content)).size) <= settings.thumbnail_size
+
+    # Та же схема - тот же идентификатор превью
+    assert generated_preview(client, api, "Начало. Проверить заказ. Конец.") == preview
+
+
+def test_preview_revalidation_and_missing_preview(client, api):
+    preview = generated_preview(client, api, "Начало. Отправить письмо. Конец.")
+
+    cached = client.get(preview["url"], headers={"If-None-Match": f'"{preview["preview_id"]}"'})
+    assert cached.status_code == 304
+    assert cached.content == b""
+
+    assert client.get(f"{api}/previews/missing.png").status_code == 404
@@ -0,0 +1,72 @@
+from src.api.routes import sessions
+
+
+BASE = "Начало. Прочитать данные. Если x > 0, то вывести x, иначе вывести 0. Конец."
+EDITED = "Начало. Прочитать данные. Если x > 0, то вывести x, иначе вывести 0. Сохранить итог. Конец."
+
+
+def create(client, api, output_format: str = "code") -> str:
+    response = client.post(f"{api}/sessions", json={"output_format": output_format})
+    assert response.status_code == 200
+    return response.json()["session_id"]
+
+
+def test_session_returns_patches_for_edits(client, api):
+    session_id = create(client, api)
+
+    first = client.put(f"{api}/sessions/{session_id}", json={"description": BASE}).json()
+    assert first["changed"]
+    assert first["result"]["metadata"]["num_nodes"] == len(first["patch"]["added_nodes"])
+    assert "@startuml" in first["result"]["artifacts"]["diagram_code"]
+
+    edited = client.put(f"{api}/sessions/{session_id}", json={"description": EDITED}).json()
+    assert edited["changed"]
+    assert [node["label"] for node in edited["patch"]["added_nodes"]] == ["Сохранить итог"]
+    assert edited["result"]["metadata"]["num_nodes"] == first["result"]["metadata"]["num_nodes"] + 1
+    assert "Сохранить итог" in edited["result"]["artifacts"]["diagram_code"]
+
+    # Повтор текста с другими пробелами граф не меняет
+    repeated = client.put(f"{api}/sessions/{session_id}", json={"description": EDITED + "  "}).json()
+    assert not repeated["changed"]
+    assert repeated["result"]["description"] == edited["result"]["description"]
+
+
+def test_failed_refresh_does_not_leave_stale_artifacts(client, api, monkeypatch):
+    session_id = create(client, api, output_format="both")
+    assert client.put(f"{api}/sessions/{session_id}", json={"description": BASE}).status_code == 200
+
+    async def failing_render(*args, **kwargs):
+        raise RuntimeError("renderer unavailable")
+
+    monkeypatch.setattr(sessions, "render_in_pool", failing_render)
+    assert client.put(f"{api}/sessions/{session_id}", json={"description": EDITED}).status_code == 400
+    monkeypatch.undo()
+
+    # Повтор того же текста: граф уже обновлен, артефакты должны быть перестроены под него
+    retried = client.put(f"{api}/sessions/{session_id}", json={"description": EDITED}).json()
+    num_nodes = retried["result"]["metadata"]["num_nodes"]
+    assert not retried["changed"]
+    assert f"Всего узлов: {num_nodes}" in retried["result"]["description"]
+    assert retried["result"]["artifacts"]["diagram_image_base64"]
+
+
+def test_deleted_and_unknown_sessions(client, api):
+    session_id = create(client, api)
+    assert client.delete(f"{api}/sessions/{session_id}").json() == {"session_id": session_id, "deleted": True}
+    assert client.put(f"{api}/sessions/{session_id}", json={"description": BASE}).status_code == 404
+    assert client.delete(f"{api}/sessions/{session_id}").status_code == 404
+
+
+def test_too_long_description_is_rejected(client, api, monkeypatch):
+    monkeypatch.setattr(sessions.settings, "edit_session_max_chars", 10)
+    session_id = create(client, api)
+    response = client.put(f"{api}/sessions/{session_id}", json={"description": BASE})
+    assert response.status_code == 400
+    assert response.json()["error"] == "ValidationError"
+
+
+def test_image_session_renders_png(client, api):
+    session_id = create(client, api, output_format="image")
+    result = client.put(f"{api}/sessions/{session_id}", json={"description": BASE}).json()["result"]
+    assert result["artifacts"]["diagram_image_base64"]
+    assert result["artifacts"].get("diagram_code") is None
@@ -0,0 +1,72 @@
+import pytest
+
+from src.generative_pipeline.code_generator import DiagramCodeGenerator
+from src.generative_pipeline.text_parser import TextToGraphParser
+
+
+NESTED = "Начало. Если x: прочитать. Пока y: шаг один. шаг два. конец цикла. иначе: выйти. конец если. Конец."
+
+
+def generate(text: str, format: str) -> str:
+    graph = TextToGraphParser().parse(text, use_nlp=False)
+    return DiagramCodeGenerator().generate(graph, format=format)
+
+
+def body(code: str) -> list:
+    lines = code.splitlines()
+    return lines[lines.index('start'):lines.index('stop') + 1]
+
+
+def test_plantuml_nests_loop_inside_branch():
+    assert body(generate(NESTED, 'plantuml')) == [
+        "start",
+        "if (x) then (Да)",
+        "    :прочитать;",
+        "    while (y) is (Да)",
+        "        :шаг один;",
+        "        :шаг два;",
+        "    endwhile (Нет)",
+        "else (Нет)",
+        "    :выйти;",
+        "endif",
+        "stop",
+    ]
+
+
+def test_plantuml_repeat_until():
+    assert body(generate("Начало. Повторять: шаг. до тех пор пока готово. Конец.", 'plantuml')) == [
+        "start",
+        "repeat",
+        "    :шаг;",
+        "repeat while (готово) is (Нет) not (Да)",
+        "stop",
+    ]
+
+
+def test_mermaid_wraps_loop_in_subgraph():
+    code = generate(NESTED, 'mermaid')
+    lines = [line.strip() for line in code.splitlines()]
+    start = next(idx for idx, line in enumerate(lines) if line.startswith('subgraph loop'))
+    end = lines.index('end', start)
+
+    members = lines[start + 1:end]
+    assert [line.split('[')[0].split('{')[0] for line in members] == ['n3', 'n4', 'n5']
+    assert 'n2["прочитать"]' not in members
+
+
+@pytest.mark.parametrize('depth', [3, 30])
+@pytest.mark.parametrize('header, closer, opener, ender', [
+    ("Если x: ", "Конец если. ", 'if (', 'endif'),
+    ("Пока x: ", "Конец цикла. ", 'while (', 'endwhile'),
+])
+def test_deep_nesting_stays_balanced(depth, header, closer, opener, ender):
+    text = "Начало. " + header * depth + "шаг. " + closer * depth + "Конец."
+    code = generate(text, 'plantuml')
+    lines = [line.strip() for line in code.splitlines()]
+
+    assert not code.startswith('# Error')
+    assert sum(line.startswith(opener) for line in lines) == depth
+    assert sum(line.startswith(ender) for line in lines) == depth
+
+    mermaid = [line.strip() for line in generate(text, 'mermaid').splitlines()]
+    assert sum(line.startswith('subgraph') for line in mermaid) == mermaid.count('end')
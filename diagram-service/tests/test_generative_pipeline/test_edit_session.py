@@ -0,0 +1,102 @@
+import random
+
+import networkx as nx
+import pytest
+
+from src.generative_pipeline.edit_session import IncrementalTextParser
+from src.generative_pipeline.text_parser import TextToGraphParser
+from src.preprocessing.text_preprocessor import TextPreprocessor
+
+
+SENTENCES = [
+    "Начало.",
+    "Прочитать данные.",
+    "Если x > 0, то вывести x, иначе вывести 0.",
+    "Если готово:",
+    "Пока есть строки:",
+    "Обработать строку.",
+    "Конец цикла.",
+    "Иначе:",
+    "Конец если.",
+    "Повторять:",
+    "До тех пор пока очередь пуста.",
+    "Затем сохранить результат.",
+    "Конец.",
+]
+
+
+def labelled(graph) -> nx.DiGraph:
+    result = nx.DiGraph()
+    for node in graph.nodes():
+        attributes = graph.nodes[node]
+        result.add_node(node, type=attributes.get('type'), label=attributes.get('label'))
+    for source, target in graph.edges():
+        result.add_edge(source, target, label=graph.edges[source, target].get('label'))
+    return result
+
+
+def assert_same_graph(incremental, full) -> None:
+    assert nx.is_isomorphic(
+        labelled(incremental),
+        labelled(full),
+        node_match=lambda a, b: a == b,
+        edge_match=lambda a, b: a == b,
+    )
+
+
+def apply_patch(mirror: nx.DiGraph, patch) -> None:
+    for edge in patch["removed_edges"]:
+        mirror.remove_edge(edge["source"], edge["target"])
+    mirror.remove_nodes_from(patch["removed_nodes"])
+    for node in patch["added_nodes"]:
+        mirror.add_node(node["id"], type=node["type"], label=node["label"])
+    for edge in patch["added_edges"]:
+        mirror.add_edge(edge["source"], edge["target"], label=edge["label"])
+
+
+@pytest.mark.parametrize('seed', range(8))
+def test_incremental_parse_matches_full_parse(seed):
+    rng = random.Random(seed)
+    parser = TextToGraphParser()
+    incremental = IncrementalTextParser(parser, TextPreprocessor())
+    mirror = nx.DiGraph()
+    sentences = [rng.choice(SENTENCES) for _ in range(6)]
+
+    for _ in range(40):
+        action = rng.random()
+        position = rng.randrange(len(sentences) + 1)
+        if action < 0.4 or not sentences:
+            sentences.insert(position, rng.choice(SENTENCES))
+        elif action < 0.7:
+            del sentences[min(position, len(sentences) - 1)]
+        else:
+            sentences[min(position, len(sentences) - 1)] = rng.choice(SENTENCES)
+
+        result = incremental.update(' '.join(sentences))
+        apply_patch(mirror, result["patch"])
+
+        if incremental.text.strip():
+            assert_same_graph(incremental.graph, parser.parse(incremental.text, use_nlp=False))
+        assert_same_graph(incremental.graph, mirror)
+
+
+def test_edit_reparses_only_the_changed_region():
+    incremental = IncrementalTextParser(TextToGraphParser(), TextPreprocessor())
+    steps = [f"Шаг {idx}: действие {idx}." for idx in range(200)]
+    incremental.update(' '.join(steps))
+
+    steps[150] = "Шаг 150: другое действие."
+    result = incremental.update(' '.join(steps))
+
+    assert result["changed"]
+    assert not result["stats"]["full_reparse"]
+    assert result["stats"]["reparsed_chars"] < result["stats"]["total_chars"] // 10
+    assert [node["label"] for node in result["patch"]["added_nodes"]] == ["Шаг 150: другое действие"]
+
+
+def test_unchanged_text_gives_empty_patch():
+    incremental = IncrementalTextParser(TextToGraphParser(), TextPreprocessor())
+    incremental.update("Начало. Шаг. Конец.")
+    result = incremental.update("Начало. Шаг. Конец.")
+    assert not result["changed"]
+    assert result["stats"]["reparsed_chars"] == 0
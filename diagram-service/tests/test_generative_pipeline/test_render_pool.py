@@ -0,0 +1,71 @@
+import time
+
+import pytest
+
+from src.core.exceptions import VisualizationError
+from src.generative_pipeline import render_pool
+from src.generative_pipeline.render_pool import RenderPool
+from src.utils.compact_graph import CompactGraph
+
+
+def make_graph() -> CompactGraph:
+    graph = CompactGraph()
+    graph.add_node('start', type='start', label='Начало')
+    graph.add_node('step', type='process', label='Шаг')
+    graph.add_node('end', type='end', label='Конец')
+    graph.add_edge('start', 'step')
+    graph.add_edge('step', 'end')
+    return graph
+
+
+@pytest.fixture
+def pool():
+    pool = RenderPool(workers=1, job_timeout=30.0, max_jobs=2, startup_timeout=120.0)
+    yield pool
+    pool.shutdown()
+
+
+def test_renders_image_and_thumbnail(pool):
+    result = pool.submit(make_graph(), format='svg', thumbnail_size=64).result(timeout=120)
+    assert result.image.lstrip().startswith(b'<')
+    assert result.thumbnail is not None and result.thumbnail.startswith(b'\x89PNG')
+    assert result.render_sec > 0
+
+
+def test_timed_out_job_fails_and_worker_is_replaced(pool):
+    pool.submit(make_graph(), format='svg').result(timeout=120)
+
+    # Ни одна отрисовка не укладывается в 1 мкс: задание завершается ошибкой, процесс убивается
+    pool.job_timeout = 1e-6
+    with pytest.raises(VisualizationError, match="timed out"):
+        pool.submit(make_graph(), format='svg').result(timeout=120)
+    stats = pool.stats()
+    assert stats["timeouts"] == 1 and stats["restarts"] == 1
+
+    # Следующее задание выполняет новый процесс
+    pool.job_timeout = 30.0
+    assert pool.submit(make_graph(), format='svg').result(timeout=120).image
+
+
+def test_worker_is_recycled_after_max_jobs(pool):
+    deadline = time.monotonic() + 120
+    completed = 0
+    while pool.stats()["recycled"] == 0 and time.monotonic() < deadline:
+        assert pool.submit(make_graph(), format='svg').result(timeout=120).image
+        completed += 1
+
+    stats = pool.stats()
+    assert stats["recycled"] >= 1
+    assert stats["failed"] == 0 and stats["completed"] == completed
+    assert stats["alive_workers"] == 1
+
+
+def test_queued_jobs_fail_when_no_worker_can_start(pool, monkeypatch):
+    def failing_worker(context):
+        raise OSError("spawn failed")
+
+    monkeypatch.setattr(render_pool, '_Worker', failing_worker)
+    futures = [pool.submit(make_graph(), format='svg') for _ in range(3)]
+    for future in futures:
+        with pytest.raises(VisualizationError, match="Failed to start renderer process"):
+            future.result(timeout=10)
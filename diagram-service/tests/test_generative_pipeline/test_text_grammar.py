@@ -0,0 +1,76 @@
+import pytest
+
+from src.generative_pipeline.text_grammar import MAX_NESTING_DEPTH, Branch, GrammarParser, Loop, Step
+from src.generative_pipeline.text_lexer import TextLexer
+from src.generative_pipeline.text_parser import TextToGraphParser
+from tests.test_generative_pipeline.test_text_lexer import assert_linear
+
+
+def parse(text: str):
+    return GrammarParser(text, TextLexer().tokens(text), ['начало'], ['конец']).parse()
+
+
+def test_inline_branch_with_else():
+    program = parse("Начало. Если x > 0, то вывести x, иначе вывести 0. Конец.")
+    assert program == [
+        Step('start', 'Начало'),
+        Branch('x > 0', [Step('process', 'вывести x')], [Step('process', 'вывести 0')]),
+        Step('end', 'Конец'),
+    ]
+
+
+def test_block_branch_with_nested_loop():
+    program = parse("Если x: прочитать. Пока y: шаг один. шаг два. конец цикла. иначе: выйти. конец если. Готово.")
+    assert program == [
+        Branch(
+            'x',
+            [
+                Step('process', 'прочитать'),
+                Loop('while', 'y', [Step('process', 'шаг один'), Step('process', 'шаг два')]),
+            ],
+            [Step('process', 'выйти')],
+        ),
+        Step('process', 'Готово'),
+    ]
+
+
+def test_repeat_until_checks_after_body():
+    assert parse("Повторять: шаг. до тех пор пока готово.") == [
+        Loop('repeat_until', 'готово', [Step('process', 'шаг')])
+    ]
+
+
+def test_block_without_closer_stays_inline():
+    # "конец если" нигде нет - заголовок не открывает блок, следующие предложения идут на верхний уровень
+    program = parse("Если x. a. b.")
+    assert program[1:] == [Step('process', 'a'), Step('process', 'b')]
+    assert isinstance(program[0], Branch)
+
+
+@pytest.mark.parametrize('label', ["Вызвать endpoint", "Отправить startup-пакет"])
+def test_keyword_prefix_inside_word_is_not_a_step_kind(label):
+    assert parse(f"{label}. Конец.")[0] == Step('process', label)
+
+
+def test_nesting_is_capped():
+    depth = MAX_NESTING_DEPTH + 20
+    program = parse("если x: " * depth + "a. " + "конец если. " * depth)
+
+    levels = 0
+    statement = program[0]
+    while isinstance(statement, Branch) and statement.then_body:
+        levels += 1
+        statement = statement.then_body[0]
+    assert levels <= MAX_NESTING_DEPTH
+
+
+@pytest.mark.parametrize('unit', [
+    'если a, то ',
+    'если x. ',
+    'пока x: шаг. ',
+    'конец, ',
+    'повторять ',
+])
+def test_parse_is_linear_on_adversarial_input(unit):
+    parser = TextToGraphParser()
+    assert_linear(lambda text: parser.parse(text, use_nlp=False), unit, size=200)
@@ -0,0 +1,50 @@
+import gc
+import time
+
+from src.generative_pipeline.text_lexer import TextLexer, split_raw_sentences
+
+
+def best_time(func, text: str, repeats: int = 5) -> float:
+    timings = []
+    gc.disable()
+    try:
+        for _ in range(repeats):
+            start = time.perf_counter()
+            func(text)
+            timings.append(time.perf_counter() - start)
+    finally:
+        gc.enable()
+    return min(timings)
+
+
+def assert_linear(func, unit: str, size: int = 1000) -> None:
+    # Рост входа в 8 раз: линейный разбор - около 8x по времени, квадратичный - 64x
+    small = best_time(func, unit * size)
+    large = best_time(func, unit * size * 8)
+    assert large < 24 * max(small, 1e-4)
+
+
+def test_tokens_keep_source_positions():
+    text = "Шаг 1: если X, то y."
+    tokens = TextLexer().tokens(text)
+
+    assert [token.kind for token in tokens] == ['word', 'word', 'colon', 'word', 'word', 'comma', 'word', 'word', 'stop']
+    assert tokens[4].text == 'X' and tokens[4].lower == 'x'
+    assert all(text[token.start:token.end] == token.text for token in tokens)
+
+
+def test_split_drops_empty_sentences():
+    assert TextLexer().split("a. b! c?; d") == ['a', 'b', 'c', 'd']
+    assert TextLexer().split(" .. ; ") == []
+
+
+def test_raw_sentences_rejoin_to_source():
+    text = "Начало. Если x, то y!! Конец;"
+    assert ''.join(split_raw_sentences(text)) == text
+
+
+def test_tokenization_is_linear_on_adversarial_input():
+    lexer = TextLexer()
+    # Длинные слова без разделителей и серии знаков - типичные случаи возвратов в регулярных выражениях
+    for unit in ('a' * 50 + ' ', '.,:;' * 5, 'слово, '):
+        assert_linear(lexer.tokens, unit)
@@ -0,0 +1,57 @@
+import copy
+
+import networkx as nx
+import pytest
+
+from src.utils.compact_graph import CompactGraph, TypeInterner
+from src.utils.graph_utils import as_networkx
+
+
+def make_graph() -> CompactGraph:
+    graph = CompactGraph()
+    graph.add_node('a', type='start', label='A')
+    graph.add_node('b', type='decision', label='B')
+    graph.add_node('c', type='end', label='C')
+    graph.add_edge('a', 'b', label='x')
+    graph.add_edge('b', 'c', condition='true')
+    graph.add_edge('c', 'a')
+    return graph
+
+
+def test_view_copy_is_independent_digraph():
+    graph = make_graph()
+    copied = as_networkx(graph).copy()
+
+    assert type(copied) is nx.DiGraph
+    assert copied.edges['b', 'c'] == {'condition': 'true'}
+    copied.add_node('z')
+    assert 'z' not in graph.nodes
+
+
+def test_view_reverse_and_undirected():
+    view = as_networkx(make_graph())
+
+    reversed_graph = view.reverse()
+    assert sorted(reversed_graph.edges) == [('a', 'c'), ('b', 'a'), ('c', 'b')]
+    assert reversed_graph.nodes['b'] == {'type': 'decision', 'label': 'B'}
+
+    undirected = view.to_undirected()
+    assert isinstance(undirected, nx.Graph) and not undirected.is_directed()
+    assert undirected.number_of_edges() == 3
+    assert view.to_directed().number_of_edges() == 3
+
+
+def test_deepcopy_shares_type_table():
+    graph = make_graph()
+    copied = copy.deepcopy(graph)
+    assert copied.nodes['b']['type'] == 'decision'
+    assert copied.number_of_edges() == 3
+
+
+def test_interner_is_bounded():
+    interner = TypeInterner(('a', 'b'), max_size=3)
+    assert interner.code('c') == 2
+    assert interner.code('a') == 0
+    assert not interner.has_room_for('d')
+    with pytest.raises(OverflowError):
+        interner.code('d')
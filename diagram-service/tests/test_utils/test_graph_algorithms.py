@@ -0,0 +1,105 @@
+import random
+
+import networkx as nx
+import pytest
+
+from src.utils.compact_graph import CompactGraph
+from src.utils.graph_algorithms import (
+    analyze_cycles,
+    enumerate_cycles,
+    int_adjacency,
+    node_levels,
+    strongly_connected_components,
+)
+
+
+def random_graph(seed: int, nodes: int = 40, edges: int = 70) -> CompactGraph:
+    rng = random.Random(seed)
+    graph = CompactGraph()
+    for idx in range(nodes):
+        graph.add_node(f'n{idx}', type='process', label=str(idx))
+    for _ in range(edges):
+        graph.add_edge(f'n{rng.randrange(nodes)}', f'n{rng.randrange(nodes)}')
+    return graph
+
+
+def reference(graph: CompactGraph) -> nx.DiGraph:
+    reference_graph = nx.DiGraph()
+    reference_graph.add_nodes_from(graph.nodes())
+    reference_graph.add_edges_from(graph.edges())
+    return reference_graph
+
+
+@pytest.mark.parametrize('seed', range(10))
+def test_scc_matches_networkx(seed):
+    graph = random_graph(seed)
+    ids, indptr, indices = int_adjacency(graph)
+    component, count = strongly_connected_components(indptr, indices)
+
+    groups = {}
+    for node, comp in zip(ids, component):
+        groups.setdefault(comp, set()).add(node)
+    expected = {frozenset(members) for members in nx.strongly_connected_components(reference(graph))}
+
+    assert count == len(expected)
+    assert {frozenset(members) for members in groups.values()} == expected
+
+
+@pytest.mark.parametrize('seed', range(10))
+def test_cycle_analysis_matches_networkx(seed):
+    graph = random_graph(seed, edges=45)
+    nx_graph = reference(graph)
+    info = analyze_cycles(graph)
+
+    cyclic = [
+        members for members in nx.strongly_connected_components(nx_graph)
+        if len(members) > 1 or any(nx_graph.has_edge(node, node) for node in members)
+    ]
+    assert info.has_cycles == (not nx.is_directed_acyclic_graph(nx_graph))
+    assert info.num_loops == len(cyclic)
+    assert {frozenset(members) for members in info.components} == {frozenset(members) for members in cyclic}
+
+
+def test_enumerated_cycles_match_networkx():
+    graph = random_graph(3, nodes=12, edges=20)
+    found = {frozenset(cycle) for cycle in enumerate_cycles(graph, limit=10_000)}
+    expected = {frozenset(cycle) for cycle in nx.simple_cycles(reference(graph))}
+    assert found == expected
+
+
+@pytest.mark.parametrize('seed', range(10))
+def test_levels_are_longest_paths_in_condensation(seed):
+    graph = random_graph(seed, edges=50)
+    condensation = nx.condensation(reference(graph))
+    component_level = {}
+    for comp in nx.topological_sort(condensation):
+        predecessors = list(condensation.predecessors(comp))
+        component_level[comp] = max((component_level[p] + 1 for p in predecessors), default=0)
+    expected = {
+        node: component_level[condensation.graph['mapping'][node]]
+        for node in graph.nodes()
+    }
+
+    assert node_levels(graph) == expected
+
+
+def test_levels_cached_until_structure_changes():
+    graph = random_graph(1, nodes=5, edges=0)
+    graph.add_edge('n0', 'n1')
+    assert node_levels(graph)['n1'] == 1
+    graph.add_edge('n1', 'n2')
+    assert node_levels(graph)['n2'] == 2
+
+
+def test_loop_header_is_back_edge_target():
+    graph = CompactGraph()
+    for node in ('start', 'check', 'body', 'end'):
+        graph.add_node(node)
+    graph.add_edge('start', 'check')
+    graph.add_edge('check', 'body')
+    graph.add_edge('body', 'check')
+    graph.add_edge('check', 'end')
+
+    info = analyze_cycles(graph)
+    assert info.loop_headers == ['check']
+    assert info.num_loops == 1